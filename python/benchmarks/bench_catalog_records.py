@@ -0,0 +1,198 @@
+"""
+Compares the memory use and read throughput of the catalog as proto-plus messages (what
+the Google Cloud clients return) and as the slotted records GcpClient now keeps.
+
+Synthetic SKUs and machine types are serialized and parsed back into billing_v1.Sku and
+compute_v1.MachineType messages, as the list calls would, then converted to records.
+Memory is the growth of the process's resident set size, so the C-allocated protobuf
+storage is counted too (Linux only; reported as n/a elsewhere). Protos are measured
+unread: reading their fields caches more wrapper objects on them.
+
+Run from the `python` directory:
+
+    python -m benchmarks.bench_catalog_records --skus 50000 --zones 100
+"""
+
+import argparse
+import gc
+import os
+import random
+import time
+
+from google.cloud import billing_v1, compute_v1
+
+from benchmarks.synthetic import GPU_TYPES, MACHINE_SERIES, REGIONS, make_machine_types, make_skus
+from src.catalog_records import MachineTypeRecord, SkuRecord
+from src.sku_index import SkuIndex
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def _measure(build):
+    """
+    Returns (value, seconds, resident bytes gained) of `build()`.
+    """
+    gc.collect()
+    before = _rss_bytes()
+    start = time.perf_counter()
+    value = build()
+    seconds = time.perf_counter() - start
+    gc.collect()
+    return value, seconds, _rss_bytes() - before
+
+
+def _sku_message(sku) -> bytes:
+    expression = sku.pricing_info[0].pricing_expression
+    return billing_v1.Sku.serialize(billing_v1.Sku(
+        name=sku.name,
+        sku_id=sku.sku_id,
+        description=sku.description,
+        service_regions=sku.service_regions,
+        category={"resource_family": "Compute", "resource_group": "CPU", "usage_type": "OnDemand"},
+        pricing_info=[{
+            "pricing_expression": {
+                "usage_unit": expression.usage_unit,
+                "usage_unit_description": expression.usage_unit_description,
+                "base_unit_conversion_factor": expression.base_unit_conversion_factor,
+                "display_quantity": expression.display_quantity,
+                "tiered_rates": [
+                    {
+                        "start_usage_amount": tier.start_usage_amount,
+                        "unit_price": {
+                            "currency_code": tier.unit_price.currency_code,
+                            "units": tier.unit_price.units,
+                            "nanos": tier.unit_price.nanos,
+                        },
+                    }
+                    for tier in expression.tiered_rates
+                ],
+            }
+        }],
+    ))
+
+
+def _machine_type_message(mt, zone: str) -> bytes:
+    return compute_v1.MachineType.serialize(compute_v1.MachineType(
+        name=mt.name,
+        zone=zone,
+        description=f"{mt.guest_cpus} vCPUs, {mt.memory_mb // 1024} GB RAM",
+        guest_cpus=mt.guest_cpus,
+        memory_mb=mt.memory_mb,
+        maximum_persistent_disks=128,
+        maximum_persistent_disks_size_gb=263168,
+        is_shared_cpu=False,
+        accelerators=[
+            {"guest_accelerator_type": acc.guest_accelerator_type, "guest_accelerator_count": acc.guest_accelerator_count}
+            for acc in mt.accelerators
+        ],
+    ))
+
+
+def _scan(skus: list, queries: list) -> list:
+    """
+    The linear SKU search of cost_estimator._find_sku.
+    """
+    found = []
+    for keywords, region in queries:
+        for sku in skus:
+            if region in sku.service_regions and all(keyword.lower() in sku.description.lower() for keyword in keywords):
+                found.append(sku.name)
+                break
+    return found
+
+
+def _proto_prices(skus: list) -> list:
+    return [
+        (
+            "hour" in sku.pricing_info[0].pricing_expression.usage_unit_description.lower(),
+            sku.pricing_info[0].pricing_expression.tiered_rates[0].unit_price.units
+            + sku.pricing_info[0].pricing_expression.tiered_rates[0].unit_price.nanos / 1e9,
+        )
+        for sku in skus
+    ]
+
+
+def _record_prices(skus: list) -> list:
+    return [("hour" in sku.usage_unit_description.lower(), sku.tiers[0][1]) for sku in skus]
+
+
+def _machine_shapes(machine_types: list) -> int:
+    return sum(
+        mt.guest_cpus + mt.memory_mb + sum(acc.guest_accelerator_count for acc in mt.accelerators)
+        for mt in machine_types
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--skus", type=int, default=50000)
+    parser.add_argument("--zones", type=int, default=100, help="Zones of synthetic machine types.")
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+
+    sku_bytes = [_sku_message(sku) for sku in make_skus(args.skus)]
+    machine_type_bytes = [
+        _machine_type_message(mt, f"zone-{zone}") for zone in range(args.zones) for mt in make_machine_types()
+    ]
+    rng = random.Random(1)
+    queries = [
+        (rng.choice([[rng.choice(MACHINE_SERIES), "vCPU"], [rng.choice(GPU_TYPES), "GPU"]]), rng.choice(REGIONS))
+        for _ in range(args.lookups)
+    ]
+
+    # Records are built as GcpClient builds them, from each message as it is parsed, and
+    # measured first so that the protos retained afterwards cannot reuse their memory.
+    record_skus, _, record_sku_bytes = _measure(
+        lambda: [SkuRecord.from_message(billing_v1.Sku.deserialize(b)) for b in sku_bytes]
+    )
+    record_mts, _, record_mt_bytes = _measure(
+        lambda: [MachineTypeRecord.from_message(compute_v1.MachineType.deserialize(b)) for b in machine_type_bytes]
+    )
+    proto_skus, parse_seconds, proto_sku_bytes = _measure(lambda: [billing_v1.Sku.deserialize(b) for b in sku_bytes])
+    proto_mts, _, proto_mt_bytes = _measure(lambda: [compute_v1.MachineType.deserialize(b) for b in machine_type_bytes])
+    _, sku_convert_seconds, _ = _measure(lambda: [SkuRecord.from_message(sku) for sku in proto_skus])
+    _, mt_convert_seconds, _ = _measure(lambda: [MachineTypeRecord.from_message(mt) for mt in proto_mts])
+
+    rows = [("memory", "SKUs", proto_sku_bytes, record_sku_bytes, "MiB")]
+    rows.append(("memory", "machine types", proto_mt_bytes, record_mt_bytes, "MiB"))
+    for label, operation, items in [
+        ("linear SKU search", lambda skus, _: _scan(skus, queries), "lookup"),
+        ("hourly flag + price", lambda skus, _: _proto_prices(skus) if skus is proto_skus else _record_prices(skus), "SKU"),
+        ("SkuIndex build", lambda skus, _: SkuIndex(skus), "SKU"),
+        ("machine type reads", lambda _, mts: _machine_shapes(mts), "machine type"),
+    ]:
+        timings = []
+        for skus, mts in ((proto_skus, proto_mts), (record_skus, record_mts)):
+            start = time.perf_counter()
+            operation(skus, mts)
+            timings.append(time.perf_counter() - start)
+        count = {"lookup": len(queries), "SKU": args.skus, "machine type": len(record_mts)}[items]
+        rows.append((label, f"per {items}", timings[0] / count * 1e6, timings[1] / count * 1e6, "us"))
+
+    if _scan(proto_skus, queries) != _scan(record_skus, queries):
+        raise SystemExit("Record lookups differ from the proto lookups.")
+
+    print(f"SKUs: {args.skus}, machine types: {len(record_mts)}, lookups: {len(queries)}")
+    print(f"parse (proto):           {parse_seconds / args.skus * 1e6:8.2f} us/SKU")
+    print(f"convert to records:      {sku_convert_seconds / args.skus * 1e6:8.2f} us/SKU, "
+          f"{mt_convert_seconds / len(record_mts) * 1e6:.2f} us/machine type")
+    print()
+    print(f"{'':22} {'':16} {'proto':>10} {'record':>10} {'ratio':>7}")
+    for label, unit_label, proto_value, record_value, unit in rows:
+        if unit == "MiB":
+            if not proto_value:
+                print(f"{label:22} {unit_label:16} {'n/a':>10} {'n/a':>10}")
+                continue
+            proto_value, record_value = proto_value / 2**20, record_value / 2**20
+        ratio = proto_value / record_value if record_value else float("inf")
+        print(f"{label:22} {unit_label:16} {proto_value:10.2f} {record_value:10.2f} {ratio:6.1f}x  {unit}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Measures the import time of each CLI subcommand with `python -X importtime`.
+
+Commands that never talk to Google Cloud (list-templates and generate) are run for
+real. The benchmark fails if they load any google.* module. Every subcommand's --help
+is also run under the same check, because the CLI itself must stay light. For the
+commands that do call Google Cloud, the import time of the modules they load when
+they run is reported separately.
+
+Run from the `python` directory:
+
+    python -m benchmarks.bench_cli_imports --runs 5
+    python -m benchmarks.bench_cli_imports --budget-ms 150
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+# The modules each command that calls Google Cloud imports when it runs.
+GCP_COMMAND_MODULES = {
+    "validate": ["src.offline_gcp_client", "src.validator"],
+    "estimate-cost": ["src.cost_estimator", "src.offline_gcp_client", "src.validator"],
+    "cost-sweep": ["src.cost_sweep", "src.offline_gcp_client", "src.validator"],
+    "rank-regions": ["src.cost_sweep", "src.offline_gcp_client", "src.validator"],
+    "find-region": ["src.offline_gcp_client", "src.region_finder"],
+    "check-quota": ["src.offline_gcp_client", "src.validator"],
+    "snapshot export": ["src.catalog_snapshot", "src.cost_estimator", "src.gcp_client"],
+}
+
+
+def _importtime(arguments: list) -> tuple:
+    """
+    Runs `python -X importtime <arguments>` and returns (total ms, imported module names).
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *arguments], capture_output=True, text=True
+    )
+    total_us = 0
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        modules.append(match.group(4))
+        if not match.group(3):
+            # Only top-level imports, their cumulative time already includes nested ones.
+            total_us += int(match.group(2))
+    if result.returncode != 0:
+        raise SystemExit(f"{' '.join(arguments)} failed:\n{result.stderr[-2000:]}")
+    return total_us / 1000, modules
+
+
+def _cli_commands(output_file: str) -> dict:
+    generate = [
+        "generate", "--blueprint-name", "bench", "--deployment-name", "bench", "--project-id", "bench-project",
+        "--storage-type", "filestore", "--storage-capacity-gb", "1024", "--output-file", output_file,
+    ]
+    commands = {"--help": ["--help"], "list-templates": ["list-templates"], "generate": generate}
+    for command in ["generate", "list-templates", "snapshot info", *GCP_COMMAND_MODULES]:
+        commands[f"{command} --help"] = [*command.split(), "--help"]
+    return commands
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--budget-ms", type=float, default=None,
+        help="Fail if an offline command's median import time exceeds this many milliseconds.",
+    )
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'command':28} {'import ms':>10} {'modules':>8} {'google':>7}")
+        for name, arguments in _cli_commands(os.path.join(tmp, "blueprint.yaml")).items():
+            runs = [_importtime(["-m", "src.cli", *arguments]) for _ in range(args.runs)]
+            median_ms = statistics.median(total for total, _ in runs)
+            modules = runs[0][1]
+            google = sum(1 for module in modules if module.startswith("google"))
+            print(f"{name:28} {median_ms:10.1f} {len(modules):8} {google:7}")
+            if google:
+                failures.append(f"'{name}' imports {google} google.* modules")
+            if args.budget_ms is not None and median_ms > args.budget_ms:
+                failures.append(f"'{name}' imports take {median_ms:.1f} ms, over the {args.budget_ms} ms budget")
+
+        print()
+        print(f"{'deferred imports of':28} {'import ms':>10} {'modules':>8}")
+        for command, command_modules in GCP_COMMAND_MODULES.items():
+            code = f"import src.cli, {', '.join(command_modules)}"
+            runs = [_importtime(["-c", code]) for _ in range(args.runs)]
+            median_ms = statistics.median(total for total, _ in runs)
+            print(f"{command:28} {median_ms:10.1f} {len(runs[0][1]):8}")
+
+    if failures:
+        raise SystemExit("\n".join(failures))
+
+
+if __name__ == "__main__":
+    main()
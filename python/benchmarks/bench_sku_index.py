@@ -0,0 +1,65 @@
+"""
+Benchmarks SkuIndex lookups against the linear scan in cost_estimator._find_sku.
+
+Run from the `python` directory:
+
+    python -m benchmarks.bench_sku_index --skus 50000 --lookups 2000
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks.synthetic import GPU_TYPES, MACHINE_SERIES, REGIONS, make_skus
+from src.cost_estimator import _find_sku
+from src.sku_index import SkuIndex
+
+
+def _lookups(count: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        region = rng.choice(REGIONS)
+        series = rng.choice(MACHINE_SERIES)
+        queries.append(rng.choice([
+            ([f"{series.lower()}-standard-8", "instance"], region),
+            ([series, "vCPU"], region),
+            ([series, "RAM"], region),
+            ([rng.choice(GPU_TYPES), "GPU"], region),
+            (["Zonal", "Capacity"], region),
+        ]))
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--skus", type=int, default=50000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    skus = make_skus(args.skus)
+    queries = _lookups(args.lookups)
+
+    start = time.perf_counter()
+    linear = [_find_sku(skus, keywords, region) for keywords, region in queries]
+    linear_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = SkuIndex(skus)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = [_find_sku(index, keywords, region) for keywords, region in queries]
+    indexed_seconds = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(linear, indexed) if a is not b)
+    print(f"SKUs: {args.skus}, lookups: {args.lookups}, mismatches: {mismatches}")
+    print(f"linear scan:  {linear_seconds * 1000:10.1f} ms ({linear_seconds / args.lookups * 1e6:8.1f} us/lookup)")
+    print(f"index build:  {build_seconds * 1000:10.1f} ms")
+    print(f"index lookup: {indexed_seconds * 1000:10.1f} ms ({indexed_seconds / args.lookups * 1e6:8.1f} us/lookup)")
+    if mismatches:
+        raise SystemExit("SkuIndex results differ from the linear scan.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmarks time-to-first-response of /validate and /cost in a fresh process.
+
+Each run starts a new interpreter, imports the app and sends one request to the
+endpoint, so the measurement covers imports, GcpClient construction, API client
+creation and the first upstream calls. Runs with --eager create every API client up
+front, as GcpClient did before clients were created on demand.
+
+By default every project is served by the benchmarks' FakeGcpClient (with --latency
+seconds of delay per upstream call), and the API clients --eager creates get anonymous
+credentials, so only local costs are measured. Pass --live with a real project to
+measure against Google Cloud.
+
+Run from the `python` directory:
+
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --live --project-id my-project
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+
+def _install_fake_gcp(latency: float):
+    """
+    Serves every project from a synthetic catalog snapshot, through the factories the
+    dependency getters create clients with. Constructing the Google Cloud API clients
+    themselves is left untouched, so --eager still measures its cost.
+    """
+    from google.auth.credentials import AnonymousCredentials
+
+    import src.gcp_client
+    from benchmarks.fake_gcp import FakeAsyncGcpClient, FakeGcpClient, UpstreamModel, synthetic_snapshot
+    from src import dependencies
+
+    snapshot = synthetic_snapshot(20000)
+    upstream = UpstreamModel(str(latency))
+
+    def create_fake_gcp_client(project_id: str = None) -> FakeGcpClient:
+        return FakeGcpClient(snapshot, project_id=project_id, upstream=upstream)
+
+    src.gcp_client.get_default_credentials = AnonymousCredentials
+    dependencies.create_gcp_client = create_fake_gcp_client
+    dependencies.create_async_gcp_client = FakeAsyncGcpClient
+
+
+def _child(args):
+    start = time.perf_counter()
+    from fastapi.testclient import TestClient
+
+    from benchmarks.synthetic import SAMPLE_BLUEPRINT
+    from src.dependencies import get_async_gcp_client, get_gcp_client
+    from src.gcp_client import LazyClient
+    from src.main import app
+    import_seconds = time.perf_counter() - start
+
+    if not args.live:
+        _install_fake_gcp(args.latency)
+    blueprint = SAMPLE_BLUEPRINT.replace("synthetic-project", args.project_id)
+    body = {"yaml_content": blueprint, "region": "us-central1", "zone": "us-central1-a"}
+    client = TestClient(app)
+
+    start = time.perf_counter()
+    if args.eager:
+        for owner in (get_gcp_client(project_id=args.project_id), get_async_gcp_client(project_id=args.project_id)):
+            for cls in type(owner).__mro__:
+                for name, attr in vars(cls).items():
+                    if isinstance(attr, LazyClient):
+                        getattr(owner, name)
+    response = client.post(f"/{args.endpoint}", json=body)
+    first_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    client.post(f"/{args.endpoint}", json=body)
+    warm_seconds = time.perf_counter() - start
+
+    stats = client.get("/cache/stats", params={"project_id": args.project_id}).json()
+    print(json.dumps({
+        "status": response.status_code,
+        "import": import_seconds,
+        "first": first_seconds,
+        "warm": warm_seconds,
+        "api_clients": stats["api_clients"],
+    }))
+
+
+def _run(args, endpoint: str, eager: bool) -> dict:
+    command = [
+        sys.executable, "-m", "benchmarks.bench_startup", "--child", endpoint,
+        "--project-id", args.project_id, "--latency", str(args.latency),
+    ]
+    if eager:
+        command.append("--eager")
+    if args.live:
+        command.append("--live")
+
+    start = time.perf_counter()
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process"] = time.perf_counter() - start
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of delay per synthetic upstream call.")
+    parser.add_argument("--live", action="store_true", help="Call the real Google Cloud APIs.")
+    parser.add_argument("--project-id", default="synthetic-project")
+    parser.add_argument("--child", dest="endpoint", choices=["validate", "cost"], help=argparse.SUPPRESS)
+    parser.add_argument("--eager", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.endpoint:
+        _child(args)
+        return
+
+    print(f"{'endpoint':10} {'clients':8} {'import ms':>10} {'first ms':>10} {'warm ms':>10} {'process ms':>11}  created")
+    for endpoint in ("validate", "cost"):
+        for eager in (True, False):
+            runs = [_run(args, endpoint, eager) for _ in range(args.runs)]
+            if any(run["status"] != 200 for run in runs):
+                raise SystemExit(f"/{endpoint} returned {[run['status'] for run in runs]}")
+            median = {key: statistics.median(run[key] for run in runs) * 1000 for key in ("import", "first", "warm", "process")}
+            print(
+                f"/{endpoint:9} {'eager' if eager else 'lazy':8} {median['import']:10.1f} {median['first']:10.1f}"
+                f" {median['warm']:10.1f} {median['process']:11.1f}  {', '.join(runs[0]['api_clients'])}"
+            )
+
+
+if __name__ == "__main__":
+    main()
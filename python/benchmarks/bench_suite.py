@@ -0,0 +1,277 @@
+"""
+Times the hot paths of validation, cost estimation and blueprint generation on synthetic
+blueprints (--modules, spread over deployment groups of 50) and synthetic catalogs
+(--skus), served by an in-memory FakeGcpClient, and stores the results so that runs can
+be compared.
+
+Cases:
+  extract_resources        Validator._extract_resources of a parsed blueprint
+  validate_yaml_content    Validator.validate_yaml_content with warm catalog caches and
+                           the per-module check cache cleared before every call
+  validate_parsed          Validator.validate_parsed_blueprint, likewise (no YAML parsing)
+  validate_parsed_memoized the same with every module check already memoized
+  estimate_cost            cost_estimator.estimate_cost against a warm SKU catalog
+  sku_catalog_load         the first SKU index lookup of a fresh client (catalog build)
+  find_sku                 cost_estimator._find_sku against the SKU index, per lookup
+  find_sku_linear          cost_estimator._find_sku scanning the SKU list, per lookup
+  build_and_write_yaml     YamlBuilder.build_and_write_yaml into a temporary directory
+
+Every case reports the best and median time per call over --repeat runs. Results are
+written as JSON to benchmarks/results/ (or --output). With --compare, each case is
+compared to the same case of an earlier result file, and the run exits with 1 when one
+became slower by more than --threshold.
+
+Run from the `python` directory:
+
+    python -m benchmarks.bench_suite
+    python -m benchmarks.bench_suite --modules 1 100 1000 5000 --skus 1000 10000 100000
+    python -m benchmarks.bench_suite --cases estimate_cost find_sku --compare benchmarks/results/<earlier>.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.fake_gcp import FakeGcpClient, synthetic_snapshot
+from benchmarks.synthetic import GPU_TYPES, MACHINE_SERIES, REGIONS, make_blueprint
+from src import validator as validator_module
+from src.cost_estimator import COMPUTE_ENGINE_SERVICE_ID, _find_sku, estimate_cost
+from src.validator import Validator
+from src.yaml_builder import YamlBuilder
+from src.yaml_io import HAS_LIBYAML, dump_yaml
+
+CASES = [
+    "extract_resources",
+    "validate_yaml_content",
+    "validate_parsed",
+    "validate_parsed_memoized",
+    "estimate_cost",
+    "sku_catalog_load",
+    "find_sku",
+    "find_sku_linear",
+    "build_and_write_yaml",
+]
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+REGION = "us-central1"
+ZONE = "us-central1-a"
+
+
+def _time(fn, repeat: int, number: int = 1, setup=None) -> dict:
+    """
+    Runs `fn` `number` times per repeat (after an untimed warm-up call) and returns its
+    best and median milliseconds per call. `setup` runs untimed before every repeat.
+    """
+    if setup:
+        setup()
+    fn()
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - start) / number * 1e3)
+    return {"best_ms": min(timings), "median_ms": statistics.median(timings), "calls": repeat * number}
+
+
+def _per_lookup(timing: dict, lookups: int) -> dict:
+    """
+    Converts the timing of a batch of lookups to milliseconds per lookup.
+    """
+    return {
+        **timing,
+        "best_ms": timing["best_ms"] / lookups,
+        "median_ms": timing["median_ms"] / lookups,
+        "calls": timing["calls"] * lookups,
+    }
+
+
+def _clear_module_checks():
+    with validator_module._module_check_lock:
+        validator_module._module_check_cache.clear()
+
+
+def _sku_queries(count: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    return [
+        (rng.choice([[rng.choice(MACHINE_SERIES), "vCPU"], [rng.choice(GPU_TYPES), "GPU"]]), rng.choice(REGIONS))
+        for _ in range(count)
+    ]
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run_blueprint_cases(cases: list, module_counts: list, client: FakeGcpClient, sku_count: int, repeat: int):
+    """
+    Yields the results of the cases that scale with the blueprint size.
+    """
+    for module_count in module_counts:
+        blueprint = make_blueprint(module_count)
+        yaml_content = dump_yaml(blueprint)
+        extracted = Validator._extract_resources(blueprint)
+        params = {"modules": module_count}
+        if "extract_resources" in cases:
+            number = max(1, 2000 // module_count)
+            yield "extract_resources", params, _time(lambda: Validator._extract_resources(blueprint), repeat, number)
+        if "validate_yaml_content" in cases:
+            validator = Validator(client)
+            yield "validate_yaml_content", params, _time(
+                lambda: validator.validate_yaml_content(yaml_content, REGION, ZONE), repeat, setup=_clear_module_checks
+            )
+        if "validate_parsed" in cases:
+            validator = Validator(client)
+            yield "validate_parsed", params, _time(
+                lambda: validator.validate_parsed_blueprint(blueprint, REGION, ZONE), repeat, setup=_clear_module_checks
+            )
+        if "validate_parsed_memoized" in cases:
+            validator = Validator(client)
+            yield "validate_parsed_memoized", params, _time(
+                lambda: validator.validate_parsed_blueprint(blueprint, REGION, ZONE), repeat
+            )
+        if "estimate_cost" in cases:
+            yield "estimate_cost", {**params, "skus": sku_count}, _time(
+                lambda: estimate_cost(extracted, REGION, ZONE, client), repeat
+            )
+
+
+def run_catalog_cases(cases: list, client: FakeGcpClient, repeat: int, lookups: int):
+    """
+    Yields the results of the cases that scale with the SKU catalog size.
+    """
+    service_name = f"services/{COMPUTE_ENGINE_SERVICE_ID}"
+    skus = client.snapshot.skus(service_name)
+    params = {"skus": len(skus)}
+    if "sku_catalog_load" in cases:
+        yield "sku_catalog_load", params, _time(lambda: FakeGcpClient(client.snapshot).get_sku_index(service_name), repeat)
+    queries = _sku_queries(lookups)
+    if "find_sku" in cases:
+        index = client.get_sku_index(service_name)
+        yield "find_sku", params, _per_lookup(
+            _time(lambda: [_find_sku(index, keywords, region) for keywords, region in queries], repeat), len(queries)
+        )
+    if "find_sku_linear" in cases:
+        linear_queries = queries[: max(1, lookups * 1000 // len(skus))]
+        yield "find_sku_linear", params, _per_lookup(
+            _time(lambda: [_find_sku(skus, keywords, region) for keywords, region in linear_queries], repeat),
+            len(linear_queries),
+        )
+
+
+def run_builder_case(repeat: int):
+    # build_and_write_yaml reports every file it writes on stdout.
+    with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+        output_file = os.path.join(directory, "blueprint.yaml")
+        storage_configs = [
+            {"type": "filestore", "capacity_gb": 1024, "id": "homefs", "mount": "/home"},
+            {"type": "lustre", "capacity_gb": 18000, "id": "scratch", "mount": "/scratch"},
+        ]
+        yield "build_and_write_yaml", {}, _time(
+            lambda: YamlBuilder().build_and_write_yaml(
+                output_file, "bench", "bench", "synthetic-project", REGION, ZONE, "a2-highgpu-1g", 4,
+                gpu_type="nvidia-tesla-a100", gpu_count=1, storage_configs=storage_configs,
+            ),
+            repeat,
+            number=50,
+        )
+
+
+def _key(result: dict) -> str:
+    params = ",".join(f"{name}={value}" for name, value in sorted(result["params"].items()))
+    return f"{result['case']}[{params}]"
+
+
+def compare(results: list, baseline_path: str, threshold: float) -> list:
+    """
+    Prints every case's change against the same case of a baseline result file and returns
+    the keys of the cases that became slower by more than `threshold`.
+    """
+    with open(baseline_path) as f:
+        baseline = {_key(result): result for result in json.load(f)["results"]}
+    regressions = []
+    print()
+    print(f"{'case':48} {'baseline ms':>12} {'current ms':>12} {'change':>8}")
+    for result in results:
+        key = _key(result)
+        if key not in baseline:
+            print(f"{key:48} {'-':>12} {result['best_ms']:12.4f}")
+            continue
+        before, after = baseline[key]["best_ms"], result["best_ms"]
+        ratio = after / before if before else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(key)
+            flag = "  REGRESSION"
+        print(f"{key:48} {before:12.4f} {after:12.4f} {ratio - 1:+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", type=int, nargs="+", default=[1, 100, 1000, 5000])
+    parser.add_argument("--skus", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--lookups", type=int, default=500, help="SKU lookups per find_sku call.")
+    parser.add_argument("--output", help="Result file to write. Defaults to a timestamped file in benchmarks/results.")
+    parser.add_argument("--compare", help="An earlier result file to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Slowdown reported as a regression (0.10 = 10%%).")
+    args = parser.parse_args()
+
+    results = []
+
+    def record(case: str, params: dict, timing: dict):
+        result = {"case": case, "params": params, **timing}
+        results.append(result)
+        print(f"{_key(result):48} {result['best_ms']:12.4f} {result['median_ms']:12.4f} ms", flush=True)
+
+    print(f"{'case':48} {'best':>12} {'median':>12}")
+    for sku_count in args.skus:
+        client = FakeGcpClient(synthetic_snapshot(sku_count))
+        for timing in run_catalog_cases(args.cases, client, args.repeat, args.lookups):
+            record(*timing)
+        # Only estimate_cost depends on the catalog, so the other blueprint cases run with the first.
+        cases = args.cases if sku_count == args.skus[0] else [case for case in args.cases if case == "estimate_cost"]
+        for timing in run_blueprint_cases(cases, args.modules, client, sku_count, args.repeat):
+            record(*timing)
+    if "build_and_write_yaml" in args.cases:
+        for timing in run_builder_case(args.repeat):
+            record(*timing)
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("bench_suite-%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "created_at": time.time(),
+            "git_commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "libyaml": HAS_LIBYAML,
+            "arguments": {"modules": args.modules, "skus": args.skus, "repeat": args.repeat, "lookups": args.lookups},
+            "results": results,
+        }, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmarks YAML parsing and serialization of large generated blueprints with the
+pure-Python SafeLoader/SafeDumper and the libyaml CSafeLoader/CSafeDumper that
+src.yaml_io uses when available.
+
+Run from the `python` directory:
+
+    python -m benchmarks.bench_yaml --modules 100 1000 5000
+"""
+
+import argparse
+import time
+
+import yaml
+
+from benchmarks.synthetic import make_blueprint
+from src import yaml_io
+
+
+def _best_of(repeat: int, fn) -> tuple:
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pure_only = not yaml_io.HAS_LIBYAML
+    if pure_only:
+        print("PyYAML was built without libyaml; src.yaml_io falls back to the pure-Python classes.")
+
+    print(f"{'modules':>8} {'KiB':>8} {'load py ms':>11} {'load C ms':>10} {'dump py ms':>11} {'dump C ms':>10}")
+    for module_count in args.modules:
+        blueprint = make_blueprint(module_count)
+        text = yaml.dump(blueprint, Dumper=yaml.SafeDumper, sort_keys=False)
+
+        load_py, parsed_py = _best_of(args.repeat, lambda: yaml.load(text, Loader=yaml.SafeLoader))
+        dump_py, dumped_py = _best_of(args.repeat, lambda: yaml.dump(blueprint, Dumper=yaml.SafeDumper, sort_keys=False))
+        if pure_only:
+            load_c = dump_c = float("nan")
+        else:
+            load_c, parsed_c = _best_of(args.repeat, lambda: yaml.load(text, Loader=yaml.CSafeLoader))
+            dump_c, dumped_c = _best_of(args.repeat, lambda: yaml.dump(blueprint, Dumper=yaml.CSafeDumper, sort_keys=False))
+            if parsed_c != parsed_py or yaml.load(dumped_c, Loader=yaml.CSafeLoader) != blueprint:
+                raise SystemExit(f"libyaml and pure-Python results differ for {module_count} modules.")
+        if parsed_py != blueprint or yaml.load(dumped_py, Loader=yaml.SafeLoader) != blueprint:
+            raise SystemExit(f"The YAML round trip changed the blueprint for {module_count} modules.")
+
+        print(
+            f"{module_count:8} {len(text) / 1024:8.0f} {load_py * 1000:11.1f} {load_c * 1000:10.1f}"
+            f" {dump_py * 1000:11.1f} {dump_c * 1000:10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
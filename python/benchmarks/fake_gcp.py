@@ -0,0 +1,235 @@
+"""
+An in-memory stand-in for the Google Cloud catalog, for the benchmarks in this directory.
+
+synthetic_snapshot generates a CatalogSnapshot of zones, machine types, accelerators,
+storage locations, billing SKUs and a quota table at a given scale. FakeGcpClient is the
+OfflineGcpClient serving it, so everything above the upstream calls (the caches,
+single-flight, SKU indexes and price tables) runs as it does in production.
+FakeAsyncGcpClient is its asyncio counterpart. Both answer immediately unless given an
+UpstreamModel, which delays every upstream call and makes some of them fail.
+"""
+
+import asyncio
+import functools
+import math
+import random
+import time
+from typing import Callable, Optional, Tuple, Union
+
+from google.api_core.exceptions import GoogleAPIError, ServiceUnavailable
+
+from benchmarks.synthetic import REGIONS, make_machine_types, make_sku, make_skus
+from src.catalog_records import MachineTypeRecord, SkuRecord
+from src.catalog_snapshot import SNAPSHOT_FORMAT, SNAPSHOT_VERSION, CatalogSnapshot, _encode_machine_type, _encode_sku
+from src.cost_estimator import COMPUTE_ENGINE_SERVICE_ID, FILESTORE_SERVICE_ID
+from src.gcp_client import STORAGE_SERVICE_NAMES
+from src.offline_gcp_client import OfflineAsyncGcpClient, OfflineGcpClient
+from src.quota_table import (
+    CPU_QUOTA_METRIC,
+    CPUS_PER_VM_FAMILY_QUOTA_METRIC,
+    GPUS_PER_GPU_FAMILY_QUOTA_METRIC,
+    STORAGE_QUOTA_METRICS,
+    TPU_QUOTA_METRICS,
+    QuotaTable,
+)
+
+SYNTHETIC_PROJECT = "synthetic-project"
+ZONE_SUFFIXES = ("a", "b", "c")
+ZONE_GPUS = ["nvidia-tesla-a100", "nvidia-l4", "nvidia-tesla-t4"]
+FILESTORE_TIERS = ["Zonal", "Regional", "Basic HDD", "Enterprise"]
+
+# Large enough that no synthetic blueprint fails a quota check.
+QUOTA_LIMIT = 10**9
+
+# The largest page the Cloud Billing API returns from services.skus.list.
+SKU_PAGE_SIZE = 5000
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Parses a latency distribution, in seconds, into a sampler taking a random.Random:
+
+      0.05                    constant
+      uniform:LOW,HIGH        uniform between LOW and HIGH
+      exponential:MEAN        exponential with mean MEAN
+      lognormal:MEDIAN,SIGMA  log-normal with median MEDIAN, SIGMA being the standard
+                              deviation of its logarithm (0.5 gives a p99 of about 3.2x
+                              the median)
+    """
+    kind, _, params = spec.partition(":")
+    try:
+        if not params:
+            delay = float(kind)
+            return lambda rng: delay
+        values = [float(value) for value in params.split(",")]
+        if kind == "uniform":
+            low, high = values
+            return lambda rng: rng.uniform(low, high)
+        if kind == "exponential":
+            (mean,) = values
+            return lambda rng: rng.expovariate(1 / mean) if mean else 0.0
+        if kind == "lognormal":
+            median, sigma = values
+            mu = math.log(median)
+            return lambda rng: rng.lognormvariate(mu, sigma)
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid latency distribution '{spec}'.")
+
+
+class UpstreamModel:
+    """
+    The latency and failures of a fake Google Cloud backend, applied by wrapping upstream
+    calls (see `delayed`). Every call waits a delay drawn from `latency` (see
+    parse_latency) for each round trip it would make, e.g. one per SKU_PAGE_SIZE SKUs
+    listed, and then fails with ServiceUnavailable with probability `error_rate`.
+    """
+
+    def __init__(self, latency: str = "0", error_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self._sample = parse_latency(latency)
+        self._rng = random.Random(seed)
+
+    def draw(self, method: str, round_trips: int = 1) -> Tuple[float, Optional[GoogleAPIError]]:
+        """
+        Returns the delay of one call of `method` and the error it fails with, if any.
+        """
+        delay = sum(self._sample(self._rng) for _ in range(round_trips))
+        if self.error_rate and self._rng.random() < self.error_rate:
+            return delay, ServiceUnavailable(f"Injected failure of the fake '{method}' call.")
+        return delay, None
+
+    def delayed(self, method: str, fetch: Callable, round_trips: Union[int, Callable[..., int]] = 1) -> Callable:
+        """
+        Returns `fetch` delayed and failing as this model says. `round_trips` is a count,
+        or a function of the call's arguments returning one.
+        """
+
+        @functools.wraps(fetch)
+        def call(*args, **kwargs):
+            delay, error = self.draw(method, round_trips(*args) if callable(round_trips) else round_trips)
+            if delay:
+                time.sleep(delay)
+            if error is not None:
+                raise error
+            return fetch(*args, **kwargs)
+
+        return call
+
+    def delayed_async(self, method: str, fetch: Callable, round_trips: Union[int, Callable[..., int]] = 1) -> Callable:
+        """
+        The asyncio counterpart of `delayed`: the returned coroutine function waits on the
+        event loop, then calls the synchronous `fetch`.
+        """
+
+        @functools.wraps(fetch)
+        async def call(*args, **kwargs):
+            delay, error = self.draw(method, round_trips(*args) if callable(round_trips) else round_trips)
+            if delay:
+                await asyncio.sleep(delay)
+            if error is not None:
+                raise error
+            return fetch(*args, **kwargs)
+
+        return call
+
+
+def synthetic_snapshot(sku_count: int = 10000, seed: int = 0, project_id: str = SYNTHETIC_PROJECT) -> CatalogSnapshot:
+    """
+    Returns the catalog snapshot of a synthetic project: `sku_count` Compute Engine SKUs
+    spread over REGIONS, Filestore capacity SKUs in every region, the same machine types
+    and accelerators in every zone of every region, and quotas no blueprint exceeds.
+    """
+    machine_types = [_encode_machine_type(MachineTypeRecord.from_message(mt)) for mt in make_machine_types()]
+    zones = {
+        f"{region}-{suffix}": {"machine_types": machine_types, "gpus": [[gpu, 8] for gpu in ZONE_GPUS], "tpus": []}
+        for region in REGIONS
+        for suffix in ZONE_SUFFIXES
+    }
+    filestore_skus = []
+    for region in REGIONS:
+        for tier in FILESTORE_TIERS:
+            filestore_skus.append(make_sku(
+                len(filestore_skus), f"Filestore {tier} Capacity in {region}", [region], 0.2, "gibibyte month",
+                service_id=FILESTORE_SERVICE_ID,
+            ))
+    quota_metrics = [
+        CPU_QUOTA_METRIC,
+        CPUS_PER_VM_FAMILY_QUOTA_METRIC,
+        GPUS_PER_GPU_FAMILY_QUOTA_METRIC,
+        *TPU_QUOTA_METRICS.values(),
+        *STORAGE_QUOTA_METRICS.values(),
+    ]
+    return CatalogSnapshot({
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "project_id": project_id,
+        "created_at": time.time(),
+        "zones": zones,
+        "storage": {service: list(REGIONS) for service in STORAGE_SERVICE_NAMES},
+        "skus": {
+            f"services/{COMPUTE_ENGINE_SERVICE_ID}": [
+                _encode_sku(SkuRecord.from_message(sku)) for sku in make_skus(sku_count, seed)
+            ],
+            f"services/{FILESTORE_SERVICE_ID}": [_encode_sku(SkuRecord.from_message(sku)) for sku in filestore_skus],
+        },
+        "quotas": {"limits": [[metric, {}, QUOTA_LIMIT] for metric in quota_metrics], "preferences": []},
+        "collection_errors": [],
+    })
+
+
+def _sku_pages(snapshot: CatalogSnapshot, service_name: str) -> int:
+    return max(1, math.ceil(len(snapshot.skus(service_name) or ()) / SKU_PAGE_SIZE))
+
+
+class FakeGcpClient(OfflineGcpClient):
+    """
+    The OfflineGcpClient of a synthetic snapshot, for any project: every project gets the
+    snapshot's quotas. With `upstream`, every upstream call is delayed and may fail as
+    that model says.
+    """
+
+    def __init__(self, snapshot: CatalogSnapshot, project_id: str = None, upstream: Optional[UpstreamModel] = None, **kwargs):
+        super().__init__(snapshot, project_id=project_id, **kwargs)
+        self.upstream = upstream
+        if upstream is None:
+            return
+        round_trips = {
+            # Machine types and accelerator types are two calls, as are quota infos and preferences.
+            "zone_snapshot": 2,
+            "tpus": 1,
+            "storage_locations": 1,
+            "skus": functools.partial(_sku_pages, snapshot),
+            "quota_table": 2,
+            "aggregated_machine_types": 1,
+            "aggregated_gpus": 1,
+        }
+        for method, count in round_trips.items():
+            hook = f"_fetch_{method}"
+            setattr(self, hook, upstream.delayed(method, getattr(self, hook), count))
+
+    def _fetch_quota_table(self, project_id: str) -> QuotaTable:
+        return super()._fetch_quota_table(self.snapshot.project_id)
+
+
+class FakeAsyncGcpClient(OfflineAsyncGcpClient):
+    """
+    The asyncio counterpart of FakeGcpClient, waiting on the event loop instead of a thread.
+    """
+
+    def __init__(self, gcp_client: FakeGcpClient):
+        super().__init__(gcp_client)
+        upstream = gcp_client.upstream
+        if upstream is None:
+            return
+        round_trips = {
+            "tpus": 1,
+            "storage_locations": 1,
+            "skus": functools.partial(_sku_pages, gcp_client.snapshot),
+            "quota_table": 2,
+        }
+        for method, count in round_trips.items():
+            # The undelayed lookup of the synchronous client, so that only the event loop waits.
+            fetch = getattr(type(gcp_client), f"_fetch_{method}").__get__(gcp_client)
+            setattr(self, f"_fetch_{method}", upstream.delayed_async(method, fetch, count))
@@ -0,0 +1,338 @@
+"""
+Load test of the API against a fake Google Cloud backend. For each --workers count, starts
+uvicorn with benchmarks/load_test_app.py, then drives /validate and /cost (--endpoints) at
+each --concurrency level for --duration seconds, after --warmup seconds whose requests
+are not counted, and reports the throughput and p50/p95/p99 latency of every endpoint.
+
+Every concurrent client sends its next request as soon as the previous one is answered,
+over one kept-alive HTTP/1.1 connection (or a new connection per request with
+--connections close), cycling through --blueprints distinct synthetic blueprints of
+--modules modules spread over --zones zones. Repeated blueprints are answered from the
+response cache, so make --blueprints larger than the number of requests to measure
+uncached validation and pricing.
+
+The fake backend serves a catalog of --skus Compute Engine SKUs. Every upstream round
+trip waits a delay drawn from --latency and fails with probability --error-rate:
+
+  --latency 0.05                    constant 50 ms
+  --latency uniform:0.02,0.2        uniform between 20 and 200 ms
+  --latency exponential:0.05        exponential with a 50 ms mean
+  --latency lognormal:0.08,0.5      log-normal with an 80 ms median
+
+Catalog data is cached by every worker after its first requests, so upstream latency
+mostly shows in the warm-up, unless the cache TTLs are lowered through the usual
+environment variables (SKU_CACHE_TTL_SECONDS, ZONE_CACHE_TTL_SECONDS, ...), which the
+server inherits. The "client cpu" column is the share of one core the load generator
+used; near 100% it is the bottleneck rather than the server.
+
+With more than one worker, uvicorn binds its socket without TCP_NODELAY, so responses on
+kept-alive connections (as from a load balancer) can stall for a delayed ACK, about 40 ms
+on Linux. Compare with --connections close to tell that apart from server time.
+
+Results are written as JSON to benchmarks/results/ (or --output). Run from the `python`
+directory:
+
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --workers 1 2 4 --concurrency 8 32 128 --latency lognormal:0.08,0.5
+    python -m benchmarks.load_test --endpoints cost --skus 100000 --error-rate 0.01 --blueprints 100000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from benchmarks.bench_suite import RESULTS_DIR, _git_commit
+from benchmarks.fake_gcp import ZONE_SUFFIXES, parse_latency
+from benchmarks.synthetic import REGIONS, make_blueprint
+from src.yaml_io import dump_yaml
+
+ENDPOINTS = ["validate", "cost"]
+HOST = "127.0.0.1"
+PYTHON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class HttpConnection:
+    """
+    A minimal HTTP/1.1 client connection, so the load generator spends little time per
+    request and needs nothing beyond asyncio. Unless `keep_alive` is false, the connection
+    is reused for the next request.
+    """
+
+    def __init__(self, host: str, port: int, keep_alive: bool = True):
+        self.host = host
+        self.port = port
+        self.keep_alive = keep_alive
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def post(self, path: str, body: bytes) -> int:
+        """
+        Sends a JSON POST request and returns the response status, reading and discarding
+        the body. The connection is closed if the request fails.
+        """
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            self.writer.write(
+                b"POST %s HTTP/1.1\r\nHost: %s\r\nConnection: %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n"
+                % (path.encode(), self.host.encode(), b"keep-alive" if self.keep_alive else b"close", len(body))
+                + body
+            )
+            await self.writer.drain()
+            return await self._read_response()
+        except Exception:
+            self.close()
+            raise
+
+    async def _read_response(self) -> int:
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("The server closed the connection.")
+        status = int(status_line.split()[1])
+        length, chunked, close = 0, False, False
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.partition(b":")
+            name = name.strip().lower()
+            if name == b"content-length":
+                length = int(value)
+            elif name == b"transfer-encoding":
+                chunked = b"chunked" in value.lower()
+            elif name == b"connection":
+                close = b"close" in value.lower()
+        if chunked:
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif length:
+            await self.reader.readexactly(length)
+        if close or not self.keep_alive:
+            self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+def make_payloads(count: int, module_count: int, zone_count: int) -> List[bytes]:
+    """
+    Returns `count` distinct /validate and /cost request bodies, spread over the first
+    `zone_count` zones of the synthetic catalog.
+    """
+    zones = [f"{region}-{suffix}" for region in REGIONS for suffix in ZONE_SUFFIXES][: max(1, zone_count)]
+    payloads = []
+    for index in range(count):
+        blueprint = make_blueprint(module_count, seed=index)
+        zone = zones[index % len(zones)]
+        region = zone.rsplit("-", 1)[0]
+        blueprint["vars"].update(region=region, zone=zone)
+        payloads.append(json.dumps({"yaml_content": dump_yaml(blueprint), "region": region, "zone": zone}).encode())
+    return payloads
+
+
+def _percentiles(latencies: List[float]) -> Dict[str, float]:
+    if not latencies:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    if len(latencies) == 1:
+        cuts = latencies * 99
+    else:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {"p50_ms": cuts[49] * 1e3, "p95_ms": cuts[94] * 1e3, "p99_ms": cuts[98] * 1e3, "max_ms": max(latencies) * 1e3}
+
+
+async def run_level(
+    port: int, endpoints: List[str], payloads: List[bytes], concurrency: int, duration: float, warmup: float, keep_alive: bool
+) -> dict:
+    """
+    Runs `concurrency` closed-loop clients for `warmup` + `duration` seconds and returns
+    the responses completed in the last `duration` seconds: {endpoint: (latencies, status counts)}.
+    """
+    latencies: Dict[str, List[float]] = {endpoint: [] for endpoint in endpoints}
+    statuses: Dict[str, Counter] = {endpoint: Counter() for endpoint in endpoints}
+    measure_from = time.perf_counter() + warmup
+    stop = measure_from + duration
+
+    async def client(index: int):
+        connection = HttpConnection(HOST, port, keep_alive)
+        sent = index
+        while time.perf_counter() < stop:
+            endpoint = endpoints[sent % len(endpoints)]
+            body = payloads[(sent // len(endpoints)) % len(payloads)]
+            sent += concurrency
+            start = time.perf_counter()
+            try:
+                status = await connection.post(f"/{endpoint}", body)
+            except (OSError, ValueError, IndexError, asyncio.IncompleteReadError) as e:
+                status = type(e).__name__
+            end = time.perf_counter()
+            if measure_from <= start and end <= stop:
+                latencies[endpoint].append(end - start)
+                statuses[endpoint][status] += 1
+        connection.close()
+
+    await asyncio.gather(*(client(index) for index in range(concurrency)))
+    return {endpoint: (latencies[endpoint], statuses[endpoint]) for endpoint in endpoints}
+
+
+def _summarize(latencies: List[float], statuses: Counter, duration: float) -> dict:
+    requests = sum(statuses.values())
+    return {
+        "requests": requests,
+        "errors": requests - statuses.get(200, 0),
+        "throughput_rps": requests / duration,
+        **_percentiles(latencies),
+        "statuses": {str(status): count for status, count in statuses.items()},
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, workers: int, port: int, log) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "FAKE_GCP_SKUS": str(args.skus),
+        "FAKE_GCP_LATENCY": args.latency,
+        "FAKE_GCP_ERROR_RATE": str(args.error_rate),
+    }
+    command = [
+        sys.executable, "-m", "uvicorn", "benchmarks.load_test_app:app", "--host", HOST, "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+    ]
+    return subprocess.Popen(command, env=env, cwd=PYTHON_DIR, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_until_ready(server: subprocess.Popen, port: int, timeout: float = 120.0):
+    """
+    Waits until the server answers GET /. Workers that are still starting do not accept
+    connections, so the warm-up of the first level also covers them.
+    """
+    deadline = time.monotonic() + timeout
+    request = f"GET / HTTP/1.1\r\nHost: {HOST}\r\nConnection: close\r\n\r\n".encode()
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"The server exited with {server.returncode} before it was ready; see --server-log.")
+        try:
+            with socket.create_connection((HOST, port), timeout=1) as s:
+                s.sendall(request)
+                if s.recv(64).startswith(b"HTTP/1.1 200"):
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"The server did not answer within {timeout:.0f} s.")
+
+
+def stop_server(server: subprocess.Popen):
+    server.terminate()
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="uvicorn worker counts.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128], help="Concurrent clients.")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument("--duration", type=float, default=15.0, help="Measured seconds per level.")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds before each level.")
+    parser.add_argument("--blueprints", type=int, default=200, help="Distinct blueprints the clients cycle through.")
+    parser.add_argument("--modules", type=int, default=20, help="Modules per blueprint.")
+    parser.add_argument("--zones", type=int, default=3, help="Zones the blueprints are spread over.")
+    parser.add_argument("--skus", type=int, default=10000, help="Compute Engine SKUs in the fake catalog.")
+    parser.add_argument("--latency", default="lognormal:0.08,0.5", help="Latency of every upstream round trip, in seconds.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of upstream calls that fail.")
+    parser.add_argument("--connections", choices=["keep-alive", "close"], default="keep-alive")
+    parser.add_argument("--server-log", default=os.devnull, help="File for the server's output.")
+    parser.add_argument("--output", help="Result file to write. Defaults to a timestamped file in benchmarks/results.")
+    args = parser.parse_args()
+    try:
+        parse_latency(args.latency)
+    except ValueError as e:
+        parser.error(str(e))
+
+    payloads = make_payloads(args.blueprints, args.modules, args.zones)
+    rows = [*args.endpoints, "all"] if len(args.endpoints) > 1 else args.endpoints
+    results = []
+
+    print(
+        f"{'workers':>7} {'clients':>7} {'endpoint':10} {'requests':>9} {'errors':>7} {'req/s':>9}"
+        f" {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'client cpu':>11}"
+    )
+    with open(args.server_log, "a") as log:
+        for workers in args.workers:
+            port = _free_port()
+            server = start_server(args, workers, port, log)
+            try:
+                wait_until_ready(server, port)
+                for concurrency in args.concurrency:
+                    cpu_start = time.process_time()
+                    level = asyncio.run(run_level(
+                        port, args.endpoints, payloads, concurrency, args.duration, args.warmup, args.connections == "keep-alive"
+                    ))
+                    client_cpu = (time.process_time() - cpu_start) / (args.duration + args.warmup)
+                    level["all"] = (
+                        [latency for latencies, _ in level.values() for latency in latencies],
+                        sum((statuses for _, statuses in level.values()), Counter()),
+                    )
+                    for endpoint in rows:
+                        result = {
+                            "workers": workers,
+                            "concurrency": concurrency,
+                            "endpoint": endpoint,
+                            **_summarize(*level[endpoint], args.duration),
+                            "client_cpu": client_cpu,
+                        }
+                        results.append(result)
+                        print(
+                            f"{workers:7} {concurrency:7} {'/' + endpoint:10} {result['requests']:9} {result['errors']:7}"
+                            f" {result['throughput_rps']:9.1f} {result['p50_ms']:9.1f} {result['p95_ms']:9.1f}"
+                            f" {result['p99_ms']:9.1f} {result['max_ms']:9.1f} {client_cpu:10.0%}",
+                            flush=True,
+                        )
+            finally:
+                stop_server(server)
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("load_test-%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "created_at": time.time(),
+            "git_commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "arguments": {
+                key: getattr(args, key)
+                for key in (
+                    "duration", "warmup", "blueprints", "modules", "zones", "skus", "latency", "error_rate", "connections"
+                )
+            },
+            "results": results,
+        }, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
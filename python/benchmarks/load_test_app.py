@@ -0,0 +1,35 @@
+"""
+The API app of the load test (benchmarks/load_test.py): src.main's app with every
+project's clients backed by a FakeGcpClient, so no request reaches Google Cloud.
+
+uvicorn imports this module in every worker process, so the fake backend is configured
+through the environment:
+
+  FAKE_GCP_SKUS        Compute Engine SKUs in the synthetic catalog (default 10000)
+  FAKE_GCP_LATENCY     latency distribution of every upstream round trip, see
+                       benchmarks.fake_gcp.parse_latency (default 0)
+  FAKE_GCP_ERROR_RATE  fraction of upstream calls that fail with ServiceUnavailable
+                       (default 0)
+
+Run from the `python` directory:
+
+    FAKE_GCP_LATENCY=lognormal:0.08,0.5 uvicorn benchmarks.load_test_app:app --workers 4
+"""
+
+import os
+
+from benchmarks.fake_gcp import FakeAsyncGcpClient, FakeGcpClient, UpstreamModel, synthetic_snapshot
+from src import dependencies
+from src.main import app
+
+snapshot = synthetic_snapshot(int(os.getenv("FAKE_GCP_SKUS", 10000)))
+upstream = UpstreamModel(os.getenv("FAKE_GCP_LATENCY", "0"), float(os.getenv("FAKE_GCP_ERROR_RATE", 0)))
+
+
+def create_fake_gcp_client(project_id: str = None) -> FakeGcpClient:
+    return FakeGcpClient(snapshot, project_id=project_id, upstream=upstream)
+
+
+# The dependency getters look these factories up when they first create a project's clients.
+dependencies.create_gcp_client = create_fake_gcp_client
+dependencies.create_async_gcp_client = FakeAsyncGcpClient
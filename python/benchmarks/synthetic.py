@@ -0,0 +1,183 @@
+"""
+Synthetic catalog data for the benchmarks in this directory.
+
+The objects mirror the attribute shape of the billing_v1 and compute_v1 protobuf
+messages the Google Cloud clients return, so they can stand in for upstream responses,
+which GcpClient converts to catalog records.
+"""
+
+import random
+from types import SimpleNamespace
+from typing import List
+
+REGIONS = [
+    "us-central1", "us-east1", "us-east4", "us-west1", "us-west2", "us-west4",
+    "europe-west1", "europe-west2", "europe-west3", "europe-west4", "europe-north1",
+    "asia-east1", "asia-northeast1", "asia-southeast1", "australia-southeast1",
+    "southamerica-east1",
+]
+
+MACHINE_SERIES = ["N1", "N2", "N2D", "E2", "C2", "C2D", "C3", "C3D", "H3", "M1", "M2", "M3", "A2", "A3", "G2"]
+GPU_TYPES = ["A100", "A100 80GB", "H100", "H100 80GB", "L4", "T4", "V100", "P4", "P100", "K80"]
+LOCATIONS = ["Americas", "EMEA", "APAC", "Virginia", "Belgium", "Tokyo", "Sydney", "Iowa"]
+PREFIXES = ["", "Spot Preemptible ", "Commitment v1: ", "Sole Tenancy ", "Custom "]
+
+
+def _money(price: float) -> SimpleNamespace:
+    units = int(price)
+    return SimpleNamespace(currency_code="USD", units=units, nanos=int(round((price - units) * 1e9)))
+
+
+def make_sku(
+    sku_id: int, description: str, regions: List[str], price: float, usage_unit: str, service_id: str = "6F81-5844-456A"
+) -> SimpleNamespace:
+    tier = SimpleNamespace(start_usage_amount=0.0, unit_price=_money(price))
+    expression = SimpleNamespace(
+        usage_unit=usage_unit.split()[0],
+        usage_unit_description=usage_unit,
+        base_unit_conversion_factor=1.0,
+        display_quantity=1.0,
+        tiered_rates=[tier],
+    )
+    return SimpleNamespace(
+        name=f"services/{service_id}/skus/{sku_id:04X}-{sku_id:04X}-{sku_id:04X}",
+        sku_id=f"{sku_id:04X}-{sku_id:04X}-{sku_id:04X}",
+        description=description,
+        service_regions=regions,
+        pricing_info=[SimpleNamespace(pricing_expression=expression)],
+    )
+
+
+def make_skus(count: int, seed: int = 0) -> list:
+    """
+    Generates `count` compute-style SKUs spread over REGIONS.
+    """
+    rng = random.Random(seed)
+    skus = []
+    for sku_id in range(count):
+        kind = rng.random()
+        prefix = rng.choice(PREFIXES)
+        location = rng.choice(LOCATIONS)
+        if kind < 0.35:
+            series = rng.choice(MACHINE_SERIES)
+            core = rng.choice(["Instance Core", "Predefined vCPU"])
+            description = f"{prefix}{series} {core} running in {location}"
+            usage_unit = "hour"
+        elif kind < 0.7:
+            series = rng.choice(MACHINE_SERIES)
+            description = f"{prefix}{series} Instance Ram running in {location}"
+            usage_unit = "gibibyte hour"
+        elif kind < 0.85:
+            gpu = rng.choice(GPU_TYPES)
+            description = f"{prefix}Nvidia Tesla {gpu} GPU running in {location}"
+            usage_unit = "hour"
+        else:
+            tier = rng.choice(["Zonal", "Regional", "Basic HDD", "Enterprise"])
+            description = f"Filestore {tier} Capacity in {location}"
+            usage_unit = "gibibyte month"
+        regions = rng.sample(REGIONS, rng.randint(1, 4))
+        skus.append(make_sku(sku_id, description, regions, rng.uniform(0.001, 3.0), usage_unit))
+    return skus
+
+
+def make_machine_types() -> list:
+    """
+    Generates compute_v1.MachineType-shaped machine types for a zone, a few with fixed GPUs.
+    """
+    machine_types = []
+    for series in ("n1", "n2", "c2", "c3"):
+        for cpus in (2, 4, 8, 16, 32, 64):
+            machine_types.append(SimpleNamespace(
+                name=f"{series}-standard-{cpus}", guest_cpus=cpus, memory_mb=cpus * 4096, accelerators=[],
+            ))
+    for gpus in (1, 2, 4, 8):
+        accelerator = SimpleNamespace(guest_accelerator_type="nvidia-tesla-a100", guest_accelerator_count=gpus)
+        machine_types.append(SimpleNamespace(
+            name=f"a2-highgpu-{gpus}g", guest_cpus=12 * gpus, memory_mb=87040 * gpus, accelerators=[accelerator],
+        ))
+    return machine_types
+
+
+SAMPLE_BLUEPRINT = """
+blueprint_name: synthetic-cluster
+vars:
+  project_id: synthetic-project
+  deployment_name: synthetic-cluster
+  region: us-central1
+  zone: us-central1-a
+deployment_groups:
+- group: primary
+  modules:
+  - id: network
+    source: modules/network/vpc
+  - id: homefs
+    source: modules/file-system/filestore
+    settings:
+      capacity_gb: 1024
+      local_mount: /home
+  - id: compute
+    source: community/modules/compute/schedmd-slurm-gcp-v6-nodeset
+    settings:
+      machine_type: n2-standard-8
+      node_count_dynamic_max: 4
+  - id: gpu
+    source: community/modules/compute/schedmd-slurm-gcp-v6-nodeset
+    settings:
+      machine_type: a2-highgpu-1g
+      node_count_dynamic_max: 2
+      gpu:
+        type: nvidia-tesla-a100
+        count: 1
+"""
+
+
+def make_blueprint(module_count: int, seed: int = 0) -> dict:
+    """
+    Generates a blueprint with `module_count` compute and storage modules spread over groups.
+    """
+    rng = random.Random(seed)
+    machine_types = make_machine_types()
+    groups = []
+    for group_index in range(max(1, module_count // 50)):
+        groups.append({"group": f"group-{group_index}", "modules": []})
+    for module_index in range(module_count):
+        group = groups[module_index % len(groups)]
+        if rng.random() < 0.8:
+            machine_type = rng.choice(machine_types)
+            settings = {
+                "machine_type": machine_type.name,
+                "node_count_dynamic_max": rng.randint(1, 64),
+                "enable_placement": rng.random() < 0.5,
+                "instance_image": {"family": "slurm-gcp-6-8-hpc-rocky-linux-8", "project": "schedmd-slurm-public"},
+                "labels": {f"label-{i}": f"value-{rng.randint(0, 999)}" for i in range(4)},
+            }
+            if machine_type.accelerators:
+                accelerator = machine_type.accelerators[0]
+                settings["gpu"] = {
+                    "type": accelerator.guest_accelerator_type, "count": accelerator.guest_accelerator_count,
+                }
+            module = {
+                "id": f"nodeset-{module_index}",
+                "source": "community/modules/compute/schedmd-slurm-gcp-v6-nodeset",
+                "use": ["network"],
+                "settings": settings,
+            }
+        else:
+            storage_type = rng.choice(["filestore", "lustre", "parallelstore"])
+            module = {
+                "id": f"{storage_type}-{module_index}",
+                "source": f"modules/file-system/{storage_type}",
+                "use": ["network"],
+                "settings": {"capacity_gb": rng.choice([1024, 2560, 10240]), "local_mount": f"/mnt/{module_index}"},
+            }
+        group["modules"].append(module)
+    return {
+        "blueprint_name": "synthetic-large",
+        "vars": {
+            "project_id": "synthetic-project",
+            "deployment_name": "synthetic-large",
+            "region": "us-central1",
+            "zone": "us-central1-a",
+        },
+        "deployment_groups": groups,
+    }
@@ -0,0 +1,198 @@
+import asyncio
+import functools
+import threading
+import time
+from typing import Any, Awaitable, Callable, Iterable, List, Optional
+
+from google.api_core.exceptions import GoogleAPIError, NotFound
+from google.auth.credentials import Credentials
+from google.cloud import (
+    billing_v1,
+    cloudquotas_v1,
+    filestore_v1,
+    lustre_v1,
+    parallelstore_v1,
+    tpu_v2,
+)
+
+from src.catalog_cache import ZoneSnapshot
+from src.catalog_records import SkuRecord
+from src.gcp_client import STORAGE_SERVICE_NAMES, GcpClient, LazyClient
+from src.metrics import method_name, observe_upstream_call
+from src.quota_table import COMPUTE_QUOTA_SERVICE, QUOTA_SERVICES, QuotaTable
+from src.sku_index import SkuIndex
+from src.tracing import span
+
+
+class AsyncGcpClient:
+    """
+    An asyncio client for the same Google Cloud lookups as GcpClient.
+
+    Results are stored in the caches of the wrapped GcpClient, so synchronous code such as
+    Validator and estimate_cost that runs after an `await` of these methods is served
+    without upstream calls. The Compute Engine library has no asyncio transport, so
+    machine type and accelerator lookups run the blocking client in a worker thread.
+    """
+
+    tpu_client = LazyClient(tpu_v2.TpuAsyncClient)
+    billing_client = LazyClient(billing_v1.CloudCatalogAsyncClient)
+    quotas_client = LazyClient(cloudquotas_v1.CloudQuotasAsyncClient)
+    filestore_client = LazyClient(filestore_v1.CloudFilestoreManagerAsyncClient)
+    lustre_client = LazyClient(lustre_v1.LustreAsyncClient)
+    parallelstore_client = LazyClient(parallelstore_v1.ParallelstoreAsyncClient)
+
+    def __init__(self, gcp_client: GcpClient):
+        self.gcp_client = gcp_client
+        self.project_id = gcp_client.project_id
+        self._client_lock = threading.Lock()
+
+    @property
+    def credentials(self) -> Credentials:
+        return self.gcp_client.credentials
+
+    async def get_zone_snapshot(self, zone: str) -> ZoneSnapshot:
+        return await asyncio.to_thread(self.gcp_client.get_zone_snapshot, zone)
+
+    async def _call_once(self, fetch: Callable[..., Awaitable[Any]], *args) -> Any:
+        """
+        Awaits `fetch(*args)`, or an identical call already in flight. Keys are shared with
+        GcpClient._call_once, so coroutines also join calls made by the synchronous client.
+        """
+        method = method_name(fetch)
+
+        async def call():
+            with span(f"gcp.{method}"), observe_upstream_call(method):
+                return await fetch(*args)
+
+        return await self.gcp_client.single_flight.do_async((fetch.__name__, args), call)
+
+    async def _fetch_tpus(self, zone: str) -> list:
+        parent = f"projects/{self.project_id}/locations/{zone}"
+        request = tpu_v2.ListAcceleratorTypesRequest(parent=parent)
+        pager = await self.tpu_client.list_accelerator_types(request=request)
+        return [acc.type async for acc in pager]
+
+    async def get_available_tpus(self, zone: str) -> list:
+        try:
+            return await self._call_once(self._fetch_tpus, zone)
+        except (NotFound, GoogleAPIError) as e:
+            if "service is not enabled" not in str(e):
+                print(f"Could not fetch TPU types for zone '{zone}': {e}")
+            return []
+
+    async def _fetch_quota_table(self, project_id: str) -> QuotaTable:
+        """
+        Sweeps the quota infos of every quota service and the quota preferences concurrently.
+        """
+        parent = f"projects/{project_id}/locations/global"
+
+        async def list_quota_infos(service: str) -> list:
+            request = cloudquotas_v1.ListQuotaInfosRequest(parent=f"{parent}/services/{service}")
+            pager = await self.quotas_client.list_quota_infos(request=request)
+            return [info async for info in pager]
+
+        async def list_quota_preferences() -> list:
+            request = cloudquotas_v1.ListQuotaPreferencesRequest(parent=parent)
+            pager = await self.quotas_client.list_quota_preferences(request=request)
+            return [preference async for preference in pager]
+
+        quota_preferences, *service_results = await asyncio.gather(
+            list_quota_preferences(),
+            *(list_quota_infos(service) for service in QUOTA_SERVICES),
+            return_exceptions=True,
+        )
+        if isinstance(quota_preferences, BaseException):
+            raise quota_preferences
+        quota_infos = []
+        for service, result in zip(QUOTA_SERVICES, service_results):
+            if not isinstance(result, BaseException):
+                quota_infos.extend(result)
+                continue
+            # Quotas of the optional services are only enforced when they can be listed.
+            if service == COMPUTE_QUOTA_SERVICE or not isinstance(result, GoogleAPIError):
+                raise result
+            if "service is not enabled" not in str(result):
+                print(f"Could not fetch quotas of '{service}': {result}")
+        return QuotaTable.from_quota_infos(quota_infos, quota_preferences, time.time())
+
+    async def get_quota_table(self) -> Optional[QuotaTable]:
+        try:
+            return await self.gcp_client.quota_cache.get_async(
+                self.project_id, functools.partial(self._call_once, self._fetch_quota_table)
+            )
+        except GoogleAPIError as e:
+            print(f"Could not fetch quotas for project '{self.project_id}': {e}")
+            return None
+
+    async def _fetch_storage_locations(self, service: str) -> list:
+        client = {
+            "filestore": self.filestore_client,
+            "lustre": self.lustre_client,
+            "parallelstore": self.parallelstore_client,
+        }[service]
+        response = await client.list_locations(request={"name": f"projects/{self.project_id}"})
+        return [loc.location_id for loc in response.locations]
+
+    async def get_storage_locations(self, service: str) -> list:
+        try:
+            return await self.gcp_client.storage_cache.get_async(service, functools.partial(self._call_once, self._fetch_storage_locations))
+        except GoogleAPIError as e:
+            print(f"Error fetching {STORAGE_SERVICE_NAMES[service]} locations: {e}")
+            return []
+
+    async def _fetch_skus(self, service_name: str) -> list:
+        request = billing_v1.ListSkusRequest(parent=service_name)
+        pager = await self.billing_client.list_skus(request=request)
+        return [SkuRecord.from_message(sku) async for sku in pager]
+
+    async def get_skus(self, service_name: str) -> list:
+        try:
+            catalog = await self.gcp_client.sku_cache.get_async(service_name, functools.partial(self._call_once, self._fetch_skus))
+        except GoogleAPIError as e:
+            print(f"Error fetching SKUs for service '{service_name}': {e}")
+            return []
+        return catalog.skus
+
+    async def get_sku_index(self, service_name: str) -> SkuIndex:
+        try:
+            catalog = await self.gcp_client.sku_cache.get_async(service_name, functools.partial(self._call_once, self._fetch_skus))
+        except GoogleAPIError as e:
+            print(f"Error fetching SKUs for service '{service_name}': {e}")
+            return SkuIndex([])
+        # Building the index is CPU-bound, keep it off the event loop.
+        return await asyncio.to_thread(lambda: catalog.index)
+
+    async def prefetch_for_validation(self, zone: str, storage_services: Iterable[str]) -> None:
+        """
+        Concurrently warms everything Validator.validate_yaml_content reads for a zone.
+        """
+        await self.prefetch_zones([zone], storage_services, quotas=True)
+
+    async def prefetch_zones(self, zones: Iterable[str], storage_services: Iterable[str], quotas: bool = False) -> None:
+        """
+        Concurrently warms the snapshots of several zones, the given storage location lists and,
+        with `quotas` (everything validating blueprints in those zones reads), the quota table.
+        """
+        await asyncio.gather(
+            *(self.get_zone_snapshot(zone) for zone in set(zones)),
+            *(self.get_storage_locations(service) for service in set(storage_services)),
+            *([self.get_quota_table()] if quotas else []),
+        )
+
+    async def prefetch_for_analysis(self, zone: str, storage_services: Iterable[str], service_names: List[str]) -> None:
+        """
+        Concurrently warms everything both validation and cost estimation read for a zone.
+        """
+        await asyncio.gather(
+            self.prefetch_zones([zone], storage_services, quotas=True),
+            *(self.get_sku_index(service_name) for service_name in service_names),
+        )
+
+    async def prefetch_for_cost(self, zone: str, service_names: List[str]) -> None:
+        """
+        Concurrently warms everything estimate_cost reads for a zone and billing services.
+        """
+        await asyncio.gather(
+            self.get_zone_snapshot(zone),
+            *(self.get_sku_index(service_name) for service_name in service_names),
+        )
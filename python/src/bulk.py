@@ -0,0 +1,105 @@
+"""
+This module contains the helpers the CLI uses to process many blueprint files at once.
+"""
+
+import asyncio
+import glob
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List
+
+from src.tracing import span
+from src.yaml_io import YAMLError, load_yaml
+
+BLUEPRINT_EXTENSIONS = (".yaml", ".yml")
+
+# Exit codes of the bulk commands.
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_UNREADABLE = 2
+
+
+def expand_blueprint_paths(patterns: Iterable[str]) -> List[str]:
+    """
+    Expands files, directories (searched recursively for .yaml/.yml files) and glob
+    patterns into a sorted list of distinct blueprint paths.
+    """
+    paths = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True) if glob.has_magic(pattern) else [pattern]
+        for match in matches:
+            if os.path.isdir(match):
+                for root, _, filenames in os.walk(match):
+                    paths.update(
+                        os.path.join(root, filename)
+                        for filename in filenames
+                        if filename.endswith(BLUEPRINT_EXTENSIONS)
+                    )
+            elif os.path.isfile(match):
+                paths.add(match)
+    return sorted(paths)
+
+
+def parse_blueprint_file(path: str) -> Dict[str, Any]:
+    """
+    Reads and parses one blueprint file, returning {"path", "blueprint"} or {"path", "error"}.
+    """
+    try:
+        with open(path, "r") as f:
+            blueprint = load_yaml(f)
+    except (OSError, YAMLError) as e:
+        return {"path": path, "error": f"Could not read blueprint: {e}"}
+    if not isinstance(blueprint, dict):
+        return {"path": path, "error": "YAML content is empty or invalid."}
+    return {"path": path, "blueprint": blueprint}
+
+
+def parse_blueprint_files(paths: List[str], jobs: int = 1) -> List[Dict[str, Any]]:
+    """
+    Parses blueprint files in path order, with a pool of `jobs` worker processes when jobs > 1.
+
+    Workers are spawned rather than forked, so they never inherit the gRPC state of a
+    process that has already talked to Google Cloud.
+    """
+    if jobs <= 1 or len(paths) <= 1:
+        return [parse_blueprint_file(path) for path in paths]
+    workers = min(jobs, len(paths))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return list(executor.map(parse_blueprint_file, paths, chunksize=max(1, len(paths) // (workers * 4))))
+
+
+def blueprint_location(blueprint: Dict[str, Any], region: str = None, zone: str = None) -> tuple:
+    """
+    Returns the (region, zone) to check a blueprint against: the given ones, else its vars.
+    A missing zone defaults to the region's "-a" zone.
+    """
+    variables = blueprint.get("vars", {})
+    region = region or variables.get("region")
+    zone = zone or variables.get("zone") or (f"{region}-a" if region else None)
+    return region, zone
+
+
+def prefetch_catalog(
+    gcp_client,
+    zones: Iterable[str],
+    storage_services: Iterable[str] = (),
+    service_names: Iterable[str] = (),
+    quotas: bool = False,
+):
+    """
+    Fetches every zone snapshot, storage location list, SKU index and (with `quotas`) the
+    quota table a run needs concurrently and once, into the caches of `gcp_client`.
+    """
+    # Imported here so that parse workers, which import this module, never load the Google Cloud stack.
+    from src.offline_gcp_client import create_async_gcp_client
+
+    async def prefetch():
+        async_client = create_async_gcp_client(gcp_client)
+        await asyncio.gather(
+            async_client.prefetch_zones(zones, storage_services, quotas=quotas),
+            *(async_client.get_sku_index(service_name) for service_name in set(service_names)),
+        )
+
+    with span("prefetch"):
+        asyncio.run(prefetch())
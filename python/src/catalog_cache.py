@@ -0,0 +1,296 @@
+"""
+This module contains the in-process caches for Google Cloud catalog data.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+from cachetools import TTLCache
+
+from src.catalog_records import SkuRecord
+from src.price_table import PriceTable
+from src.response_cache import canonical_hash
+from src.sku_index import SkuIndex
+
+
+def _sku_fingerprint(sku: SkuRecord) -> list:
+    return [sku.sku_id, sku.description, list(sku.service_regions), [list(tier) for tier in sku.tiers]]
+
+
+class SkuCatalog:
+    """
+    A fetched billing catalog (of SkuRecords) for one service, with its price table and
+    lazily built description index.
+    """
+
+    def __init__(self, skus: list, fetched_at: float):
+        self.skus = skus
+        self.fetched_at = fetched_at
+        self.prices = PriceTable(skus)
+        self._index = None
+        self._index_lock = threading.Lock()
+        self._version = None
+
+    @property
+    def index(self) -> SkuIndex:
+        """
+        The inverted description index over the whole catalog, built on first use.
+        """
+        if self._index is None:
+            with self._index_lock:
+                if self._index is None:
+                    self._index = SkuIndex(self.skus)
+        return self._index
+
+    @property
+    def version(self) -> str:
+        """
+        A digest of the catalog's SKUs and prices, equal for catalogs with the same content.
+        """
+        if self._version is None:
+            self._version = canonical_hash([_sku_fingerprint(sku) for sku in self.skus])
+        return self._version
+
+
+class ZoneSnapshot:
+    """
+    The machine types (with their accelerator pairings) and GPU types of one zone.
+    """
+
+    def __init__(self, zone: str, machine_types: list, gpus: List[str], fetched_at: float):
+        self.zone = zone
+        self.machine_types: Dict[str, Any] = {mt.name: mt for mt in machine_types}
+        self.gpus = gpus
+        self.fetched_at = fetched_at
+        self.pairings: Dict[str, List[Dict[str, Any]]] = {
+            mt.name: [
+                {"accelerator_type": acc.guest_accelerator_type, "accelerator_count": acc.guest_accelerator_count}
+                for acc in mt.accelerators
+            ]
+            for mt in machine_types
+            if mt.accelerators
+        }
+        # A digest of the snapshot's content, so results derived from it can be keyed by it
+        # and stay valid when an identical snapshot is refetched.
+        self.version = canonical_hash([
+            sorted([mt.name, mt.guest_cpus, mt.memory_mb] for mt in machine_types),
+            self.pairings,
+            sorted(gpus),
+        ])
+
+    @property
+    def machine_type_names(self) -> List[str]:
+        return list(self.machine_types)
+
+
+class BoundedTTLCache:
+    """
+    A thread-safe LRU cache whose entries also expire after `ttl_seconds`.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl_seconds)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key: Hashable):
+        with self._lock:
+            try:
+                value = self._cache[key]
+                self.hits += 1
+                return value, True
+            except KeyError:
+                self.misses += 1
+                return None, False
+
+    def get(self, key: Hashable, loader: Callable[[Hashable], Any]) -> Any:
+        """
+        Returns the cached value for `key`, calling `loader(key)` on a miss.
+        Loader errors are propagated and nothing is cached.
+        """
+        value, found = self._lookup(key)
+        if found:
+            return value
+        value = loader(key)
+        with self._lock:
+            self._cache[key] = value
+        return value
+
+    async def get_async(self, key: Hashable, loader: Callable[[Hashable], Awaitable[Any]]) -> Any:
+        """
+        The asyncio counterpart of `get`, for a coroutine `loader`.
+        """
+        value, found = self._lookup(key)
+        if found:
+            return value
+        value = await loader(key)
+        with self._lock:
+            self._cache[key] = value
+        return value
+
+    def peek(self, key: Hashable) -> Any:
+        """
+        Returns the cached value for `key`, or None, without counting a hit or a miss.
+        """
+        with self._lock:
+            return self._cache.get(key)
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._cache[key] = value
+
+    def invalidate(self, key: Hashable = None):
+        with self._lock:
+            if key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._cache),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+class SkuCatalogCache:
+    """
+    A TTL cache of billing catalogs keyed by service name.
+
+    Entries older than `ttl_seconds` are still served while a background thread
+    refreshes them. Entries older than `ttl_seconds + max_stale_seconds` are
+    refetched synchronously.
+    """
+
+    def __init__(self, ttl_seconds: float, max_stale_seconds: float = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = ttl_seconds if max_stale_seconds is None else max_stale_seconds
+        self._entries: Dict[str, SkuCatalog] = {}
+        self._refreshing: set = set()
+        self._tasks: set = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def _lookup(self, service_name: str):
+        """
+        Returns (catalog, start_refresh) for a servable entry, or (None, False) on a miss.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(service_name)
+            age = now - entry.fetched_at if entry else None
+            if entry and age < self.ttl_seconds:
+                self.hits += 1
+                return entry, False
+            if entry and age < self.ttl_seconds + self.max_stale_seconds:
+                self.stale_hits += 1
+                start_refresh = service_name not in self._refreshing
+                self._refreshing.add(service_name)
+                return entry, start_refresh
+            self.misses += 1
+            return None, False
+
+    def _store(self, service_name: str, skus: list, refreshed: bool = False) -> SkuCatalog:
+        catalog = SkuCatalog(skus, time.monotonic())
+        if refreshed:
+            # Build the index and version off the request path before the new catalog is swapped in.
+            catalog.index
+            catalog.version
+        with self._lock:
+            self._entries[service_name] = catalog
+            if refreshed:
+                self.refreshes += 1
+        return catalog
+
+    def _refresh_failed(self, service_name: str, error: Exception):
+        with self._lock:
+            self.refresh_errors += 1
+        print(f"Background refresh of SKU catalog '{service_name}' failed: {error}")
+
+    def _refresh_done(self, service_name: str):
+        with self._lock:
+            self._refreshing.discard(service_name)
+
+    def get(self, service_name: str, loader: Callable[[str], List[Any]]) -> SkuCatalog:
+        """
+        Returns the cached catalog for a service, calling `loader(service_name)` on a miss.
+        Loader errors on a miss are propagated to the caller.
+        """
+        entry, start_refresh = self._lookup(service_name)
+        if start_refresh:
+            threading.Thread(target=self._refresh, args=(service_name, loader), daemon=True).start()
+        if entry:
+            return entry
+        return self._store(service_name, loader(service_name))
+
+    async def get_async(self, service_name: str, loader: Callable[[str], Awaitable[List[Any]]]) -> SkuCatalog:
+        """
+        The asyncio counterpart of `get`, for a coroutine `loader`.
+        """
+        entry, start_refresh = self._lookup(service_name)
+        if start_refresh:
+            task = asyncio.get_running_loop().create_task(self._refresh_async(service_name, loader))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        if entry:
+            return entry
+        return self._store(service_name, await loader(service_name))
+
+    def _refresh(self, service_name: str, loader: Callable[[str], List[Any]]):
+        try:
+            self._store(service_name, loader(service_name), refreshed=True)
+        except Exception as e:
+            self._refresh_failed(service_name, e)
+        finally:
+            self._refresh_done(service_name)
+
+    async def _refresh_async(self, service_name: str, loader: Callable[[str], Awaitable[List[Any]]]):
+        try:
+            skus = await loader(service_name)
+            await asyncio.to_thread(self._store, service_name, skus, True)
+        except Exception as e:
+            self._refresh_failed(service_name, e)
+        finally:
+            self._refresh_done(service_name)
+
+    def peek(self, service_name: str) -> SkuCatalog:
+        """
+        Returns the servable catalog for a service, or None, without counting or refreshing.
+        """
+        with self._lock:
+            entry = self._entries.get(service_name)
+        if entry and time.monotonic() - entry.fetched_at < self.ttl_seconds + self.max_stale_seconds:
+            return entry
+        return None
+
+    def invalidate(self, service_name: str = None):
+        with self._lock:
+            if service_name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(service_name, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "refresh_errors": self.refresh_errors,
+                "entries": len(self._entries),
+                "ttl_seconds": self.ttl_seconds,
+            }
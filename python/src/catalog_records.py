@@ -0,0 +1,163 @@
+"""
+This module contains the compact records GcpClient keeps for machine types and billing SKUs.
+
+The list calls of the Google Cloud clients return proto-plus messages, which are large and
+slow to read fields from. Every message is converted once, when it is fetched, into a
+slotted record holding only the fields validation, region finding and cost estimation read.
+"""
+
+import sys
+from typing import Tuple
+
+
+def _raw(message):
+    """
+    Returns the underlying protobuf of a proto-plus message, whose fields are much faster to
+    read, or the object itself for anything else with the same attributes.
+    """
+    to_pb = getattr(type(message), "pb", None)
+    return to_pb(message) if to_pb is not None else message
+
+
+class AcceleratorRecord:
+    """
+    An accelerator that comes attached to a machine type.
+    """
+
+    __slots__ = ("guest_accelerator_type", "guest_accelerator_count")
+
+    def __init__(self, guest_accelerator_type: str, guest_accelerator_count: int):
+        self.guest_accelerator_type = guest_accelerator_type
+        self.guest_accelerator_count = guest_accelerator_count
+
+    def __repr__(self) -> str:
+        return f"AcceleratorRecord({self.guest_accelerator_type!r}, {self.guest_accelerator_count})"
+
+
+class MachineTypeRecord:
+    """
+    The shape of a Compute Engine machine type.
+    """
+
+    __slots__ = ("name", "guest_cpus", "memory_mb", "accelerators")
+
+    def __init__(self, name: str, guest_cpus: int, memory_mb: int, accelerators: Tuple[AcceleratorRecord, ...] = ()):
+        self.name = name
+        self.guest_cpus = guest_cpus
+        self.memory_mb = memory_mb
+        self.accelerators = accelerators
+
+    @classmethod
+    def from_message(cls, machine_type) -> "MachineTypeRecord":
+        """
+        Converts a compute_v1.MachineType.
+        """
+        machine_type = _raw(machine_type)
+        return cls(
+            machine_type.name,
+            machine_type.guest_cpus,
+            machine_type.memory_mb,
+            tuple([
+                AcceleratorRecord(sys.intern(acc.guest_accelerator_type), acc.guest_accelerator_count)
+                for acc in machine_type.accelerators
+            ]),
+        )
+
+    def __repr__(self) -> str:
+        return f"MachineTypeRecord({self.name!r}, guest_cpus={self.guest_cpus}, memory_mb={self.memory_mb})"
+
+
+class SkuRecord:
+    """
+    A billing SKU with the rates of its first priced pricing expression: usage in
+    `usage_unit` is billed per `tiers`, (start usage amount, unit price) pairs in
+    `currency_code` sorted by start. `category` is (resource family, resource group,
+    usage type).
+    """
+
+    __slots__ = (
+        "name",
+        "sku_id",
+        "description",
+        "service_regions",
+        "category",
+        "usage_unit",
+        "usage_unit_description",
+        "conversion_factor",
+        "display_quantity",
+        "currency_code",
+        "tiers",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        sku_id: str,
+        description: str,
+        service_regions: Tuple[str, ...],
+        category: Tuple[str, str, str] = ("", "", ""),
+        usage_unit: str = "",
+        usage_unit_description: str = "",
+        conversion_factor: float = 1.0,
+        display_quantity: float = 1.0,
+        currency_code: str = "",
+        tiers: Tuple[Tuple[float, float], ...] = (),
+    ):
+        self.name = name
+        self.sku_id = sku_id
+        self.description = description
+        self.service_regions = service_regions
+        self.category = category
+        self.usage_unit = usage_unit
+        self.usage_unit_description = usage_unit_description
+        self.conversion_factor = conversion_factor
+        self.display_quantity = display_quantity
+        self.currency_code = currency_code
+        self.tiers = tiers
+
+    @classmethod
+    def from_message(cls, sku) -> "SkuRecord":
+        """
+        Converts a billing_v1.Sku. Region, unit and currency strings, which repeat across
+        the catalog, are interned.
+        """
+        sku = _raw(sku)
+        category = getattr(sku, "category", None)
+        pricing = ("", "", 1.0, 1.0, "", ())
+        for pricing_info in sku.pricing_info:
+            expression = pricing_info.pricing_expression
+            rates = expression.tiered_rates
+            if not rates:
+                continue
+            currency_code = rates[0].unit_price.currency_code
+            tiers = []
+            for tier in rates:
+                price = tier.unit_price
+                if price.currency_code == currency_code:
+                    tiers.append((tier.start_usage_amount, price.units + price.nanos / 1e9))
+            if len(tiers) > 1:
+                tiers.sort()
+            pricing = (
+                sys.intern(expression.usage_unit),
+                sys.intern(expression.usage_unit_description),
+                expression.base_unit_conversion_factor,
+                expression.display_quantity,
+                sys.intern(currency_code),
+                tuple(tiers),
+            )
+            break
+        return cls(
+            sku.name,
+            sku.sku_id,
+            sku.description,
+            tuple(map(sys.intern, sku.service_regions)),
+            (
+                (sys.intern(category.resource_family), sys.intern(category.resource_group), sys.intern(category.usage_type))
+                if category
+                else ("", "", "")
+            ),
+            *pricing,
+        )
+
+    def __repr__(self) -> str:
+        return f"SkuRecord({self.name!r}, {self.description!r})"
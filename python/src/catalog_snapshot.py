@@ -0,0 +1,243 @@
+"""
+This module contains the offline catalog snapshot format.
+
+A snapshot holds everything GcpClient fetches for validation, region finding and cost
+estimation: every zone's machine types, GPU and TPU types, the storage locations, the
+project's quota table and the billing SKU catalogs. It is one gzip-compressed JSON document with records stored
+as positional arrays, which keeps the file small and fast to parse. Records are turned
+into the MachineTypeRecords and SkuRecords GcpClient caches only when a zone or service
+is first read.
+"""
+
+import functools
+import gc
+import gzip
+import json
+import sys
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.catalog_records import AcceleratorRecord, MachineTypeRecord, SkuRecord
+from src.quota_table import QuotaTable
+
+SNAPSHOT_FORMAT = "hpcyaml-catalog"
+SNAPSHOT_VERSION = 1
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def _encode_machine_type(mt: MachineTypeRecord) -> list:
+    accelerators = [[acc.guest_accelerator_type, acc.guest_accelerator_count] for acc in mt.accelerators]
+    return [mt.name, mt.guest_cpus, mt.memory_mb, accelerators]
+
+
+def _decode_machine_type(record: list) -> MachineTypeRecord:
+    name, guest_cpus, memory_mb, accelerators = record
+    return MachineTypeRecord(
+        name,
+        guest_cpus,
+        memory_mb,
+        tuple(AcceleratorRecord(acc_type, count) for acc_type, count in accelerators),
+    )
+
+
+def _encode_sku(sku: SkuRecord) -> list:
+    pricing = []
+    if sku.tiers:
+        tiers = []
+        for start, unit_price in sku.tiers:
+            units = int(unit_price)
+            tiers.append([start, sku.currency_code, units, round((unit_price - units) * 1e9)])
+        pricing.append([sku.usage_unit, sku.usage_unit_description, sku.conversion_factor, sku.display_quantity, tiers])
+    return [sku.sku_id, sku.description, list(sku.service_regions), list(sku.category), pricing]
+
+
+def _decode_sku(service_name: str, record: list) -> SkuRecord:
+    sku_id, description, service_regions, category, pricing = record
+    sku = SkuRecord(
+        f"{service_name}/skus/{sku_id}",
+        sku_id,
+        description,
+        tuple(sys.intern(region) for region in service_regions),
+        tuple(sys.intern(value) for value in category),
+    )
+    for usage_unit, usage_unit_description, conversion_factor, display_quantity, tiers in pricing:
+        if not tiers:
+            continue
+        currency_code = tiers[0][1]
+        sku.usage_unit = sys.intern(usage_unit)
+        sku.usage_unit_description = sys.intern(usage_unit_description)
+        sku.conversion_factor = conversion_factor
+        sku.display_quantity = display_quantity
+        sku.currency_code = sys.intern(currency_code)
+        sku.tiers = tuple(sorted(
+            (start, units + nanos / 1e9) for start, tier_currency, units, nanos in tiers if tier_currency == currency_code
+        ))
+        break
+    return sku
+
+
+def build_snapshot(gcp_client, service_names: Iterable[str], max_in_flight: int = None) -> Dict[str, Any]:
+    """
+    Collects everything `gcp_client` would fetch into a snapshot document.
+    """
+    collected = gcp_client.collect_all_zones(max_in_flight=max_in_flight)
+    machine_types_by_zone = collected["machine_types"] or {}
+    gpus_by_zone = collected["gpus"] or {}
+
+    zones = {}
+    for zone in sorted(set(machine_types_by_zone) | set(gpus_by_zone)):
+        zones[zone] = {
+            "machine_types": [_encode_machine_type(mt) for mt in machine_types_by_zone.get(zone, [])],
+            "gpus": [[gpu.name, gpu.maximum_cards_per_instance] for gpu in gpus_by_zone.get(zone, [])],
+            "tpus": list(collected["tpus"].get(zone, [])),
+        }
+
+    collection_errors = list(collected["collection_errors"])
+    skus = {}
+    for service_name in service_names:
+        try:
+            skus[service_name] = [_encode_sku(sku) for sku in gcp_client._fetch_skus(service_name)]
+        except Exception as e:
+            print(f"Error fetching SKUs for service '{service_name}': {e}")
+            collection_errors.append(f"SKUs for service '{service_name}': {e}")
+
+    quota_table = gcp_client.get_quota_table()
+    if quota_table is None:
+        collection_errors.append(f"Quotas of project '{gcp_client.project_id}'")
+
+    return {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "project_id": gcp_client.project_id,
+        "created_at": time.time(),
+        "zones": zones,
+        "storage": collected["storage"],
+        "skus": skus,
+        "quotas": quota_table.records() if quota_table is not None else None,
+        "collection_errors": collection_errors,
+    }
+
+
+def write_snapshot(document: Dict[str, Any], path: str):
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump(document, f, separators=(",", ":"))
+
+
+def read_snapshot(path: str) -> Dict[str, Any]:
+    # Parsing allocates hundreds of thousands of acyclic lists, which would otherwise trigger
+    # full garbage collections of the (large) Google Cloud module heap along the way.
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(path, "rb") as f:
+            document = json.loads(gzip.decompress(f.read()))
+    except (OSError, ValueError) as e:
+        raise SnapshotError(f"Could not read catalog snapshot '{path}': {e}")
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    if not isinstance(document, dict) or document.get("format") != SNAPSHOT_FORMAT:
+        raise SnapshotError(f"'{path}' is not a catalog snapshot.")
+    if document.get("version") != SNAPSHOT_VERSION:
+        raise SnapshotError(
+            f"Catalog snapshot '{path}' has version {document.get('version')}, expected {SNAPSHOT_VERSION}."
+        )
+    return document
+
+
+class CatalogSnapshot:
+    """
+    A loaded snapshot, decoding each zone and SKU catalog the first time it is read.
+    """
+
+    def __init__(self, document: Dict[str, Any]):
+        self.document = document
+        self.project_id: str = document["project_id"]
+        self.created_at: float = document["created_at"]
+        self.zones: List[str] = sorted(document["zones"])
+        self.storage: Dict[str, List[str]] = document["storage"]
+        self.service_names: List[str] = sorted(document["skus"])
+        self._machine_types: Dict[str, list] = {}
+        self._gpus: Dict[str, list] = {}
+        self._skus: Dict[str, list] = {}
+        self._quota_table: Optional[QuotaTable] = None
+
+    @classmethod
+    def load(cls, path: str) -> "CatalogSnapshot":
+        return cls(read_snapshot(path))
+
+    def machine_types(self, zone: str) -> Optional[list]:
+        """
+        Returns the machine types of a zone, or None if the snapshot has no such zone.
+        """
+        if zone not in self.document["zones"]:
+            return None
+        if zone not in self._machine_types:
+            self._machine_types[zone] = [
+                _decode_machine_type(record) for record in self.document["zones"][zone]["machine_types"]
+            ]
+        return self._machine_types[zone]
+
+    def gpus(self, zone: str) -> Optional[list]:
+        """
+        Returns the accelerator types (name, maximum_cards_per_instance) of a zone, or None.
+        """
+        if zone not in self.document["zones"]:
+            return None
+        if zone not in self._gpus:
+            self._gpus[zone] = [
+                SimpleNamespace(name=name, maximum_cards_per_instance=max_cards)
+                for name, max_cards in self.document["zones"][zone]["gpus"]
+            ]
+        return self._gpus[zone]
+
+    def tpus(self, zone: str) -> Optional[List[str]]:
+        zone_record = self.document["zones"].get(zone)
+        return None if zone_record is None else zone_record["tpus"]
+
+    def skus(self, service_name: str) -> Optional[list]:
+        """
+        Returns the SKUs of a billing service, or None if the snapshot does not include it.
+        """
+        if service_name not in self.document["skus"]:
+            return None
+        if service_name not in self._skus:
+            self._skus[service_name] = [
+                _decode_sku(service_name, record) for record in self.document["skus"][service_name]
+            ]
+        return self._skus[service_name]
+
+    def quota_table(self) -> Optional[QuotaTable]:
+        """
+        Returns the project's quota table, or None if the snapshot was taken without one.
+        """
+        records = self.document.get("quotas")
+        if records is None:
+            return None
+        if self._quota_table is None:
+            self._quota_table = QuotaTable(records["limits"], records["preferences"], self.created_at)
+        return self._quota_table
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "project_id": self.project_id,
+            "created_at": self.created_at,
+            "zones": len(self.zones),
+            "machine_types": sum(len(zone["machine_types"]) for zone in self.document["zones"].values()),
+            "storage_locations": {service: len(locations) for service, locations in self.storage.items()},
+            "skus": {service_name: len(records) for service_name, records in self.document["skus"].items()},
+            "quotas": len(self.document["quotas"]["limits"]) if self.document.get("quotas") else None,
+            "collection_errors": self.document.get("collection_errors", []),
+        }
+
+
+@functools.lru_cache(maxsize=8)
+def load_catalog_snapshot(path: str) -> CatalogSnapshot:
+    """
+    Loads a snapshot file once per process.
+    """
+    return CatalogSnapshot.load(path)
@@ -1,19 +1,60 @@
 import click
+import contextlib
 import os
-import yaml
-from src.gcp_client import GcpClient
-from src.validator import Validator
-from src.yaml_builder import YamlBuilder
-from google.cloud import compute_v1  # For machine type details
-from google.api_core.exceptions import NotFound, GoogleAPIError
+import sys
+
+# Commands import what they use when they run, so that commands which never talk to
+# Google Cloud (and --help) do not pay for loading the protobuf and gRPC client stacks.
+# benchmarks/bench_cli_imports.py guards this.
 
 
 @click.group()
-def cli():
+@click.option(
+    "--trace-file",
+    envvar="TRACE_FILE",
+    type=click.Path(dir_okay=False),
+    help="Append the run's phase spans to this file as OpenTelemetry (OTLP/JSON) lines.",
+)
+@click.option("--timings", is_flag=True, help="Print the time spent in each phase to stderr.")
+@click.option("--profile", "profile_path", type=click.Path(dir_okay=False), help="Write a cProfile dump of the run to this file.")
+@click.pass_context
+def cli(ctx, trace_file: str, timings: bool, profile_path: str):
     """
     A CLI tool for generating and validating Google Cloud HPC deployment configurations.
     """
-    pass
+    if trace_file or timings or profile_path:
+        _trace_run(ctx, trace_file, timings, profile_path)
+
+
+def _trace_run(ctx, trace_file: str, timings: bool, profile_path: str):
+    """
+    Traces (and with a profile path, profiles) the command run by `ctx`, reporting when it closes.
+    """
+    from src.tracing import SPAN_KIND_INTERNAL, Trace, end_trace, start_trace
+
+    trace = Trace(
+        f"hpcyaml {ctx.invoked_subcommand}",
+        kind=SPAN_KIND_INTERNAL,
+        attributes={"cli.command": ctx.invoked_subcommand or ""},
+        profile=bool(profile_path),
+    )
+    token = start_trace(trace)
+    profiler = trace.profile.new_profiler() if profile_path else None
+    if profiler is not None:
+        profiler.enable()
+
+    def report():
+        if profiler is not None:
+            profiler.disable()
+            trace.profile.dump(profile_path)
+        end_trace(token)
+        if timings:
+            for name, duration in trace.timings().items():
+                click.echo(f"{name:24} {duration:10.2f} ms", err=True)
+        if trace_file:
+            trace.write(trace_file)
+
+    ctx.call_on_close(report)
 
 
 @cli.command()
@@ -56,6 +97,9 @@ def generate(
     """
     Generates a new HPC blueprint YAML file.
     """
+    from src.yaml_builder import YamlBuilder
+    from src.yaml_io import load_yaml
+
     template_values = {}
     if template:
         template_path = os.path.join(
@@ -65,7 +109,7 @@ def generate(
             click.echo(f"Error: Template '{template}' not found.")
             exit(1)
         with open(template_path, "r") as f:
-            template_values = yaml.safe_load(f)
+            template_values = load_yaml(f)
 
     # Override template values with CLI options if provided
     blueprint_name = (
@@ -158,213 +202,499 @@ def generate(
         node_count=node_count,
         gpu_type=gpu_type,
         gpu_count=gpu_count,
-        storage_type=storage_type,
-        storage_capacity_gb=storage_capacity_gb,
+        storage_configs=(
+            [{"type": storage_type, "capacity_gb": storage_capacity_gb}]
+            if storage_type
+            else None
+        ),
     )
 
 
+def _bulk_command(command):
+    """
+    Adds the BLUEPRINT_PATHS argument and the --jobs and --format options of the commands
+    that process many blueprint files.
+    """
+    command = click.option(
+        "--format",
+        "output_format",
+        type=click.Choice(["text", "json"]),
+        default="text",
+        show_default=True,
+        help="Format of the consolidated report.",
+    )(command)
+    command = click.option(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        show_default=True,
+        help=(
+            "Number of worker processes that parse the blueprint YAML. Only parsing is parallel: "
+            "validation, pricing and quota checks run in this process, against catalog data fetched once."
+        ),
+    )(command)
+    return click.argument("blueprint_paths", nargs=-1)(command)
+
+
+def _catalog_option(command):
+    """
+    Adds the --catalog option of the commands that can run from an offline catalog snapshot.
+    """
+    return click.option(
+        "--catalog",
+        "catalog_path",
+        envvar="CATALOG_SNAPSHOT_PATH",
+        type=click.Path(exists=True, dir_okay=False),
+        help="Read catalog data from this snapshot (see `snapshot export`) instead of Google Cloud.",
+    )(command)
+
+
+def _gcp_client(project_id: str, catalog_path: str):
+    """
+    Returns the client commands fetch catalog data through: offline when a snapshot is given.
+    """
+    from src.catalog_snapshot import SnapshotError
+    from src.offline_gcp_client import create_gcp_client
+
+    try:
+        return create_gcp_client(project_id=project_id, catalog_path=catalog_path)
+    except SnapshotError as e:
+        click.echo(f"Error: {e}", err=True)
+        exit(2)
+
+
+def _diagnostics(output_format: str):
+    """
+    Sends what is printed while blueprints are processed to stderr when stdout carries a JSON report.
+    """
+    return contextlib.redirect_stdout(sys.stderr) if output_format == "json" else contextlib.nullcontext()
+
+
+def _load_blueprints(blueprint_paths: tuple, jobs: int) -> list:
+    """
+    Expands the given files, directories and globs and parses every blueprint found.
+    """
+    from src.bulk import EXIT_UNREADABLE, expand_blueprint_paths, parse_blueprint_files
+
+    paths = expand_blueprint_paths(blueprint_paths)
+    if not paths:
+        click.echo("Error: No blueprint files found.", err=True)
+        exit(EXIT_UNREADABLE)
+    return parse_blueprint_files(paths, jobs)
+
+
+def _blueprint_locations(entries: list, region: str, zone: str, results: dict) -> list:
+    """
+    Resolves the region and zone of each parsed blueprint. Unreadable blueprints and
+    blueprints without a region get an "error" result and are left out.
+    """
+    from src.bulk import blueprint_location
+
+    located = []
+    for entry in entries:
+        if "error" in entry:
+            results[entry["path"]] = {"path": entry["path"], "status": "error", "errors": [entry["error"]]}
+            continue
+        blueprint_region, blueprint_zone = blueprint_location(entry["blueprint"], region, zone)
+        if not blueprint_region:
+            results[entry["path"]] = {
+                "path": entry["path"],
+                "status": "error",
+                "errors": ["No --region given and the blueprint does not set vars.region."],
+            }
+            continue
+        located.append({**entry, "region": blueprint_region, "zone": blueprint_zone})
+    return located
+
+
+def _validate_blueprints(
+    entries: list, project_id: str, region: str, zone: str, results: dict, catalog_path: str = None
+) -> list:
+    """
+    Validates parsed blueprints against catalog data fetched once for all of them.
+    Returns (entry, {"is_valid", "errors"}) pairs.
+    """
+    from src.bulk import prefetch_catalog
+    from src.validator import Validator
+
+    located = _blueprint_locations(entries, region, zone, results)
+    gcp_client = _gcp_client(project_id, catalog_path)
+    prefetch_catalog(
+        gcp_client,
+        zones={entry["zone"] for entry in located},
+        storage_services={
+            storage["storage_type"]
+            for entry in located
+            for storage in Validator._extract_resources(entry["blueprint"])["storage_instances"]
+        },
+        quotas=True,
+    )
+    outcomes = Validator(gcp_client).validate_batch(located)
+    return list(zip(located, outcomes))
+
+
+def _report(command: str, entries: list, results: dict, output_format: str, describe):
+    """
+    Prints the consolidated report of a bulk command and exits with its summary code:
+    0 when every blueprint passed, 1 when some failed, 2 when some could not be checked.
+    """
+    from src.bulk import EXIT_FAILED, EXIT_OK, EXIT_UNREADABLE
+
+    ordered = [results[entry["path"]] for entry in entries]
+    summary = {
+        status: sum(1 for result in ordered if result["status"] == status)
+        for status in ("passed", "failed", "error")
+    }
+    if summary["error"]:
+        exit_code = EXIT_UNREADABLE
+    elif summary["failed"]:
+        exit_code = EXIT_FAILED
+    else:
+        exit_code = EXIT_OK
+
+    if output_format == "json":
+        import json
+
+        report = {"command": command, "results": ordered, "summary": summary, "exit_code": exit_code}
+        click.echo(json.dumps(report, indent=2))
+    else:
+        for result in ordered:
+            click.echo(f"{result['status'].upper():6} {result['path']}")
+            for line in describe(result):
+                click.echo(f"       {line}")
+        click.echo(
+            f"\n{len(ordered)} blueprint(s): {summary['passed']} passed, "
+            f"{summary['failed']} failed, {summary['error']} could not be checked."
+        )
+    exit(exit_code)
+
+
+def _describe_errors(result: dict) -> list:
+    return [f"- {error}" for error in result.get("errors", [])]
+
+
 @cli.command()
-@click.argument("blueprint_path", type=click.Path(exists=True))
-@click.option("--region", required=True, help="The Google Cloud region for validation.")
-@click.option("--zone", required=True, help="The Google Cloud zone for validation.")
+@_bulk_command
+@click.option("--region", help="The Google Cloud region for validation. Defaults to each blueprint's vars.region.")
+@click.option("--zone", help="The Google Cloud zone for validation. Defaults to each blueprint's vars.zone.")
 @click.option("--project-id", required=True, help="The Google Cloud project ID.")
-def validate(blueprint_path: str, region: str, zone: str, project_id: str):
+@_catalog_option
+def validate(
+    blueprint_paths: tuple, jobs: int, output_format: str, region: str, zone: str, project_id: str, catalog_path: str
+):
     """
-    Validates an existing HPC blueprint YAML file against GCP resource availability and constraints.
+    Validates HPC blueprint YAML files against GCP resource availability and constraints.
+
+    BLUEPRINT_PATHS may be files, directories or glob patterns. Catalog data is fetched
+    once for all blueprints, which are parsed by --jobs worker processes.
     """
-    gcp_client = GcpClient(project_id=project_id)
-    validator = Validator(gcp_client)
+    entries = _load_blueprints(blueprint_paths, jobs)
+    results = {}
+    with _diagnostics(output_format):
+        outcomes = _validate_blueprints(entries, project_id, region, zone, results, catalog_path)
+    for entry, outcome in outcomes:
+        results[entry["path"]] = {
+            "path": entry["path"],
+            "status": "passed" if outcome["is_valid"] else "failed",
+            "region": entry["region"],
+            "zone": entry["zone"],
+            "errors": outcome["errors"],
+        }
+    _report("validate", entries, results, output_format, _describe_errors)
 
-    if validator.validate_blueprint(blueprint_path, region, zone):
-        click.echo(
-            f"Blueprint '{blueprint_path}' is valid for deployment in '{region}'/'{zone}'."
+
+@cli.command()
+@_bulk_command
+@click.option("--project-id", required=True, help="The Google Cloud project ID.")
+@click.option("--region", help="The Google Cloud region for cost estimation. Defaults to each blueprint's vars.region.")
+@click.option("--zone", help="The Google Cloud zone for cost estimation. Defaults to each blueprint's vars.zone.")
+@_catalog_option
+def estimate_cost(
+    blueprint_paths: tuple, jobs: int, output_format: str, project_id: str, region: str, zone: str, catalog_path: str
+):
+    """
+    Estimates the monthly cost of resources defined in HPC blueprint YAML files.
+
+    BLUEPRINT_PATHS may be files, directories or glob patterns. Catalog and pricing data
+    is fetched once for all blueprints, which are parsed by --jobs worker processes.
+    """
+    entries = _load_blueprints(blueprint_paths, jobs)
+
+    from src.bulk import prefetch_catalog
+    from src.cost_estimator import COMPUTE_ENGINE_SERVICE_ID, FILESTORE_SERVICE_ID, estimate_cost as estimate
+    from src.validator import Validator
+
+    results = {}
+    located = _blueprint_locations(entries, region, zone, results)
+    estimates = []
+    with _diagnostics(output_format):
+        gcp_client = _gcp_client(project_id, catalog_path)
+        prefetch_catalog(
+            gcp_client,
+            zones={entry["zone"] for entry in located},
+            service_names=[f"services/{COMPUTE_ENGINE_SERVICE_ID}", f"services/{FILESTORE_SERVICE_ID}"],
         )
-    else:
-        click.echo(f"Blueprint '{blueprint_path}' has validation errors:")
-        for error in validator.get_errors():
-            click.echo(f"- {error}")
-        exit(1)
+        for entry in located:
+            estimates.append(estimate(
+                extracted_resources=Validator._extract_resources(entry["blueprint"]),
+                region=entry["region"],
+                zone=entry["zone"],
+                gcp_client=gcp_client,
+            ))
+    for entry, (total_cost, cost_breakdown) in zip(located, estimates):
+        results[entry["path"]] = {
+            "path": entry["path"],
+            "status": "passed",
+            "region": entry["region"],
+            "zone": entry["zone"],
+            "total_cost": total_cost,
+            "cost_breakdown": cost_breakdown,
+        }
+
+    def describe(result: dict) -> list:
+        if result["status"] == "error":
+            return _describe_errors(result)
+        lines = [
+            f"{component}: {cost}" if isinstance(cost, str) else f"{component}: ${cost:.2f}"
+            for component, cost in result["cost_breakdown"].items()
+        ]
+        return lines + [f"Total Estimated Monthly Cost: ${result['total_cost']:.2f}"]
+
+    _report("estimate-cost", entries, results, output_format, describe)
 
 
 @cli.command()
-@click.argument("blueprint_path", type=click.Path(exists=True))
 @click.option("--project-id", required=True, help="The Google Cloud project ID.")
 @click.option(
-    "--region", required=True, help="The Google Cloud region for cost estimation."
+    "--machine-type", default=None, help="Required machine type (e.g., a3-highgpu-8g)."
+)
+@click.option(
+    "--gpu-type", default=None, help="Required GPU type (e.g., nvidia-h100-80gb)."
 )
-def estimate_cost(blueprint_path: str, project_id: str, region: str):
+@click.option("--gpu-count", default=0, type=int, help="Required GPU count per VM.")
+@click.option("--tpu-type", default=None, help="Required TPU type (e.g., v5p-8).")
+@click.option(
+    "--storage-type", default=None, help="Required storage type (e.g., lustre)."
+)
+@click.option("--region", default=None, help="Only consider zones in this region.")
+@click.option("--limit", default=10, type=int, help="Maximum number of zones to list.")
+@_catalog_option
+def find_region(
+    project_id: str,
+    machine_type: str,
+    gpu_type: str,
+    gpu_count: int,
+    tpu_type: str,
+    storage_type: str,
+    region: str,
+    limit: int,
+    catalog_path: str,
+):
     """
-    Estimates the monthly cost of resources defined in an HPC blueprint YAML file.
+    Recommends Google Cloud regions/zones where a given set of resource requirements can be deployed.
     """
-    gcp_client = GcpClient(project_id=project_id)
-    validator = Validator(gcp_client)  # Use validator to extract resources
-
-    extracted_resources = validator.get_extracted_resources_for_cost_estimation(
-        blueprint_path
-    )
-    if not extracted_resources:
-        click.echo("Could not extract resources from blueprint for cost estimation.")
+    from src.region_finder import CapabilityIndex, find_regions
+
+    gcp_client = _gcp_client(project_id, catalog_path)
+    capability_index = CapabilityIndex(gcp_client.get_all_zones_with_resources())
+    requirements = {
+        "machine_type": machine_type,
+        "gpu_type": gpu_type,
+        "gpu_count": gpu_count,
+        "tpu_type": tpu_type,
+        "storage_type": storage_type,
+        "region": region,
+    }
+    zones = find_regions(requirements, capability_index, limit=limit)
+    if not zones:
+        click.echo("No zones satisfy the given requirements.")
         exit(1)
 
-    # Define Google Cloud Service IDs for billing
-    COMPUTE_ENGINE_SERVICE_ID = "services/6F81-5844-456A"
-    # These are example service IDs, actual IDs might vary and need to be looked up
-    FILESTORE_SERVICE_ID = "services/0000-0000-0000-0001"  # Placeholder
-    LUSTRE_SERVICE_ID = "services/0000-0000-0000-0002"  # Placeholder
-    PARALLELSTORE_SERVICE_ID = "services/0000-0000-0000-0003"  # Placeholder
-
-    total_estimated_cost = 0.0
-    cost_breakdown = {
-        "Compute (CPUs)": 0.0,
-        "Compute (RAM)": 0.0,
-        "Accelerators (GPUs)": 0.0,
-        "Accelerators (TPUs)": 0.0,
-        "Storage": 0.0,
-    }
+    click.echo("Recommended zones (best first):")
+    for result in zones:
+        details = [f"{result['machine_type_count']} machine types"]
+        if "max_gpu_count" in result:
+            details.append(f"up to {result['max_gpu_count']}x {gpu_type} per VM")
+        if result["storage_services"]:
+            details.append("storage: " + ", ".join(result["storage_services"]))
+        click.echo(f"- {result['zone']} ({'; '.join(details)})")
 
-    # Helper to get machine type details for CPU/RAM
-    machine_type_client = compute_v1.MachineTypesClient()
 
-    # Process Compute Instances
-    for instance in extracted_resources.get("compute_instances", []):
-        machine_type_name = instance["machine_type"]
-        node_count = instance["node_count"]
-        accelerators = instance["accelerators"]
+def _parse_counts(spec: str) -> list:
+    """
+    Parses comma-separated counts and ranges such as "1-64,128,256-512/64" (step 64).
+    """
+    counts = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        bounds, _, step = part.partition("/")
+        first, _, last = bounds.partition("-")
+        try:
+            counts.extend(range(int(first), int(last or first) + 1, int(step or 1)))
+        except ValueError:
+            raise click.BadParameter(f"'{part}' is not a count or a range like 1-512 or 1-512/8.")
+    return counts
+
+
+@cli.command()
+@click.argument("blueprint_path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--project-id", required=True, help="The Google Cloud project ID.")
+@click.option(
+    "--region", "regions", multiple=True, help="A region to price in (repeatable). Defaults to the blueprint's vars.region."
+)
+@click.option("--zone", help="The zone whose machine types size the instances. Defaults to the blueprint's vars.zone.")
+@click.option(
+    "--nodes",
+    "node_spec",
+    default="1-512",
+    show_default=True,
+    help="Node counts to price: comma-separated counts and ranges, e.g. 1-64,128,256-512/64.",
+)
+@click.option("--hours", multiple=True, type=float, help="Monthly usage hours to price (repeatable). Defaults to 730.")
+@click.option("--format", "output_format", type=click.Choice(["csv", "json"]), default="csv", show_default=True)
+@click.option("--components", "include_components", is_flag=True, help="Include the cost of each component.")
+@click.option("--output", "output_path", help="Write the sweep to this file instead of stdout.")
+@_catalog_option
+def cost_sweep(
+    blueprint_path: str,
+    project_id: str,
+    regions: tuple,
+    zone: str,
+    node_spec: str,
+    hours: tuple,
+    output_format: str,
+    include_components: bool,
+    output_path: str,
+    catalog_path: str,
+):
+    """
+    Prices a blueprint for every combination of node count, monthly hours and region.
 
+    Every compute instance of the blueprint runs at each node count for each number of
+    hours; storage is billed for the full month.
+    """
+    from src.bulk import EXIT_UNREADABLE, blueprint_location, parse_blueprint_file, prefetch_catalog
+    from src.cost_estimator import COMPUTE_ENGINE_SERVICE_ID, FILESTORE_SERVICE_ID, HOURS_PER_MONTH
+    from src.cost_sweep import sweep_costs, sweep_csv, sweep_table
+    from src.validator import Validator
+
+    node_counts = _parse_counts(node_spec)
+    entry = parse_blueprint_file(blueprint_path)
+    if "error" in entry:
+        click.echo(f"Error: {entry['error']}", err=True)
+        exit(EXIT_UNREADABLE)
+    region, zone = blueprint_location(entry["blueprint"], regions[0] if regions else None, zone)
+    if not region:
+        click.echo("Error: No --region given and the blueprint does not set vars.region.", err=True)
+        exit(EXIT_UNREADABLE)
+
+    # Sweep output may go to stdout, so diagnostics go to stderr.
+    with contextlib.redirect_stdout(sys.stderr):
+        gcp_client = _gcp_client(project_id, catalog_path)
+        prefetch_catalog(
+            gcp_client,
+            zones=[zone],
+            service_names=[f"services/{COMPUTE_ENGINE_SERVICE_ID}", f"services/{FILESTORE_SERVICE_ID}"],
+        )
         try:
-            mt_details = machine_type_client.get(
-                project=project_id, zone=region + "-a", machine_type=machine_type_name
-            )  # Assuming zone for machine type details
-            cpus = mt_details.guest_cpus
-            memory_gb = mt_details.memory_mb / 1024
-
-            # Estimate CPU cost
-            cpu_filter = f"resourceFamily=Compute AND resourceGroup=CPU AND serviceRegions={region} AND description:'{machine_type_name.split('-')[0].upper()}'"
-            cpu_skus = gcp_client.get_skus(COMPUTE_ENGINE_SERVICE_ID, cpu_filter)
-            if cpu_skus:
-                cpu_price_per_hour = gcp_client.get_sku_pricing(cpu_skus[0], region)
-                cost_breakdown["Compute (CPUs)"] += (
-                    cpu_price_per_hour * cpus * node_count * 730
-                )  # 730 hours/month
-            else:
-                click.echo(
-                    f"Warning: Could not find CPU SKU for {machine_type_name} in {region}."
-                )
-
-            # Estimate RAM cost
-            ram_filter = f"resourceFamily=Compute AND resourceGroup=RAM AND serviceRegions={region} AND description:'{machine_type_name.split('-')[0].upper()}'"
-            ram_skus = gcp_client.get_skus(COMPUTE_ENGINE_SERVICE_ID, ram_filter)
-            if ram_skus:
-                ram_price_per_gb_hour = gcp_client.get_sku_pricing(ram_skus[0], region)
-                cost_breakdown["Compute (RAM)"] += (
-                    ram_price_per_gb_hour * memory_gb * node_count * 730
-                )
-            else:
-                click.echo(
-                    f"Warning: Could not find RAM SKU for {machine_type_name} in {region}."
-                )
-
-            # Estimate Accelerator cost
-            for acc in accelerators:
-                acc_type = acc["type"]
-                acc_count = acc["count"]
-                if acc["resource_family"] == "GPU":
-                    gpu_filter = f"resourceFamily=Compute AND resourceGroup=GPU AND serviceRegions={region} AND description:'{acc_type}'"
-                    gpu_skus = gcp_client.get_skus(
-                        COMPUTE_ENGINE_SERVICE_ID, gpu_filter
-                    )
-                    if gpu_skus:
-                        gpu_price_per_hour = gcp_client.get_sku_pricing(
-                            gpu_skus[0], region
-                        )
-                        cost_breakdown["Accelerators (GPUs)"] += (
-                            gpu_price_per_hour * acc_count * node_count * 730
-                        )
-                    else:
-                        click.echo(
-                            f"Warning: Could not find GPU SKU for {acc_type} in {region}."
-                        )
-                elif acc["resource_family"] == "TPU":
-                    # TPU pricing might be more complex, using a simplified filter for now
-                    tpu_filter = f"resourceFamily=Cloud TPU AND serviceRegions={region} AND description:'{acc_type}'"
-                    tpu_skus = gcp_client.get_skus(
-                        COMPUTE_ENGINE_SERVICE_ID, tpu_filter
-                    )  # Assuming TPU SKUs are under Compute Engine service ID for now
-                    if tpu_skus:
-                        tpu_price_per_hour = gcp_client.get_sku_pricing(
-                            tpu_skus[0], region
-                        )
-                        cost_breakdown["Accelerators (TPUs)"] += (
-                            tpu_price_per_hour * acc_count * node_count * 730
-                        )
-                    else:
-                        click.echo(
-                            f"Warning: Could not find TPU SKU for {acc_type} in {region}."
-                        )
-
-        except NotFound:
-            click.echo(
-                f"Warning: Machine type '{machine_type_name}' not found for cost estimation in {region}."
-            )
-        except GoogleAPIError as e:
-            click.echo(f"Error fetching machine type details for cost estimation: {e}")
-
-    # Process Storage Instances
-    for storage_instance in extracted_resources.get("storage_instances", []):
-        storage_type = storage_instance["storage_type"]
-        capacity_gb = storage_instance["capacity_gb"]
-        service_id = None
-        storage_filter = None
-
-        if storage_type == "filestore":
-            service_id = FILESTORE_SERVICE_ID
-            storage_filter = f"resourceFamily=Storage AND resourceGroup=Filestore AND serviceRegions={region}"
-        elif storage_type == "lustre":
-            service_id = LUSTRE_SERVICE_ID
-            storage_filter = f"resourceFamily=Storage AND resourceGroup=Lustre AND serviceRegions={region}"
-        elif storage_type == "parallelstore":
-            service_id = PARALLELSTORE_SERVICE_ID
-            storage_filter = f"resourceFamily=Storage AND resourceGroup=Parallelstore AND serviceRegions={region}"
-
-        if service_id and storage_filter:
-            storage_skus = gcp_client.get_skus(service_id, storage_filter)
-            if storage_skus:
-                storage_price_per_gb_month = gcp_client.get_sku_pricing(
-                    storage_skus[0], region
-                )
-                cost_breakdown["Storage"] += storage_price_per_gb_month * capacity_gb
-            else:
-                click.echo(
-                    f"Warning: Could not find storage SKU for {storage_type} in {region}."
-                )
-        else:
-            click.echo(
-                f"Warning: Unknown storage type '{storage_type}' for cost estimation."
+            sweep = sweep_costs(
+                Validator._extract_resources(entry["blueprint"]),
+                regions=regions or [region],
+                zone=zone,
+                gcp_client=gcp_client,
+                node_counts=node_counts,
+                hours=hours or [HOURS_PER_MONTH],
             )
+        except ValueError as e:
+            click.echo(f"Error: {e}", err=True)
+            exit(EXIT_UNREADABLE)
 
-    click.echo("\n--- Estimated Monthly Cost ---")
-    for component, cost in cost_breakdown.items():
-        click.echo(f"{component}: ${cost:.2f}")
-        total_estimated_cost += cost
-    click.echo("------------------------------")
-    click.echo(f"Total Estimated Cost: ${total_estimated_cost:.2f}")
+    if output_format == "csv":
+        content = sweep_csv(sweep, include_components)
+    else:
+        import json
+
+        content = json.dumps(sweep_table(sweep, include_components))
+    if output_path:
+        with open(output_path, "w") as f:
+            f.write(content)
+    else:
+        click.echo(content, nl=not content.endswith("\n"))
+    for sweep_region, components in sweep["missing"].items():
+        if components:
+            click.echo(f"Warning: no price in {sweep_region} for: {', '.join(components)}", err=True)
 
 
 @cli.command()
+@click.argument("blueprint_path", type=click.Path(exists=True, dir_okay=False))
 @click.option("--project-id", required=True, help="The Google Cloud project ID.")
 @click.option(
-    "--gpu-type", default=None, help="Required GPU type (e.g., nvidia-h100-80gb)."
-)
-@click.option("--gpu-count", default=0, type=int, help="Required GPU count.")
-@click.option(
-    "--storage-type", default=None, help="Required storage type (e.g., lustre)."
+    "--region", "regions", multiple=True, help="A region to rank (repeatable). Defaults to every region with SKUs."
 )
-def find_region(project_id: str, gpu_type: str, gpu_count: int, storage_type: str):
+@click.option("--zone", help="The zone whose machine types size the instances. Defaults to the blueprint's vars.zone.")
+@click.option("--limit", type=int, default=None, help="Show at most this many regions.")
+@click.option("--format", "output_format", type=click.Choice(["text", "json"]), default="text", show_default=True)
+@_catalog_option
+def rank_regions(
+    blueprint_path: str,
+    project_id: str,
+    regions: tuple,
+    zone: str,
+    limit: int,
+    output_format: str,
+    catalog_path: str,
+):
     """
-    Recommends Google Cloud regions/zones where a given set of resource requirements can be deployed.
+    Ranks regions by the estimated monthly cost of a blueprint, cheapest first.
+
+    Regions lacking a SKU for some component are listed after the fully priced ones.
     """
-    click.echo("Region/zone recommendation is not yet implemented.")
-    # Placeholder for region finding logic
+    from src.bulk import EXIT_UNREADABLE, blueprint_location, parse_blueprint_file, prefetch_catalog
+    from src.cost_estimator import COMPUTE_ENGINE_SERVICE_ID, FILESTORE_SERVICE_ID
+    from src.cost_sweep import rank_regions as rank
+    from src.validator import Validator
+
+    entry = parse_blueprint_file(blueprint_path)
+    if "error" in entry:
+        click.echo(f"Error: {entry['error']}", err=True)
+        exit(EXIT_UNREADABLE)
+    _, zone = blueprint_location(entry["blueprint"], zone=zone)
+    if not zone:
+        click.echo("Error: No --zone given and the blueprint sets neither vars.zone nor vars.region.", err=True)
+        exit(EXIT_UNREADABLE)
+
+    with _diagnostics(output_format):
+        gcp_client = _gcp_client(project_id, catalog_path)
+        prefetch_catalog(
+            gcp_client,
+            zones=[zone],
+            service_names=[f"services/{COMPUTE_ENGINE_SERVICE_ID}", f"services/{FILESTORE_SERVICE_ID}"],
+        )
+        ranked = rank(
+            Validator._extract_resources(entry["blueprint"]),
+            zone=zone,
+            gcp_client=gcp_client,
+            regions=regions or None,
+            limit=limit,
+        )
+
+    if output_format == "json":
+        import json
+
+        click.echo(json.dumps({"regions": ranked}))
+        return
+    if not ranked:
+        click.echo("No regions have SKUs for this blueprint.")
+        exit(1)
+    click.echo("Regions by estimated monthly cost (cheapest first):")
+    for position, result in enumerate(ranked, start=1):
+        line = f"{position:3}. {result['region']:28} ${result['total_cost']:,.2f}"
+        if result["missing"]:
+            line += f"  (no price for: {', '.join(result['missing'])})"
+        click.echo(line)
 
 
 @cli.command()
@@ -384,41 +714,120 @@ def list_templates():
 
 
 @cli.command()
+@_bulk_command
 @click.option(
     "--blueprint-path",
-    type=click.Path(exists=True),
-    required=True,
-    help="The path to the blueprint YAML file.",
-)
-@click.option(
-    "--region", required=True, help="The Google Cloud region for quota checking."
+    "legacy_paths",
+    multiple=True,
+    hidden=True,
+    help="The path to a blueprint YAML file. Kept for compatibility, prefer BLUEPRINT_PATHS.",
 )
+@click.option("--region", help="The Google Cloud region for quota checking. Defaults to each blueprint's vars.region.")
 @click.option("--project-id", required=True, help="The Google Cloud project ID.")
-def check_quota(blueprint_path: str, region: str, project_id: str):
+@_catalog_option
+def check_quota(
+    blueprint_paths: tuple,
+    jobs: int,
+    output_format: str,
+    legacy_paths: tuple,
+    region: str,
+    project_id: str,
+    catalog_path: str,
+):
+    """
+    Checks if the current project has sufficient quotas for the resources defined in blueprints.
+
+    BLUEPRINT_PATHS may be files, directories or glob patterns. Only quota-related
+    validation errors fail a blueprint.
     """
-    Checks if the current project has sufficient quotas for the resources defined in a blueprint.
+    entries = _load_blueprints(blueprint_paths + legacy_paths, jobs)
+    results = {}
+    # Quota checks size machine types from each blueprint's zone (or the region's "-a" zone).
+    with _diagnostics(output_format):
+        outcomes = _validate_blueprints(entries, project_id, region, None, results, catalog_path)
+    for entry, outcome in outcomes:
+        quota_errors = [error for error in outcome["errors"] if "quota" in error.lower()]
+        results[entry["path"]] = {
+            "path": entry["path"],
+            "status": "failed" if quota_errors else "passed",
+            "region": entry["region"],
+            "errors": quota_errors,
+        }
+    _report("check-quota", entries, results, output_format, _describe_errors)
+
+
+@cli.group()
+def snapshot():
     """
-    gcp_client = GcpClient(project_id=project_id)
-    validator = Validator(gcp_client)
+    Exports and inspects offline catalog snapshots.
+    """
+    pass
 
-    # The validate_blueprint method already includes comprehensive quota checks
-    # It also handles parsing the blueprint and extracting resources internally
-    if validator.validate_blueprint(
-        blueprint_path, region, ""
-    ):  # Zone is not strictly needed for region-level quotas
-        click.echo(
-            f"Quota check passed for blueprint '{blueprint_path}' in region '{region}'."
-        )
-    else:
-        click.echo(
-            f"Quota check failed for blueprint '{blueprint_path}' in region '{region}'."
-        )
-        click.echo("Details:")
-        for error in validator.get_errors():
-            if "quota" in error.lower():  # Only show quota-related errors
-                click.echo(f"- {error}")
+
+@snapshot.command("export")
+@click.option("--project-id", required=True, help="The Google Cloud project ID.")
+@click.option("--output", "output_path", required=True, help="The snapshot file to write (gzip-compressed).")
+@click.option(
+    "--service",
+    "service_names",
+    multiple=True,
+    help="Billing service whose SKUs to include (e.g., services/6F81-5844-456A). Defaults to Compute Engine and Filestore.",
+)
+@click.option("--max-in-flight", type=int, default=None, help="Maximum number of concurrent upstream calls.")
+def snapshot_export(project_id: str, output_path: str, service_names: tuple, max_in_flight: int):
+    """
+    Fetches every zone's machine, GPU and TPU types, the storage locations and the SKU
+    catalogs into one snapshot file for --catalog.
+    """
+    from src.catalog_snapshot import build_snapshot, write_snapshot
+    from src.cost_estimator import COMPUTE_ENGINE_SERVICE_ID, FILESTORE_SERVICE_ID
+    from src.gcp_client import GcpClient
+
+    service_names = service_names or (f"services/{COMPUTE_ENGINE_SERVICE_ID}", f"services/{FILESTORE_SERVICE_ID}")
+    document = build_snapshot(GcpClient(project_id=project_id), service_names, max_in_flight=max_in_flight)
+    write_snapshot(document, output_path)
+    click.echo(
+        f"Wrote {output_path}: {len(document['zones'])} zones, "
+        f"{sum(len(skus) for skus in document['skus'].values())} SKUs, {os.path.getsize(output_path)} bytes."
+    )
+    if document["collection_errors"]:
+        click.echo("Some catalog data could not be fetched:", err=True)
+        for error in document["collection_errors"]:
+            click.echo(f"- {error}", err=True)
         exit(1)
 
 
+@snapshot.command("info")
+@click.argument("snapshot_path", type=click.Path(exists=True, dir_okay=False))
+def snapshot_info(snapshot_path: str):
+    """
+    Prints what a snapshot file contains and how long it takes to load.
+    """
+    import time
+
+    from src.catalog_snapshot import CatalogSnapshot, SnapshotError
+
+    start = time.perf_counter()
+    try:
+        summary = CatalogSnapshot.load(snapshot_path).summary()
+    except SnapshotError as e:
+        click.echo(f"Error: {e}", err=True)
+        exit(2)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    created_at = time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime(summary["created_at"]))
+    click.echo(f"Project: {summary['project_id']}")
+    click.echo(f"Created: {created_at}")
+    click.echo(f"Zones: {summary['zones']} ({summary['machine_types']} machine types)")
+    for service, count in summary["storage_locations"].items():
+        click.echo(f"Storage locations ({service}): {count}")
+    for service_name, count in summary["skus"].items():
+        click.echo(f"SKUs ({service_name}): {count}")
+    click.echo(f"Quota entries: {summary['quotas'] if summary['quotas'] is not None else 'not included'}")
+    if summary["collection_errors"]:
+        click.echo(f"Collection errors: {len(summary['collection_errors'])}")
+    click.echo(f"Loaded in {load_ms:.1f} ms")
+
+
 if __name__ == "__main__":
     cli()
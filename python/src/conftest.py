@@ -0,0 +1,129 @@
+"""
+Shared fixtures: a small catalog snapshot with priced SKUs, quotas and zones in three
+regions, the OfflineGcpClient serving it, and the API served by such clients.
+"""
+
+import time
+
+import pytest
+
+from src.catalog_snapshot import SNAPSHOT_FORMAT, SNAPSHOT_VERSION, CatalogSnapshot
+from src.cost_estimator import COMPUTE_ENGINE_SERVICE_ID, FILESTORE_SERVICE_ID
+from src.offline_gcp_client import OfflineGcpClient
+from src.quota_table import CPU_QUOTA_METRIC, CPUS_PER_VM_FAMILY_QUOTA_METRIC, GPUS_PER_GPU_FAMILY_QUOTA_METRIC, STORAGE_QUOTA_METRICS
+from src.response_cache import ResponseCache
+from src.yaml_io import dump_yaml
+
+PROJECT_ID = "test-project"
+REGIONS = ["us-central1", "europe-west4", "asia-east1"]
+# SKU descriptions name a geography, not the region: "t4" would match "europe-west4".
+GEOGRAPHIES = {"us-central1": "Americas", "europe-west4": "EMEA", "asia-east1": "APAC"}
+
+N1 = ["n1-standard-8", 8, 30720, []]
+N2 = ["n2-standard-8", 8, 32768, []]
+A2 = ["a2-highgpu-1g", 12, 87040, [["nvidia-tesla-a100", 1]]]
+ZONES = {
+    "us-central1-a": {"machine_types": [N1, N2, A2], "gpus": [["nvidia-tesla-a100", 4], ["nvidia-tesla-t4", 4]], "tpus": []},
+    "us-central1-b": {"machine_types": [N1, N2], "gpus": [["nvidia-tesla-t4", 4]], "tpus": []},
+    "europe-west4-a": {"machine_types": [N1, N2, A2], "gpus": [["nvidia-tesla-a100", 4]], "tpus": []},
+    "asia-east1-a": {"machine_types": [N1, N2], "gpus": [["nvidia-tesla-t4", 4]], "tpus": []},
+}
+
+
+def _sku(sku_id: str, description: str, regions: list, tiers: list, hourly: bool = True) -> list:
+    encoded_tiers = [[start, "USD", int(price), round((price - int(price)) * 1e9)] for start, price in tiers]
+    unit = ["h", "hour"] if hourly else ["GiBy.mo", "gibibyte month"]
+    return [sku_id, description, regions, ["Compute", "", "OnDemand"], [[*unit, 1.0, 1.0, encoded_tiers]]]
+
+
+def catalog_document(project_id: str = PROJECT_ID) -> dict:
+    """
+    A snapshot document. Europe has no N2 RAM SKU, A2 machines have an instance SKU in
+    us-central1 only, and N2 vCPUs are tiered.
+    """
+    compute_skus = []
+    for region, geography in GEOGRAPHIES.items():
+        compute_skus.append(_sku(f"n2-cpu-{region}", f"N2 vCPU running in {geography}", [region], [(0, 0.03), (2000, 0.025)]))
+        if region != "europe-west4":
+            compute_skus.append(_sku(f"n2-ram-{region}", f"N2 RAM running in {geography}", [region], [(0, 0.004)]))
+        compute_skus.append(_sku(f"n1-cpu-{region}", f"N1 vCPU running in {geography}", [region], [(0, 0.031)]))
+        compute_skus.append(_sku(f"n1-ram-{region}", f"N1 RAM running in {geography}", [region], [(0, 0.0042)]))
+        compute_skus.append(_sku(f"a100-{region}", f"Nvidia Tesla A100 GPU running in {geography}", [region], [(0, 2.9)]))
+        compute_skus.append(_sku(f"t4-{region}", f"Nvidia Tesla T4 GPU running in {geography}", [region], [(0, 0.35)]))
+    compute_skus.append(_sku("a2-instance", "a2-highgpu-1g Instance running in Americas", ["us-central1"], [(0, 3.67)]))
+    filestore_skus = [
+        _sku(f"filestore-{region}", f"Filestore Zonal Capacity in {geography}", [region], [(0, 0.2)], hourly=False)
+        for region, geography in GEOGRAPHIES.items()
+    ]
+    quota_metrics = [CPU_QUOTA_METRIC, CPUS_PER_VM_FAMILY_QUOTA_METRIC, GPUS_PER_GPU_FAMILY_QUOTA_METRIC, *STORAGE_QUOTA_METRICS.values()]
+    return {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "project_id": project_id,
+        "created_at": time.time(),
+        "zones": ZONES,
+        "storage": {"filestore": list(REGIONS), "lustre": ["us-central1"], "parallelstore": []},
+        "skus": {
+            f"services/{COMPUTE_ENGINE_SERVICE_ID}": compute_skus,
+            f"services/{FILESTORE_SERVICE_ID}": filestore_skus,
+        },
+        "quotas": {
+            "limits": [[metric, {}, 10000] for metric in quota_metrics]
+            + [[CPUS_PER_VM_FAMILY_QUOTA_METRIC, {"region": "us-central1", "vm_family": "N2"}, 64]],
+            "preferences": [],
+        },
+        "collection_errors": [],
+    }
+
+
+def blueprint_yaml(*groups: list, project_id: str = PROJECT_ID, region: str = "us-central1", zone: str = "us-central1-a") -> str:
+    """
+    A blueprint with one deployment group per list of modules.
+    """
+    return dump_yaml({
+        "blueprint_name": "test",
+        "vars": {"project_id": project_id, "region": region, "zone": zone},
+        "deployment_groups": [{"group": f"group{position}", "modules": modules} for position, modules in enumerate(groups)],
+    })
+
+
+def compute_module(module_id: str, machine_type: str, node_count: int, gpu: dict = None) -> dict:
+    settings = {"machine_type": machine_type, "node_count_static": node_count}
+    if gpu:
+        settings["gpu"] = gpu
+    return {"id": module_id, "source": "modules/compute/vm-instance", "settings": settings}
+
+
+def filestore_module(module_id: str, capacity_gb: int) -> dict:
+    return {"id": module_id, "source": "modules/file-system/filestore", "settings": {"capacity_gb": capacity_gb}}
+
+
+@pytest.fixture
+def snapshot() -> CatalogSnapshot:
+    return CatalogSnapshot(catalog_document())
+
+
+@pytest.fixture
+def offline_client(snapshot) -> OfflineGcpClient:
+    return OfflineGcpClient(snapshot)
+
+
+@pytest.fixture
+def api(monkeypatch, snapshot):
+    """
+    A TestClient of the app whose clients serve `snapshot`, with empty client and response caches.
+    """
+    from fastapi.testclient import TestClient
+
+    from src import dependencies, main
+
+    def reset():
+        for getter in (dependencies.get_gcp_client, dependencies.get_async_gcp_client, dependencies.get_capability_index):
+            getter.cache_clear()
+        dependencies._gcp_clients.clear()
+
+    monkeypatch.setattr(dependencies, "create_gcp_client", lambda project_id=None: OfflineGcpClient(snapshot, project_id=project_id))
+    monkeypatch.setattr(main, "response_cache", ResponseCache(maxsize=64))
+    reset()
+    yield TestClient(main.app)
+    reset()
@@ -2,129 +2,183 @@
 This module contains the logic for estimating the cost of a blueprint.
 """
 
+from src.catalog_records import SkuRecord
 from src.gcp_client import GcpClient
-from google.cloud import billing_v1
-from typing import Dict, Any
+from src.sku_index import SkuIndex, SkuPivot
+from src.tracing import span
+from typing import Any, Dict, List
 
 # Service IDs for the Cloud Billing Catalog API
 COMPUTE_ENGINE_SERVICE_ID = "6F81-5844-456A"
 FILESTORE_SERVICE_ID = "9662-B51E-5089"
 
+# Hours of a standard month of usage.
+HOURS_PER_MONTH = 730
+
+def _is_billed_hourly(sku: SkuRecord) -> bool:
+    """
+    Returns whether a SKU's usage unit is time-based (per hour), as opposed to per month.
+    """
+    return "hour" in sku.usage_unit_description.lower()
+
 def _calculate_monthly_cost_from_sku(
-    sku: billing_v1.Sku,
+    sku: SkuRecord,
     usage_amount: float,
     region: str,
     gcp_client: "GcpClient"
 ) -> float:
     """
     Calculates the estimated monthly cost for a given SKU and usage amount.
+    The month's usage is priced against every tier of the SKU's rates; `usage_amount` may
+    also be an array of usages, which are priced at once.
     """
     if not sku:
         return 0.0
 
-    price = gcp_client.get_sku_pricing(sku, region)
-    if price == 0.0:
-        return 0.0
-
-    if sku.pricing_info and sku.pricing_info[0].pricing_expression:
-        usage_unit = sku.pricing_info[0].pricing_expression.usage_unit_description.lower()
-        if "hour" in usage_unit:
-            # 730 hours represents a standard monthly usage
-            return price * usage_amount * 730
-        elif "gibibyte" in usage_unit or "gb" in usage_unit:
-            return price * usage_amount
+    if _is_billed_hourly(sku):
+        usage_amount = usage_amount * HOURS_PER_MONTH
 
-    return price * usage_amount
+    return gcp_client.get_sku_price(sku).cost(usage_amount)
 
-def _find_sku(skus: list, description_keywords: list, region: str) -> billing_v1.Sku:
+def _find_sku(skus: list, description_keywords: list, region: str) -> SkuRecord:
     """
     Finds a SKU from a list that matches a region and all keywords in the description.
+    A prebuilt SkuIndex or SkuPivot may be passed instead of a list to avoid the linear scan.
     """
+    if isinstance(skus, (SkuIndex, SkuPivot)):
+        return skus.find(description_keywords, region)
     for sku in skus:
         if region in sku.service_regions and all(keyword.lower() in sku.description.lower() for keyword in description_keywords):
             return sku
     return None
 
-def estimate_cost(extracted_resources: Dict[str, Any], region: str, zone: str, gcp_client: "GcpClient") -> tuple[float, dict]:
+def _resolve_components(
+    extracted_resources: Dict[str, Any],
+    region: str,
+    zone: str,
+    gcp_client: "GcpClient",
+    compute_skus: Any = None,
+    filestore_skus: Any = None,
+) -> List[Dict[str, Any]]:
     """
-    Estimates the monthly cost of the configuration by querying the Cloud Billing Catalog API.
+    Resolves the billing SKU of every cost component of the resources in a region.
+    The SKU lookups of each service default to its catalog's SkuIndex.
+
+    Each component has a breakdown "label", a node-count-free "name", its "sku" (None when
+    no SKU was found), the "usage" it is billed for, the "node_count" it scales with (None
+    for storage) and, for components that cannot be priced, the breakdown "note" to show.
     """
-    total_cost = 0.0
-    cost_breakdown = {}
+    components = []
 
-    compute_service_name = f"services/{COMPUTE_ENGINE_SERVICE_ID}"
-    compute_skus = gcp_client.get_skus(compute_service_name)
+    if compute_skus is None:
+        compute_skus = gcp_client.get_sku_index(f"services/{COMPUTE_ENGINE_SERVICE_ID}")
 
     # --- Compute Cost ---
     for instance in extracted_resources.get("compute_instances", []):
         machine_type = instance["machine_type"]
         node_count = instance.get("node_count", 1)
-        
-        # --- FINAL FIX: Implement smarter pricing logic for different VM types ---
-        is_priced_as_unit = False
 
         # 1. First, try to find an all-inclusive SKU for the entire machine instance.
         #    This is common for specialized types like A2, C3, H3, etc.
         vm_instance_sku = _find_sku(compute_skus, [machine_type, "instance"], region)
-        if vm_instance_sku:
-            instance_cost = _calculate_monthly_cost_from_sku(vm_instance_sku, node_count, region, gcp_client)
-            if instance_cost > 0:
-                cost_breakdown[f"{node_count}x {machine_type} Instance"] = instance_cost
-                total_cost += instance_cost
-                is_priced_as_unit = True # Mark that we've priced this machine.
+        if vm_instance_sku and _calculate_monthly_cost_from_sku(vm_instance_sku, node_count, region, gcp_client) > 0:
+            components.append({
+                "label": f"{node_count}x {machine_type} Instance",
+                "name": f"{machine_type} Instance",
+                "sku": vm_instance_sku,
+                "usage": node_count,
+                "node_count": node_count,
+            })
+            continue
 
         # 2. If no all-inclusive SKU was found, fall back to pricing components separately.
         #    This is the standard model for general-purpose machines like N1, N2, E2.
-        if not is_priced_as_unit:
-            machine_details = gcp_client.get_machine_type_details(zone, machine_type)
-            if machine_details:
-                machine_series = machine_type.split("-")[0].upper()
-                
-                # vCPU cost
-                cpu_sku = _find_sku(compute_skus, [machine_series, "vCPU"], region)
-                if cpu_sku:
-                    cpu_cost = _calculate_monthly_cost_from_sku(cpu_sku, machine_details.guest_cpus * node_count, region, gcp_client)
-                    cost_breakdown[f"{node_count}x {machine_type} (vCPU)"] = cpu_cost
-                    total_cost += cpu_cost
-                
-                # Memory cost
-                memory_gb = machine_details.memory_mb / 1024
-                ram_sku = _find_sku(compute_skus, [machine_series, "RAM"], region)
-                if ram_sku:
-                    memory_cost = _calculate_monthly_cost_from_sku(ram_sku, memory_gb * node_count, region, gcp_client)
-                    cost_breakdown[f"{node_count}x {machine_type} (Memory)"] = memory_cost
-                    total_cost += memory_cost
-
-                # GPU cost (only if not priced as a unit)
-                for accelerator in instance.get("accelerators", []):
-                    gpu_type = accelerator["type"].replace("nvidia-", "").replace("tesla-","").strip()
-                    gpu_count = accelerator["count"]
-                    gpu_sku = _find_sku(compute_skus, [gpu_type, "GPU"], region)
-                    if gpu_sku:
-                        gpu_cost = _calculate_monthly_cost_from_sku(gpu_sku, gpu_count * node_count, region, gcp_client)
-                        cost_breakdown[f"{gpu_count * node_count}x {accelerator['type']} GPU"] = gpu_cost
-                        total_cost += gpu_cost
-            else:
-                 cost_breakdown[f"{node_count}x {machine_type}"] = "Machine Type Details Not Found"
+        machine_details = gcp_client.get_machine_type_details(zone, machine_type)
+        if not machine_details:
+            components.append({
+                "label": f"{node_count}x {machine_type}",
+                "name": machine_type,
+                "sku": None,
+                "usage": 0,
+                "node_count": node_count,
+                "note": "Machine Type Details Not Found",
+            })
+            continue
+
+        machine_series = machine_type.split("-")[0].upper()
+        components.append({
+            "label": f"{node_count}x {machine_type} (vCPU)",
+            "name": f"{machine_type} (vCPU)",
+            "sku": _find_sku(compute_skus, [machine_series, "vCPU"], region),
+            "usage": machine_details.guest_cpus * node_count,
+            "node_count": node_count,
+        })
+        components.append({
+            "label": f"{node_count}x {machine_type} (Memory)",
+            "name": f"{machine_type} (Memory)",
+            "sku": _find_sku(compute_skus, [machine_series, "RAM"], region),
+            "usage": machine_details.memory_mb / 1024 * node_count,
+            "node_count": node_count,
+        })
+
+        # GPU cost (only if not priced as a unit)
+        for accelerator in instance.get("accelerators", []):
+            gpu_type = accelerator["type"].replace("nvidia-", "").replace("tesla-", "").strip()
+            gpu_count = accelerator["count"]
+            components.append({
+                "label": f"{gpu_count * node_count}x {accelerator['type']} GPU",
+                "name": f"{accelerator['type']} GPU",
+                "sku": _find_sku(compute_skus, [gpu_type, "GPU"], region),
+                "usage": gpu_count * node_count,
+                "node_count": node_count,
+            })
 
     # --- Storage Cost ---
-    filestore_service_name = f"services/{FILESTORE_SERVICE_ID}"
-    filestore_skus = gcp_client.get_skus(filestore_service_name)
-    
+    if filestore_skus is None:
+        filestore_skus = gcp_client.get_sku_index(f"services/{FILESTORE_SERVICE_ID}")
+
     for storage in extracted_resources.get("storage_instances", []):
         storage_type = storage["storage_type"]
-        capacity_gb = storage["capacity_gb"]
-        storage_key = f"Storage ({storage_type.capitalize()})"
-
+        component = {
+            "label": f"Storage ({storage_type.capitalize()})",
+            "name": f"Storage ({storage_type.capitalize()})",
+            "sku": None,
+            "usage": storage["capacity_gb"],
+            "node_count": None,
+        }
         if storage_type == "filestore":
-            filestore_sku = _find_sku(filestore_skus, ["Zonal", "Capacity"], region)
-            if filestore_sku:
-                storage_cost = _calculate_monthly_cost_from_sku(filestore_sku, capacity_gb, region, gcp_client)
-                cost_breakdown[storage_key] = storage_cost
-                total_cost += storage_cost
-            else:
-                cost_breakdown[storage_key] = "SKU Not Found"
+            component["sku"] = _find_sku(filestore_skus, ["Zonal", "Capacity"], region)
+            if component["sku"] is None:
+                component["note"] = "SKU Not Found"
         else:
-            cost_breakdown[storage_key] = "Pricing model not yet implemented"
+            component["note"] = "Pricing model not yet implemented"
+        components.append(component)
+
+    return components
+
+def estimate_cost(extracted_resources: Dict[str, Any], region: str, zone: str, gcp_client: "GcpClient") -> tuple[float, dict]:
+    """
+    Estimates the monthly cost of the configuration by querying the Cloud Billing Catalog API.
+    """
+    total_cost = 0.0
+    cost_breakdown = {}
 
-    return total_cost, cost_breakdown
\ No newline at end of file
+    with span("cost.sku_fetch"):
+        compute_skus = gcp_client.get_sku_index(f"services/{COMPUTE_ENGINE_SERVICE_ID}")
+        filestore_skus = gcp_client.get_sku_index(f"services/{FILESTORE_SERVICE_ID}")
+
+    with span("cost.sku_match"):
+        components = _resolve_components(
+            extracted_resources, region, zone, gcp_client, compute_skus=compute_skus, filestore_skus=filestore_skus
+        )
+
+    with span("cost.pricing"):
+        for component in components:
+            if "note" in component:
+                cost_breakdown[component["label"]] = component["note"]
+            elif component["sku"]:
+                cost = _calculate_monthly_cost_from_sku(component["sku"], component["usage"], region, gcp_client)
+                cost_breakdown[component["label"]] = cost
+                total_cost += cost
+
+    return total_cost, cost_breakdown
@@ -0,0 +1,242 @@
+"""
+This module contains what-if cost sweeps of a blueprint over node counts, monthly usage
+hours and regions, and the ranking of regions by monthly cost.
+"""
+
+import csv
+import io
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from src.cost_estimator import (
+    COMPUTE_ENGINE_SERVICE_ID,
+    FILESTORE_SERVICE_ID,
+    HOURS_PER_MONTH,
+    _calculate_monthly_cost_from_sku,
+    _is_billed_hourly,
+    _resolve_components,
+)
+from src.sku_index import SkuPivot
+from src.tracing import span
+
+# Upper bound on the region x node count x hours cells of one sweep, checked before any SKU
+# is resolved. Every cell is priced once per component.
+MAX_SWEEP_CELLS = 1_000_000
+# The tighter bound of sweeps requested through the API.
+API_MAX_SWEEP_CELLS = 100_000
+
+
+def _per_node_resources(extracted_resources: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        **extracted_resources,
+        "compute_instances": [
+            {**instance, "node_count": 1} for instance in extracted_resources.get("compute_instances", [])
+        ],
+    }
+
+
+def sweep_costs(
+    extracted_resources: Dict[str, Any],
+    regions: Iterable[str],
+    zone: str,
+    gcp_client,
+    node_counts: Iterable[int],
+    hours: Iterable[float] = (HOURS_PER_MONTH,),
+    max_cells: int = MAX_SWEEP_CELLS,
+) -> Dict[str, Any]:
+    """
+    Prices the resources for every combination of region, node count and monthly hours.
+
+    SKU rates are resolved once per region, then the whole grid is priced against their
+    tiers with array operations. Every compute instance runs at the swept node count for the swept
+    number of hours. Storage is billed for the full month regardless of either. Machine
+    shapes are read from `zone`. A ValueError is raised when the grid has more than
+    `max_cells` region x node count x hours cells.
+
+    Returns {"regions", "node_counts", "hours", "components", "costs", "totals",
+    "unit_prices", "missing"}. "costs" is a (region, component, node count, hours) array
+    and "totals" its sum over components. Components are named by their breakdown label
+    at one node, numbered when it repeats. "missing" lists, per region, the components
+    without a price there.
+    """
+    regions = list(dict.fromkeys(regions))
+    node_grid = np.asarray(list(node_counts), dtype=np.float64)
+    hour_grid = np.asarray(list(hours), dtype=np.float64)
+    cells = len(regions) * node_grid.size * hour_grid.size
+    if cells > max_cells:
+        raise ValueError(f"The sweep has {cells} region, node count and hours cells, more than the {max_cells} allowed.")
+    per_node = _per_node_resources(extracted_resources)
+
+    # A column per component, keyed like rank_regions' by its label and the label's
+    # occurrence in the region, so two modules of one machine type stay apart.
+    columns: Dict[tuple, int] = {}
+    components: List[str] = []
+    scales_with_nodes: List[bool] = []
+    region_prices = []
+    unit_prices = {}
+    missing = {}
+    with span("cost.sku_match"):
+        for region in regions:
+            prices = []
+            unit_prices[region] = {}
+            missing[region] = []
+            occurrences: Dict[str, int] = {}
+            for component in _resolve_components(per_node, region, zone, gcp_client):
+                label = component["label"]
+                occurrence = occurrences[label] = occurrences.get(label, -1) + 1
+                if (label, occurrence) not in columns:
+                    columns[(label, occurrence)] = len(columns)
+                    components.append(f"{label} #{occurrence + 1}" if occurrence else label)
+                    scales_with_nodes.append(component["node_count"] is not None)
+                c = columns[(label, occurrence)]
+                price = gcp_client.get_sku_price(component["sku"]) if component["sku"] else None
+                if price is None or not price.is_priced:
+                    missing[region].append(components[c])
+                    continue
+                unit_prices[region][components[c]] = price.unit_price
+                prices.append((c, component["usage"], price, _is_billed_hourly(component["sku"])))
+            region_prices.append(prices)
+
+    # Each component's month of usage is priced against its SKU's tiers over the whole grid
+    # at once. Node-scaled components use the swept node counts and hours; storage is billed
+    # for one instance and, when billed hourly, a full month.
+    costs = np.zeros((len(regions), len(components), node_grid.size, hour_grid.size))
+    with span("cost.pricing"):
+        for r, prices in enumerate(region_prices):
+            for c, usage, price, hourly in prices:
+                if scales_with_nodes[c]:
+                    monthly_usage = usage * node_grid[:, None] * (hour_grid[None, :] if hourly else 1.0)
+                else:
+                    monthly_usage = usage * (HOURS_PER_MONTH if hourly else 1.0)
+                costs[r, c] += price.cost(monthly_usage)
+
+    return {
+        "regions": regions,
+        "node_counts": node_grid.astype(int).tolist(),
+        "hours": hour_grid.tolist(),
+        "components": components,
+        "costs": costs,
+        "totals": costs.sum(axis=1),
+        "unit_prices": unit_prices,
+        "missing": missing,
+    }
+
+
+def rank_regions(
+    extracted_resources: Dict[str, Any],
+    zone: str,
+    gcp_client,
+    regions: Optional[Iterable[str]] = None,
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Prices the resources in every region of the Compute Engine SKU catalog (or in `regions`)
+    and returns the regions from the lowest monthly total to the highest. Machine shapes are
+    read from `zone`.
+
+    Each SKU lookup is matched once against the whole catalog and pivoted to its first SKU in
+    every region, so the components of all regions are resolved in one pass. Their tiered
+    monthly costs form a region x component matrix that is totalled with array operations.
+
+    Every ranked region has its "total_cost", the "cost_breakdown" estimate_cost would return
+    there, with "SKU Not Found" for components it has no SKU for, and "missing": the
+    components it has no SKU or price for. Regions with missing components rank after the fully
+    priced ones, because their totals leave those components out.
+    """
+    with span("cost.sku_fetch"):
+        compute_skus = SkuPivot(gcp_client.get_sku_index(f"services/{COMPUTE_ENGINE_SERVICE_ID}"))
+        filestore_skus = SkuPivot(gcp_client.get_sku_index(f"services/{FILESTORE_SERVICE_ID}"))
+    regions = list(dict.fromkeys(regions)) if regions else compute_skus.index.regions()
+
+    # A column per component, keyed by its label and, since labels can repeat (e.g. two
+    # Filestore instances), by the label's occurrence in the region.
+    columns: Dict[tuple, int] = {}
+    resolved = []
+    with span("cost.sku_match"):
+        for region in regions:
+            components = _resolve_components(
+                extracted_resources, region, zone, gcp_client, compute_skus=compute_skus, filestore_skus=filestore_skus
+            )
+            occurrences: Dict[str, int] = {}
+            for component in components:
+                occurrence = occurrences[component["label"]] = occurrences.get(component["label"], -1) + 1
+                component["column"] = columns.setdefault((component["label"], occurrence), len(columns))
+            resolved.append(components)
+
+    # costs[r, c] is the monthly cost of component c in region r, priced against the tiers of
+    # its SKU there; components a region does not bill (another pricing model, or no SKU)
+    # cost nothing and are not priced.
+    costs = np.zeros((len(regions), len(columns)))
+    priced = np.zeros((len(regions), len(columns)), dtype=bool)
+    with span("cost.pricing"):
+        for r, (region, components) in enumerate(zip(regions, resolved)):
+            for component in components:
+                if "note" in component or not component["sku"]:
+                    continue
+                c = component["column"]
+                priced[r, c] = gcp_client.get_sku_price(component["sku"]).is_priced
+                costs[r, c] = _calculate_monthly_cost_from_sku(component["sku"], component["usage"], region, gcp_client)
+        totals = costs.sum(axis=1)
+
+    ranked = []
+    for r, region in enumerate(regions):
+        cost_breakdown = {}
+        missing = []
+        for component in resolved[r]:
+            label = component["label"]
+            if "note" in component:
+                # Other notes (e.g. an unpriced storage type) apply to every region alike.
+                cost_breakdown[label] = component["note"]
+                if component["note"] == "SKU Not Found":
+                    missing.append(label)
+            elif not component["sku"]:
+                cost_breakdown[label] = "SKU Not Found"
+                missing.append(label)
+            else:
+                cost_breakdown[label] = float(costs[r, component["column"]])
+                if not priced[r, component["column"]]:
+                    missing.append(label)
+        ranked.append({
+            "region": region,
+            "total_cost": float(totals[r]),
+            "cost_breakdown": cost_breakdown,
+            "missing": missing,
+        })
+
+    ranked.sort(key=lambda result: (bool(result["missing"]), result["total_cost"]))
+    return ranked[:limit] if limit is not None else ranked
+
+
+def sweep_table(sweep: Dict[str, Any], include_components: bool = False) -> Dict[str, Any]:
+    """
+    Returns a JSON-ready sweep: "totals"[region][node count][hours] in cents-rounded dollars
+    and, with `include_components`, "component_costs"[region][component][node count][hours].
+    """
+    table = {key: sweep[key] for key in ("regions", "node_counts", "hours", "components", "unit_prices", "missing")}
+    table["totals"] = np.round(sweep["totals"], 2).tolist()
+    if include_components:
+        table["component_costs"] = np.round(sweep["costs"], 2).tolist()
+    return table
+
+
+def sweep_csv(sweep: Dict[str, Any], include_components: bool = False) -> str:
+    """
+    Returns a sweep as CSV with one row per region, node count and hours.
+    """
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(
+        ["region", "node_count", "hours", "total_cost", *(sweep["components"] if include_components else [])]
+    )
+    node_counts = np.repeat(sweep["node_counts"], len(sweep["hours"])).tolist()
+    hours = np.tile(sweep["hours"], len(sweep["node_counts"])).tolist()
+    for r, region in enumerate(sweep["regions"]):
+        costs = [sweep["totals"][r].ravel()]
+        if include_components:
+            costs.extend(sweep["costs"][r].reshape(len(sweep["components"]), -1))
+        writer.writerows(
+            [region, node_count, f"{hour:g}", *(f"{cost:.2f}" for cost in row)]
+            for node_count, hour, row in zip(node_counts, hours, np.column_stack(costs).tolist())
+        )
+    return output.getvalue()
@@ -1,6 +1,29 @@
 from functools import lru_cache
+from typing import Dict
+from cachetools.func import ttl_cache
 from src.gcp_client import GcpClient
+from src.async_gcp_client import AsyncGcpClient
+from src.offline_gcp_client import create_async_gcp_client, create_gcp_client
+from src.region_finder import CapabilityIndex
 
+_gcp_clients: Dict[str, GcpClient] = {}
+
+# With CATALOG_SNAPSHOT_PATH set, clients serve catalog data from that snapshot file.
 @lru_cache()
 def get_gcp_client(project_id: str) -> GcpClient:
-    return GcpClient(project_id=project_id)
+    client = _gcp_clients[project_id] = create_gcp_client(project_id=project_id)
+    return client
+
+def get_gcp_clients() -> Dict[str, GcpClient]:
+    """
+    Returns the clients created so far, by project.
+    """
+    return dict(_gcp_clients)
+
+@lru_cache()
+def get_async_gcp_client(project_id: str) -> AsyncGcpClient:
+    return create_async_gcp_client(get_gcp_client(project_id=project_id))
+
+@ttl_cache(maxsize=32, ttl=900)
+def get_capability_index(project_id: str) -> CapabilityIndex:
+    return CapabilityIndex(get_gcp_client(project_id=project_id).get_all_zones_with_resources())
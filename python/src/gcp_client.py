@@ -1,7 +1,14 @@
+import functools
+import inspect
 import os
-from typing import Any, Dict, List
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
 
+import google.auth
 from google.api_core.exceptions import GoogleAPIError, NotFound
+from google.auth.credentials import Credentials
 from google.cloud import (
     billing_v1,
     cloudquotas_v1,
@@ -12,163 +19,469 @@ from google.cloud import (
     tpu_v2,
 )
 
+from src.catalog_cache import BoundedTTLCache, SkuCatalogCache, ZoneSnapshot
+from src.catalog_records import MachineTypeRecord, SkuRecord
+from src.metrics import method_name, observe_upstream_call
+from src.price_table import DEFAULT_CURRENCY, SkuPrice, sku_price
+from src.quota_table import COMPUTE_QUOTA_SERVICE, QUOTA_SERVICES, QuotaTable, compute_quota
+from src.response_cache import canonical_hash
+from src.single_flight import SingleFlight
+from src.sku_index import SkuIndex
+from src.tracing import span
+
+# How long a fetched billing catalog is served before it is refreshed in the background.
+DEFAULT_SKU_CACHE_TTL_SECONDS = 3600
+# Bounds for the per-zone machine/accelerator snapshots and storage location lists.
+DEFAULT_ZONE_CACHE_TTL_SECONDS = 900
+DEFAULT_ZONE_CACHE_MAX_ZONES = 256
+# How long a project's quota table is served before it is fetched again.
+DEFAULT_QUOTA_CACHE_TTL_SECONDS = 300
+# Fan-out limits for get_all_zones_with_resources.
+DEFAULT_MAX_IN_FLIGHT = 16
+DEFAULT_CALL_TIMEOUT_SECONDS = 30.0
+
+CLOUD_PLATFORM_SCOPE = "https://www.googleapis.com/auth/cloud-platform"
+
+STORAGE_SERVICE_NAMES = {
+    "filestore": "Filestore",
+    "lustre": "Managed Lustre",
+    "parallelstore": "Parallelstore",
+}
+
+@functools.lru_cache(maxsize=None)
+def get_default_credentials() -> Credentials:
+    """
+    Resolves Application Default Credentials once per process.
+    """
+    credentials, _ = google.auth.default(scopes=[CLOUD_PLATFORM_SCOPE])
+    return credentials
+
+
+class LazyClient:
+    """
+    A client attribute whose API client is created on first access, with the owner's
+    shared credentials, and then reused.
+    """
+
+    def __init__(self, factory: Callable[..., Any]):
+        self.factory = factory
+
+    def __set_name__(self, owner, name: str):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        with instance._client_lock:
+            client = instance.__dict__.get(self.name)
+            if client is None:
+                client = self.factory(credentials=instance.credentials)
+                # The instance attribute now shadows this descriptor, so later reads skip the lock.
+                instance.__dict__[self.name] = client
+        return client
+
+
 class GcpClient:
     """
     A client to handle all interactions with Google Cloud APIs for HPC resource management.
     """
 
-    def __init__(self, project_id: str = None):
+    compute_client = LazyClient(compute_v1.MachineTypesClient)
+    accelerator_client = LazyClient(compute_v1.AcceleratorTypesClient)
+    zones_client = LazyClient(compute_v1.ZonesClient)
+    tpu_client = LazyClient(tpu_v2.TpuClient)
+    billing_client = LazyClient(billing_v1.CloudCatalogClient)
+    quotas_client = LazyClient(cloudquotas_v1.CloudQuotasClient)
+    filestore_client = LazyClient(filestore_v1.CloudFilestoreManagerClient)
+    lustre_client = LazyClient(lustre_v1.LustreClient)
+    parallelstore_client = LazyClient(parallelstore_v1.ParallelstoreClient)
+
+    def __init__(
+        self,
+        project_id: str = None,
+        sku_cache_ttl: float = None,
+        zone_cache_ttl: float = None,
+        credentials: Credentials = None,
+        quota_cache_ttl: float = None,
+    ):
         self.project_id = project_id if project_id else os.getenv("GCP_PROJECT_ID")
         if not self.project_id:
             raise ValueError(
                 "Google Cloud project ID must be provided or set in GCP_PROJECT_ID environment variable."
             )
 
-        self.compute_client = compute_v1.MachineTypesClient()
-        self.accelerator_client = compute_v1.AcceleratorTypesClient()
-        self.zones_client = compute_v1.ZonesClient()
-        self.tpu_client = tpu_v2.TpuClient()
-        self.billing_client = billing_v1.CloudCatalogClient()
-        self.quotas_client = cloudquotas_v1.CloudQuotasClient()
-        self.filestore_client = filestore_v1.CloudFilestoreManagerClient()
-        self.lustre_client = lustre_v1.LustreClient()
-        self.parallelstore_client = parallelstore_v1.ParallelstoreClient()
+        self._credentials = credentials
+        self._client_lock = threading.Lock()
 
-    def get_available_machine_types(self, zone: str) -> list:
+        if sku_cache_ttl is None:
+            sku_cache_ttl = float(os.getenv("SKU_CACHE_TTL_SECONDS", DEFAULT_SKU_CACHE_TTL_SECONDS))
+        self.sku_cache = SkuCatalogCache(ttl_seconds=sku_cache_ttl)
+
+        if zone_cache_ttl is None:
+            zone_cache_ttl = float(os.getenv("ZONE_CACHE_TTL_SECONDS", DEFAULT_ZONE_CACHE_TTL_SECONDS))
+        zone_cache_size = int(os.getenv("ZONE_CACHE_MAX_ZONES", DEFAULT_ZONE_CACHE_MAX_ZONES))
+        self.zone_cache = BoundedTTLCache(maxsize=zone_cache_size, ttl_seconds=zone_cache_ttl)
+        self.storage_cache = BoundedTTLCache(maxsize=len(STORAGE_SERVICE_NAMES), ttl_seconds=zone_cache_ttl)
+
+        if quota_cache_ttl is None:
+            quota_cache_ttl = float(os.getenv("QUOTA_CACHE_TTL_SECONDS", DEFAULT_QUOTA_CACHE_TTL_SECONDS))
+        self.quota_cache = BoundedTTLCache(maxsize=1, ttl_seconds=quota_cache_ttl)
+        # Concurrent identical upstream calls, sync or async, share one in-flight call.
+        self.single_flight = SingleFlight()
+
+    @property
+    def credentials(self) -> Credentials:
+        """
+        The credentials shared by every API client, the process-wide defaults unless given.
+        """
+        if self._credentials is None:
+            self._credentials = get_default_credentials()
+        return self._credentials
+
+    def get_created_clients(self) -> List[str]:
+        """
+        Returns the names of the API clients created so far.
+        """
+        return sorted(
+            name for name, attr in inspect.getmembers(type(self))
+            if isinstance(attr, LazyClient) and name in self.__dict__
+        )
+
+    def _call_once(self, fetch: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Calls `fetch(*args, **kwargs)`, or waits for an identical call already in flight.
+        Calls are keyed by the fetch method and its positional arguments; keyword arguments
+        such as `timeout` do not split the key.
+        """
+        method = method_name(fetch)
+
+        def call():
+            with span(f"gcp.{method}"), observe_upstream_call(method):
+                return fetch(*args, **kwargs)
+
+        return self.single_flight.do((fetch.__name__, args), call)
+
+    def _fetch_zone_snapshot(self, zone: str) -> ZoneSnapshot:
+        mt_request = compute_v1.ListMachineTypesRequest(project=self.project_id, zone=zone)
+        machine_types = [MachineTypeRecord.from_message(mt) for mt in self.compute_client.list(request=mt_request)]
+        gpu_request = compute_v1.ListAcceleratorTypesRequest(project=self.project_id, zone=zone)
+        gpus = [at.name for at in self.accelerator_client.list(request=gpu_request)]
+        return ZoneSnapshot(zone, machine_types, gpus, time.time())
+
+    def get_zone_snapshot(self, zone: str) -> ZoneSnapshot:
+        """
+        Returns the cached machine type and accelerator snapshot of a zone.
+        """
         try:
-            request = compute_v1.ListMachineTypesRequest(project=self.project_id, zone=zone)
-            return [mt.name for mt in self.compute_client.list(request=request)]
+            return self.zone_cache.get(zone, functools.partial(self._call_once, self._fetch_zone_snapshot))
         except (NotFound, GoogleAPIError) as e:
-            print(f"Could not fetch machine types for zone '{zone}': {e}")
-            return []
+            print(f"Could not fetch machine and accelerator types for zone '{zone}': {e}")
+            return ZoneSnapshot(zone, [], [], time.time())
+
+    def get_available_machine_types(self, zone: str) -> list:
+        return self.get_zone_snapshot(zone).machine_type_names
 
     def get_available_gpus(self, zone: str) -> list:
-        try:
-            request = compute_v1.ListAcceleratorTypesRequest(project=self.project_id, zone=zone)
-            return [at.name for at in self.accelerator_client.list(request=request)]
-        except (NotFound, GoogleAPIError) as e:
-            print(f"Could not fetch GPU types for zone '{zone}': {e}")
-            return []
+        return self.get_zone_snapshot(zone).gpus
+
+    def _fetch_tpus(self, zone: str, timeout: float = None) -> list:
+        parent = f"projects/{self.project_id}/locations/{zone}"
+        request = tpu_v2.ListAcceleratorTypesRequest(parent=parent)
+        return [acc.type for acc in self.tpu_client.list_accelerator_types(request=request, timeout=timeout)]
 
     def get_available_tpus(self, zone: str) -> list:
         try:
-            parent = f"projects/{self.project_id}/locations/{zone}"
-            request = tpu_v2.ListAcceleratorTypesRequest(parent=parent)
-            return [acc.type for acc in self.tpu_client.list_accelerator_types(request=request)]
+            return self._call_once(self._fetch_tpus, zone)
         except (NotFound, GoogleAPIError) as e:
             if "service is not enabled" not in str(e):
                 print(f"Could not fetch TPU types for zone '{zone}': {e}")
             return []
 
-    def check_project_quotas(self, region: str, resource_name: str, required_count: int) -> bool:
+    def _fetch_quota_table(self, project_id: str) -> QuotaTable:
+        """
+        Sweeps all quota infos of the quota services and all quota preferences of a project.
+        """
+        parent = f"projects/{project_id}/locations/global"
+        quota_infos = []
+        for service in QUOTA_SERVICES:
+            request = cloudquotas_v1.ListQuotaInfosRequest(parent=f"{parent}/services/{service}")
+            try:
+                quota_infos.extend(self.quotas_client.list_quota_infos(request=request))
+            except GoogleAPIError as e:
+                # Quotas of the optional services are only enforced when they can be listed.
+                if service == COMPUTE_QUOTA_SERVICE:
+                    raise
+                if "service is not enabled" not in str(e):
+                    print(f"Could not fetch quotas of '{service}': {e}")
+        request = cloudquotas_v1.ListQuotaPreferencesRequest(parent=parent)
+        quota_preferences = list(self.quotas_client.list_quota_preferences(request=request))
+        return QuotaTable.from_quota_infos(quota_infos, quota_preferences, time.time())
+
+    def get_quota_table(self) -> Optional[QuotaTable]:
+        """
+        Returns the cached quota table of the project, or None if it could not be fetched.
+        """
         try:
-            # Simplified for now
-            return True 
-        except (NotFound, GoogleAPIError) as e:
-            print(f"Could not check quotas for '{resource_name}' in '{region}': {e}")
+            return self.quota_cache.get(self.project_id, functools.partial(self._call_once, self._fetch_quota_table))
+        except GoogleAPIError as e:
+            print(f"Could not fetch quotas for project '{self.project_id}': {e}")
+            return None
+
+    def check_project_quotas(self, region: str, resource_name: str, required_count: int) -> bool:
+        """
+        Checks one regional Compute Engine quota, named "CPUS", "<VM family>_CPUS" or
+        "<GPU family>_GPUS", against the quota table. Quotas the table does not list pass.
+        """
+        table = self.get_quota_table()
+        if table is None:
             return False
+        metric, dimensions = compute_quota(resource_name, region)
+        return not table.check([{"metric": metric, "dimensions": dimensions, "amount": required_count}])
 
-    def get_available_filestore_regions(self) -> list:
+    def _fetch_storage_locations(self, service: str, timeout: float = None) -> list:
+        client = {
+            "filestore": self.filestore_client,
+            "lustre": self.lustre_client,
+            "parallelstore": self.parallelstore_client,
+        }[service]
+        response = client.list_locations(request={"name": f"projects/{self.project_id}"}, timeout=timeout)
+        return [loc.location_id for loc in response.locations]
+
+    def get_storage_locations(self, service: str) -> list:
+        """
+        Returns the cached location ids of a storage service ("filestore", "lustre" or "parallelstore").
+        """
         try:
-            request = {"name": f"projects/{self.project_id}"}
-            response = self.filestore_client.list_locations(request=request)
-            return [loc.location_id for loc in response.locations]
+            return self.storage_cache.get(service, functools.partial(self._call_once, self._fetch_storage_locations))
         except GoogleAPIError as e:
-            print(f"Error fetching Filestore locations: {e}")
+            print(f"Error fetching {STORAGE_SERVICE_NAMES[service]} locations: {e}")
             return []
 
+    def get_available_filestore_regions(self) -> list:
+        return self.get_storage_locations("filestore")
+
     def get_available_lustre_regions(self) -> list:
-        try:
-            request = {"name": f"projects/{self.project_id}"}
-            response = self.lustre_client.list_locations(request=request)
-            return [loc.location_id for loc in response.locations]
-        except GoogleAPIError as e:
-            print(f"Error fetching Managed Lustre locations: {e}")
-            return []
+        return self.get_storage_locations("lustre")
 
     def get_available_parallelstore_regions(self) -> list:
-        try:
-            request = {"name": f"projects/{self.project_id}"}
-            response = self.parallelstore_client.list_locations(request=request)
-            return [loc.location_id for loc in response.locations]
-        except GoogleAPIError as e:
-            print(f"Error fetching Parallelstore locations: {e}")
-            return []
+        return self.get_storage_locations("parallelstore")
 
     def get_vm_accelerator_pairings(self, zone: str) -> Dict[str, Any]:
-        pairings = {}
-        try:
-            request = compute_v1.ListMachineTypesRequest(project=self.project_id, zone=zone)
-            for machine_type in self.compute_client.list(request=request):
-                if machine_type.accelerators:
-                    pairings[machine_type.name] = [
-                        {"accelerator_type": acc.guest_accelerator_type, "accelerator_count": acc.guest_accelerator_count}
-                        for acc in machine_type.accelerators
-                    ]
-        except GoogleAPIError as e:
-            print(f"Error fetching VM-accelerator pairings for zone '{zone}': {e}")
-        return pairings
+        return self.get_zone_snapshot(zone).pairings
 
-    def get_machine_type_details(self, zone: str, machine_type: str) -> compute_v1.MachineType:
-        try:
-            request = compute_v1.GetMachineTypeRequest(project=self.project_id, zone=zone, machine_type=machine_type)
-            return self.compute_client.get(request=request)
-        except (NotFound, GoogleAPIError) as e:
-            print(f"Error fetching machine type details for '{machine_type}' in zone '{zone}': {e}")
-            return None
+    def get_machine_type_details(self, zone: str, machine_type: str) -> Optional[MachineTypeRecord]:
+        """
+        Returns the machine type's record, or None if the zone does not offer it. Callers
+        probe zones that lack a machine type routinely, so a miss is not reported.
+        """
+        return self.get_zone_snapshot(zone).machine_types.get(machine_type)
+
+    def _fetch_skus(self, service_name: str) -> list:
+        request = billing_v1.ListSkusRequest(parent=service_name)
+        return [SkuRecord.from_message(sku) for sku in self.billing_client.list_skus(request=request)]
 
     def get_skus(self, service_name: str) -> list:
+        """
+        Returns the SKUs of a billing service from the catalog cache.
+        """
         try:
-            request = billing_v1.ListSkusRequest(parent=service_name)
-            return list(self.billing_client.list_skus(request=request))
+            return self.sku_cache.get(service_name, functools.partial(self._call_once, self._fetch_skus)).skus
         except GoogleAPIError as e:
             print(f"Error fetching SKUs for service '{service_name}': {e}")
             return []
 
-    def get_sku_pricing(self, sku: billing_v1.Sku, region: str, currency_code: str = "USD") -> float:
+    def get_sku_index(self, service_name: str) -> SkuIndex:
+        """
+        Returns the prebuilt description index of a billing service's cached catalog.
+        """
+        try:
+            return self.sku_cache.get(service_name, functools.partial(self._call_once, self._fetch_skus)).index
+        except GoogleAPIError as e:
+            print(f"Error fetching SKUs for service '{service_name}': {e}")
+            return SkuIndex([])
+
+    def get_catalog_version(
+        self, zone: str, service_names: Iterable[str] = (), storage_services: Iterable[str] = (), quotas: bool = False
+    ) -> Optional[str]:
         """
-        Extracts the on-demand pricing for a given SKU.
-        The `region` parameter is kept for context but the check is removed as the parent SKU is already region-filtered.
+        Returns a digest of the cached zone snapshot, SKU catalogs, storage location lists and
+        (with `quotas`) quota table a response depends on, or None if any of them is not
+        cached. Never calls upstream.
         """
-        if sku.pricing_info:
-            for pricing_info in sku.pricing_info:
-                # --- FINAL FIX: Removed the redundant and incorrect region check ---
-                if pricing_info.pricing_expression and pricing_info.pricing_expression.tiered_rates:
-                    for tier in pricing_info.pricing_expression.tiered_rates:
-                        if tier.unit_price and tier.unit_price.currency_code == currency_code:
-                            return tier.unit_price.units + (tier.unit_price.nanos / 1e9)
-        return 0.0
+        snapshot = self.zone_cache.peek(zone)
+        if snapshot is None:
+            return None
+        parts = [snapshot.version]
+        for service_name in sorted(set(service_names)):
+            catalog = self.sku_cache.peek(service_name)
+            if catalog is None:
+                return None
+            parts.append(catalog.version)
+        for service in sorted(set(storage_services)):
+            locations = self.storage_cache.peek(service)
+            if locations is None:
+                return None
+            parts.append(sorted(locations))
+        if quotas:
+            quota_table = self.quota_cache.peek(self.project_id)
+            if quota_table is None:
+                return None
+            parts.append(quota_table.version)
+        return canonical_hash(parts)
 
-    def get_all_zones_with_resources(self) -> Dict[str, Any]:
+    def get_cache_stats(self) -> Dict[str, Any]:
+        return {
+            "sku_catalog": self.sku_cache.stats(),
+            "zone_snapshots": self.zone_cache.stats(),
+            "storage_locations": self.storage_cache.stats(),
+            "quotas": self.quota_cache.stats(),
+            "single_flight": self.single_flight.stats(),
+            "api_clients": self.get_created_clients(),
+        }
+
+    def get_sku_price(self, sku: SkuRecord, currency_code: str = DEFAULT_CURRENCY) -> SkuPrice:
+        """
+        Returns the tiered rates of a SKU, from the price table of its cached catalog when
+        there is one.
+        """
+        if currency_code == DEFAULT_CURRENCY:
+            catalog = self.sku_cache.peek(sku.name.split("/skus/")[0])
+            price = catalog.prices.get(sku.name) if catalog else None
+            if price is not None:
+                return price
+        return sku_price(sku, currency_code)
+
+    def get_sku_pricing(self, sku: SkuRecord, region: str, currency_code: str = DEFAULT_CURRENCY) -> float:
+        """
+        Extracts the on-demand unit price of a SKU's first pricing tier.
+        The `region` parameter is kept for context; the SKU is already region-filtered.
+        """
+        return self.get_sku_price(sku, currency_code).unit_price
+
+    def _fetch_aggregated_machine_types(self, timeout: float = None) -> Dict[str, list]:
+        request = compute_v1.AggregatedListMachineTypesRequest(project=self.project_id)
+        return {
+            os.path.basename(scope): [MachineTypeRecord.from_message(mt) for mt in response.machine_types]
+            for scope, response in self.compute_client.aggregated_list(request=request, timeout=timeout)
+            if response.machine_types
+        }
+
+    def _fetch_aggregated_gpus(self, timeout: float = None) -> Dict[str, list]:
+        request = compute_v1.AggregatedListAcceleratorTypesRequest(project=self.project_id)
+        return {
+            os.path.basename(scope): list(response.accelerator_types)
+            for scope, response in self.accelerator_client.aggregated_list(request=request, timeout=timeout)
+            if response.accelerator_types
+        }
+
+    def collect_all_zones(self, max_in_flight: int = None, call_timeout: float = None) -> Dict[str, Any]:
+        """
+        Fetches the machine types, GPU types and TPU types of every zone, plus the storage locations.
+
+        Upstream calls run concurrently with at most `max_in_flight` in flight (1 collects
+        sequentially), each bounded by a `call_timeout` deadline in seconds. Returns
+        {"machine_types": {zone: [MachineTypeRecord]}, "gpus": {zone: [AcceleratorType]},
+        "tpus": {zone: [str]}, "storage": {service: [location]}, "collection_errors": [str]}.
+        "machine_types" or "gpus" is None when its aggregated list could not be fetched.
+        """
+        if max_in_flight is None:
+            max_in_flight = int(os.getenv("GCP_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT))
+        if call_timeout is None:
+            call_timeout = float(os.getenv("GCP_CALL_TIMEOUT_SECONDS", DEFAULT_CALL_TIMEOUT_SECONDS))
+
+        collection_errors = []
+
+        def result_or_error(future: Future, description: str, default: Any) -> Any:
+            try:
+                return future.result()
+            except GoogleAPIError as e:
+                print(f"Error fetching {description}: {e}")
+                collection_errors.append(f"{description}: {e}")
+                return default
+
+        with ThreadPoolExecutor(max_workers=max(1, max_in_flight)) as executor:
+            mt_future = executor.submit(self._call_once, self._fetch_aggregated_machine_types, timeout=call_timeout)
+            gpu_future = executor.submit(self._call_once, self._fetch_aggregated_gpus, timeout=call_timeout)
+            storage_loader = functools.partial(self._call_once, self._fetch_storage_locations, timeout=call_timeout)
+            storage_futures = {
+                service: executor.submit(self.storage_cache.get, service, storage_loader)
+                for service in STORAGE_SERVICE_NAMES
+            }
+
+            machine_types_by_zone = result_or_error(mt_future, "machine types for all zones", None)
+            gpus_by_zone = result_or_error(gpu_future, "GPU types for all zones", None)
+
+            zones = sorted(set(machine_types_by_zone or {}) | set(gpus_by_zone or {}))
+            tpu_futures = {
+                zone_name: executor.submit(self._call_once, self._fetch_tpus, zone_name, timeout=call_timeout)
+                for zone_name in zones
+            }
+            tpus_by_zone = {}
+            for zone_name, future in tpu_futures.items():
+                try:
+                    tpus_by_zone[zone_name] = future.result()
+                except GoogleAPIError as e:
+                    tpus_by_zone[zone_name] = []
+                    if "service is not enabled" not in str(e):
+                        collection_errors.append(f"TPU types for zone '{zone_name}': {e}")
+
+            storage = {
+                service: result_or_error(future, f"{STORAGE_SERVICE_NAMES[service]} locations", [])
+                for service, future in storage_futures.items()
+            }
+
+        return {
+            "machine_types": machine_types_by_zone,
+            "gpus": gpus_by_zone,
+            "tpus": tpus_by_zone,
+            "storage": storage,
+            "collection_errors": collection_errors,
+        }
+
+    def get_all_zones_with_resources(self, max_in_flight: int = None, call_timeout: float = None) -> Dict[str, Any]:
+        """
+        Collects the machine types, VM-accelerator pairings, GPUs and TPUs of every zone, plus
+        storage availability.
+
+        Upstream calls run concurrently with at most `max_in_flight` in flight (1 collects
+        sequentially), each bounded by a `call_timeout` deadline in seconds. Failed calls are
+        listed under "collection_errors" and everything else is still returned.
+        """
+        collected = self.collect_all_zones(max_in_flight=max_in_flight, call_timeout=call_timeout)
+        machine_types_by_zone = collected["machine_types"]
+        gpus_by_zone = collected["gpus"]
         all_zone_resources = {}
-        try:
-            mt_request = compute_v1.AggregatedListMachineTypesRequest(project=self.project_id)
-            for scope, response in self.compute_client.aggregated_list(request=mt_request):
-                if response.machine_types:
-                    zone_name = os.path.basename(scope)
-                    all_zone_resources.setdefault(zone_name, {})
-                    all_zone_resources[zone_name]["available_machine_types"] = [mt.name for mt in response.machine_types]
-                    pairings = {mt.name: [{"type": acc.guest_accelerator_type, "count": acc.guest_accelerator_count} for acc in mt.accelerators] for mt in response.machine_types if mt.accelerators}
-                    all_zone_resources[zone_name]["vm_accelerator_pairings"] = pairings
-
-            gpu_request = compute_v1.AggregatedListAcceleratorTypesRequest(project=self.project_id)
-            for scope, response in self.accelerator_client.aggregated_list(request=gpu_request):
-                if response.accelerator_types:
-                    zone_name = os.path.basename(scope)
-                    all_zone_resources.setdefault(zone_name, {})
-                    all_zone_resources[zone_name]["available_gpus"] = [gpu.name for gpu in response.accelerator_types]
-
-            for zone_name in list(all_zone_resources.keys()):
-                all_zone_resources[zone_name]["available_tpus"] = self.get_available_tpus(zone_name)
-                all_zone_resources[zone_name]["region"] = "-".join(zone_name.split("-")[:-1])
-
-            all_zone_resources["global_storage_availability"] = {
-                "filestore_regions": self.get_available_filestore_regions(),
-                "lustre_regions": self.get_available_lustre_regions(),
-                "parallelstore_regions": self.get_available_parallelstore_regions(),
+
+        for zone_name, machine_types in (machine_types_by_zone or {}).items():
+            all_zone_resources.setdefault(zone_name, {})
+            all_zone_resources[zone_name]["available_machine_types"] = [mt.name for mt in machine_types]
+            pairings = {mt.name: [{"type": acc.guest_accelerator_type, "count": acc.guest_accelerator_count} for acc in mt.accelerators] for mt in machine_types if mt.accelerators}
+            all_zone_resources[zone_name]["vm_accelerator_pairings"] = pairings
+
+        for zone_name, gpus in (gpus_by_zone or {}).items():
+            all_zone_resources.setdefault(zone_name, {})
+            all_zone_resources[zone_name]["available_gpus"] = [gpu.name for gpu in gpus]
+            all_zone_resources[zone_name]["gpu_max_cards_per_instance"] = {
+                gpu.name: gpu.maximum_cards_per_instance for gpu in gpus
             }
 
-        except GoogleAPIError as e:
-            print(f"Error fetching all zone resources: {e}")
+        if machine_types_by_zone is not None and gpus_by_zone is not None:
+            # The aggregated lists hold everything a zone snapshot needs, so warm the zone cache too.
+            fetched_at = time.time()
+            for zone_name, machine_types in machine_types_by_zone.items():
+                self.zone_cache.put(
+                    zone_name,
+                    ZoneSnapshot(
+                        zone_name, machine_types, [gpu.name for gpu in gpus_by_zone.get(zone_name, [])], fetched_at
+                    ),
+                )
+
+        for zone_name in all_zone_resources:
+            all_zone_resources[zone_name]["available_tpus"] = collected["tpus"].get(zone_name, [])
+            all_zone_resources[zone_name]["region"] = "-".join(zone_name.split("-")[:-1])
 
-        return all_zone_resources
\ No newline at end of file
+        all_zone_resources["global_storage_availability"] = {
+            f"{service}_regions": locations for service, locations in collected["storage"].items()
+        }
+        all_zone_resources["collection_errors"] = collected["collection_errors"]
+        return all_zone_resources
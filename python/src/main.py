@@ -1,20 +1,27 @@
 # src/main.py
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import yaml
+from typing import Any, Dict, List, Literal, Optional, Tuple
+import asyncio
+import json
 import traceback
 
-# We don't need to import Depends anymore for this logic.
-# We will import the client factory and classes directly.
-from src.dependencies import get_gcp_client
-from src.gcp_client import GcpClient
-from src.validator import Validator
-from src.cost_estimator import estimate_cost
+from src.dependencies import get_async_gcp_client, get_capability_index, get_gcp_client, get_gcp_clients
+from src.validator import Validator, get_module_check_stats
+from src.cost_estimator import COMPUTE_ENGINE_SERVICE_ID, FILESTORE_SERVICE_ID, HOURS_PER_MONTH, estimate_cost
+from src.cost_sweep import API_MAX_SWEEP_CELLS, rank_regions, sweep_costs, sweep_csv, sweep_table
+from src.metrics import RequestMetricsMiddleware, register_cache_stats, render_metrics
+from src.region_finder import find_regions
+from src.response_cache import ResponseCache, canonical_hash
+from src.tracing import TracingMiddleware, span, to_thread
+from src.yaml_io import YAMLError, load_yaml
 
 app = FastAPI()
 
+response_cache = ResponseCache.from_env()
+
 # Your CORS configuration is perfect. Do not change it.
 origins = ["*"]
 
@@ -25,24 +32,67 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestMetricsMiddleware)
+# Server-Timing on every response; TRACE_FILE and PROFILE_DIR enable trace files and ?profile=1.
+app.add_middleware(TracingMiddleware.from_env)
+
+
+def _cache_stats_by_name() -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """
+    The counters of every cache for /metrics, keyed by (cache, project). Coalesced upstream
+    calls count as single-flight hits.
+    """
+    stats = {}
+    for project_id, client in get_gcp_clients().items():
+        for cache, cache_stats in client.get_cache_stats().items():
+            if not isinstance(cache_stats, dict):
+                continue
+            if cache == "single_flight":
+                cache_stats = {"hits": cache_stats["coalesced"], "misses": cache_stats["calls"]}
+            stats[(cache, project_id)] = cache_stats
+    stats[("module_checks", "")] = get_module_check_stats()
+    stats[("responses", "")] = response_cache.stats()
+    return stats
+
+
+register_cache_stats(_cache_stats_by_name)
 
 class ApiRequest(BaseModel):
     yaml_content: str
     region: str
     zone: str
 
-@app.get("/")
-def read_root():
-    return {"Hello": "World"}
+class BatchValidateRequest(BaseModel):
+    blueprints: List[ApiRequest]
 
-@app.post("/validate")
-def validate_yaml(request: ApiRequest): # We removed: gcp_client: GcpClient = Depends(...)
+class CostSweepRequest(ApiRequest):
+    regions: Optional[List[str]] = None
+    node_counts: List[int] = list(range(1, 513))
+    hours: List[float] = [HOURS_PER_MONTH]
+    format: Literal["json", "csv"] = "json"
+    include_components: bool = False
+
+class RankRegionsRequest(ApiRequest):
+    regions: Optional[List[str]] = None
+    limit: Optional[int] = None
+
+class FindRegionRequest(BaseModel):
+    project_id: str
+    machine_type: Optional[str] = None
+    gpu_type: Optional[str] = None
+    gpu_count: int = 0
+    tpu_type: Optional[str] = None
+    storage_type: Optional[str] = None
+    region: Optional[str] = None
+    limit: Optional[int] = None
+
+def _load_request_blueprint(yaml_content: str) -> Tuple[Dict[str, Any], str]:
     """
-    Validates a given YAML content against GCP resources.
+    Parses a request's YAML content and returns it with its project ID, or raises a 400 error.
     """
     try:
-        blueprint = yaml.safe_load(request.yaml_content)
-    except yaml.YAMLError as e:
+        blueprint = load_yaml(yaml_content)
+    except YAMLError as e:
         raise HTTPException(status_code=400, detail=f"Invalid YAML content: {e}")
 
     if not blueprint:
@@ -51,56 +101,339 @@ def validate_yaml(request: ApiRequest): # We removed: gcp_client: GcpClient = De
     project_id = blueprint.get("vars", {}).get("project_id")
     if not project_id or project_id == "your-gcp-project-id":
         raise HTTPException(status_code=400, detail="Please provide a valid Google Cloud project ID in the YAML content.")
+    return blueprint, project_id
+
+def _request_info(request: ApiRequest) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """
+    Returns what a request's cache key is built from, the parsed blueprint and its extracted
+    resources. Byte-identical requests reuse the first parse, also when their response is
+    no longer cached. Raises a 400 error like _load_request_blueprint.
+    """
+    raw_key = canonical_hash([request.yaml_content, request.region, request.zone])
+    parsed = response_cache.lookup_request(raw_key)
+    if parsed is not None:
+        return parsed
+
+    blueprint, project_id = _load_request_blueprint(request.yaml_content)
+    extracted_resources = Validator._extract_resources(blueprint)
+    info = {
+        "project_id": project_id,
+        "blueprint_hash": canonical_hash(blueprint),
+        "region": blueprint.get("vars", {}).get("region", request.region),
+        "zone": blueprint.get("vars", {}).get("zone", request.zone),
+        "storage_services": sorted({storage["storage_type"] for storage in extracted_resources["storage_instances"]}),
+    }
+    parsed = (info, blueprint, extracted_resources)
+    response_cache.remember_request(raw_key, parsed)
+    return parsed
+
+def _response_etag(endpoint: str, info: Dict[str, Any], catalog_version: Optional[str]) -> Optional[str]:
+    """
+    Returns the ETag of a response, or None when the catalog data it depends on is not cached.
+    """
+    if catalog_version is None:
+        return None
+    return '"' + canonical_hash([
+        endpoint, info["project_id"], info["blueprint_hash"], info["region"], info["zone"], catalog_version,
+    ]) + '"'
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+def _cached_response(etag: Optional[str], if_none_match: Optional[str]) -> Optional[Response]:
+    """
+    Returns a 304 or the cached body for an ETag, or None when the response must be computed.
+    """
+    if etag is None:
+        return None
+    if _etag_matches(if_none_match, etag):
+        response_cache.record_not_modified()
+        return Response(status_code=304, headers={"ETag": etag})
+    body = response_cache.get(etag.strip('"'))
+    if body is None:
+        return None
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+def _store_response(etag: Optional[str], result: Dict[str, Any]) -> Response:
+    body = json.dumps(result).encode("utf-8")
+    if etag is None:
+        return Response(content=body, media_type="application/json")
+    response_cache.put(etag.strip('"'), body)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+@app.get("/")
+def read_root():
+    return {"Hello": "World"}
+
+@app.post("/validate")
+async def validate_yaml(request: ApiRequest, if_none_match: Optional[str] = Header(None)):
+    """
+    Validates a given YAML content against GCP resources.
+    Repeated blueprints are answered from the response cache, or with 304 when the client's
+    If-None-Match still matches.
+    """
+    info, blueprint, extracted_resources = _request_info(request)
+    project_id, region, zone = info["project_id"], info["region"], info["zone"]
 
     try:
         gcp_client = get_gcp_client(project_id=project_id)
-        validator = Validator(gcp_client)
-        is_valid = validator.validate_yaml_content(
-            yaml_content=request.yaml_content,
-            region=blueprint.get("vars", {}).get("region", request.region),
-            zone=blueprint.get("vars", {}).get("zone", request.zone)
+        cached = _cached_response(
+            _response_etag("validate", info, gcp_client.get_catalog_version(zone, storage_services=info["storage_services"], quotas=True)),
+            if_none_match,
         )
+        if cached is not None:
+            return cached
+
+        validator = Validator(gcp_client)
+
+        # Fetch the zone snapshot, storage locations and quota table concurrently, then validate against the warm caches.
+        async with span("prefetch"):
+            await get_async_gcp_client(project_id=project_id).prefetch_for_validation(zone, info["storage_services"])
+        is_valid = await to_thread(validator.validate_parsed_blueprint, blueprint, region, zone, extracted_resources)
         errors = validator.get_errors()
 
-        return {"is_valid": is_valid, "errors": errors}
+        return _store_response(
+            _response_etag("validate", info, gcp_client.get_catalog_version(zone, storage_services=info["storage_services"], quotas=True)),
+            {"is_valid": is_valid, "errors": errors},
+        )
     except Exception as e:
         print(f"An unexpected error occurred during validation: {e}")
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"An internal error occurred during validation: {str(e)}")
 
 
+@app.post("/validate/batch")
+async def validate_yaml_batch(request: BatchValidateRequest):
+    """
+    Validates many YAML contents, fetching each distinct zone's catalog data once per project.
+    Results are returned in request order and match what /validate returns for each blueprint.
+    """
+    results: List[Optional[dict]] = [None] * len(request.blueprints)
+    groups: Dict[str, list] = {}
+
+    for position, item in enumerate(request.blueprints):
+        try:
+            blueprint = load_yaml(item.yaml_content)
+        except YAMLError as e:
+            results[position] = {"is_valid": False, "errors": [f"Invalid YAML content: {e}"]}
+            continue
+        if not blueprint:
+            results[position] = {"is_valid": False, "errors": ["YAML content is empty or invalid."]}
+            continue
+        project_id = blueprint.get("vars", {}).get("project_id")
+        if not project_id or project_id == "your-gcp-project-id":
+            results[position] = {"is_valid": False, "errors": ["Please provide a valid Google Cloud project ID in the YAML content."]}
+            continue
+        groups.setdefault(project_id, []).append((position, blueprint, {
+            "blueprint": blueprint,
+            "region": blueprint.get("vars", {}).get("region", item.region),
+            "zone": blueprint.get("vars", {}).get("zone", item.zone),
+        }))
+
+    async def validate_group(project_id: str, entries: list):
+        validator = Validator(get_gcp_client(project_id=project_id))
+        storage_services = {
+            storage["storage_type"]
+            for _, blueprint, _ in entries
+            for storage in validator._extract_resources(blueprint)["storage_instances"]
+        }
+        async with span("prefetch"):
+            await get_async_gcp_client(project_id=project_id).prefetch_zones(
+                [item["zone"] for _, _, item in entries], storage_services, quotas=True
+            )
+        group_results = await to_thread(validator.validate_batch, [item for _, _, item in entries])
+        for (position, _, _), result in zip(entries, group_results):
+            results[position] = result
+
+    try:
+        await asyncio.gather(*(validate_group(project_id, entries) for project_id, entries in groups.items()))
+        return {"results": results}
+    except Exception as e:
+        print(f"An unexpected error occurred during batch validation: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"An internal error occurred during batch validation: {str(e)}")
+
+
 @app.post("/cost")
-def get_cost(request: ApiRequest): # We removed: gcp_client: GcpClient = Depends(...)
+async def get_cost(request: ApiRequest, if_none_match: Optional[str] = Header(None)):
     """
     Estimates the cost of a given YAML content.
+    Repeated blueprints are answered from the response cache, or with 304 when the client's
+    If-None-Match still matches.
     """
+    info, _, extracted_resources = _request_info(request)
+    project_id, region, zone = info["project_id"], info["region"], info["zone"]
+    service_names = [f"services/{COMPUTE_ENGINE_SERVICE_ID}", f"services/{FILESTORE_SERVICE_ID}"]
+
     try:
-        blueprint = yaml.safe_load(request.yaml_content)
-    except yaml.YAMLError as e:
-        raise HTTPException(status_code=400, detail=f"Invalid YAML content: {e}")
+        gcp_client = get_gcp_client(project_id=project_id)
+        cached = _cached_response(
+            _response_etag("cost", info, gcp_client.get_catalog_version(zone, service_names=service_names)),
+            if_none_match,
+        )
+        if cached is not None:
+            return cached
 
-    if not blueprint:
-        raise HTTPException(status_code=400, detail="YAML content is empty or invalid.")
+        # Fetch the zone snapshot and both SKU catalogs concurrently, then price against the warm caches.
+        async with span("prefetch"):
+            await get_async_gcp_client(project_id=project_id).prefetch_for_cost(zone, service_names)
+        total_cost, cost_breakdown = await to_thread(
+            estimate_cost,
+            extracted_resources=extracted_resources,
+            region=region,
+            zone=zone,
+            gcp_client=gcp_client,
+        )
+
+        return _store_response(
+            _response_etag("cost", info, gcp_client.get_catalog_version(zone, service_names=service_names)),
+            {"total_cost": total_cost, "cost_breakdown": cost_breakdown},
+        )
+    except Exception as e:
+        print(f"An unexpected error occurred during cost estimation: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"An internal error occurred during cost estimation: {str(e)}")
 
-    project_id = blueprint.get("vars", {}).get("project_id")
-    if not project_id or project_id == "your-gcp-project-id":
-        raise HTTPException(status_code=400, detail="Please provide a valid Google Cloud project ID in the YAML content.")
+
+@app.post("/cost/sweep")
+async def get_cost_sweep(request: CostSweepRequest):
+    """
+    Prices a blueprint for every combination of node count, monthly hours and region
+    (default: the blueprint's region) in one request, as a JSON table or CSV.
+    """
+    blueprint, project_id = _load_request_blueprint(request.yaml_content)
+    region = blueprint.get("vars", {}).get("region", request.region)
+    zone = blueprint.get("vars", {}).get("zone", request.zone)
+    service_names = [f"services/{COMPUTE_ENGINE_SERVICE_ID}", f"services/{FILESTORE_SERVICE_ID}"]
 
     try:
-        gcp_client = get_gcp_client(project_id=project_id)
+        async with span("prefetch"):
+            await get_async_gcp_client(project_id=project_id).prefetch_for_cost(zone, service_names)
+        sweep = await to_thread(
+            sweep_costs,
+            extracted_resources=Validator._extract_resources(blueprint),
+            regions=request.regions or [region],
+            zone=zone,
+            gcp_client=get_gcp_client(project_id=project_id),
+            node_counts=request.node_counts,
+            hours=request.hours,
+            max_cells=API_MAX_SWEEP_CELLS,
+        )
+        if request.format == "csv":
+            return Response(content=sweep_csv(sweep, request.include_components), media_type="text/csv")
+        return sweep_table(sweep, request.include_components)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"An unexpected error occurred during the cost sweep: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"An internal error occurred during the cost sweep: {str(e)}")
+
+
+@app.post("/cost/regions")
+async def get_cost_by_region(request: RankRegionsRequest):
+    """
+    Prices a blueprint in every region of the SKU catalog (or in the given regions) and
+    returns the regions from the lowest monthly total to the highest.
+    """
+    blueprint, project_id = _load_request_blueprint(request.yaml_content)
+    zone = blueprint.get("vars", {}).get("zone", request.zone)
+    service_names = [f"services/{COMPUTE_ENGINE_SERVICE_ID}", f"services/{FILESTORE_SERVICE_ID}"]
+
+    try:
+        async with span("prefetch"):
+            await get_async_gcp_client(project_id=project_id).prefetch_for_cost(zone, service_names)
+        ranked = await to_thread(
+            rank_regions,
+            extracted_resources=Validator._extract_resources(blueprint),
+            zone=zone,
+            gcp_client=get_gcp_client(project_id=project_id),
+            regions=request.regions,
+            limit=request.limit,
+        )
+        return {"regions": ranked}
+    except Exception as e:
+        print(f"An unexpected error occurred while ranking regions by cost: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"An internal error occurred while ranking regions by cost: {str(e)}")
+
+
+@app.post("/analyze")
+async def analyze_yaml(request: ApiRequest):
+    """
+    Validates and estimates the cost of a given YAML content in one request.
+    The YAML is parsed and its resources extracted once, then validation and cost
+    estimation run concurrently against the same prefetched catalog data.
+    """
+    blueprint, project_id = _load_request_blueprint(request.yaml_content)
 
+    try:
+        gcp_client = get_gcp_client(project_id=project_id)
         validator = Validator(gcp_client)
         extracted_resources = validator._extract_resources(blueprint)
+        region = blueprint.get("vars", {}).get("region", request.region)
+        zone = blueprint.get("vars", {}).get("zone", request.zone)
 
-        total_cost, cost_breakdown = estimate_cost(
-            extracted_resources=extracted_resources,
-            region=blueprint.get("vars", {}).get("region", request.region),
-            zone=blueprint.get("vars", {}).get("zone", request.zone),
-            gcp_client=gcp_client
+        storage_services = [s["storage_type"] for s in extracted_resources["storage_instances"]]
+        async with span("prefetch"):
+            await get_async_gcp_client(project_id=project_id).prefetch_for_analysis(
+                zone, storage_services, [f"services/{COMPUTE_ENGINE_SERVICE_ID}", f"services/{FILESTORE_SERVICE_ID}"]
+            )
+        is_valid, (total_cost, cost_breakdown) = await asyncio.gather(
+            to_thread(validator.validate_parsed_blueprint, blueprint, region, zone, extracted_resources),
+            to_thread(
+                estimate_cost,
+                extracted_resources=extracted_resources,
+                region=region,
+                zone=zone,
+                gcp_client=gcp_client,
+            ),
         )
 
-        return {"total_cost": total_cost, "cost_breakdown": cost_breakdown}
+        return {
+            "validation": {"is_valid": is_valid, "errors": validator.get_errors()},
+            "cost": {"total_cost": total_cost, "cost_breakdown": cost_breakdown},
+        }
     except Exception as e:
-        print(f"An unexpected error occurred during cost estimation: {e}")
+        print(f"An unexpected error occurred during analysis: {e}")
         traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"An internal error occurred during cost estimation: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"An internal error occurred during analysis: {str(e)}")
+
+
+@app.post("/find-region")
+async def find_region(request: FindRegionRequest):
+    """
+    Recommends zones where a given set of resource requirements can be deployed.
+    """
+    try:
+        # The first call per project collects every zone, later calls are served from the index.
+        capability_index = await to_thread(get_capability_index, project_id=request.project_id)
+        requirements = request.model_dump(exclude={"project_id", "limit"})
+        return {"zones": find_regions(requirements, capability_index, limit=request.limit)}
+    except Exception as e:
+        print(f"An unexpected error occurred during region finding: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"An internal error occurred during region finding: {str(e)}")
+
+
+@app.get("/cache/stats")
+def get_cache_stats(project_id: str):
+    """
+    Returns the catalog cache counters of the client serving a project.
+    """
+    stats = get_gcp_client(project_id=project_id).get_cache_stats()
+    stats["module_checks"] = get_module_check_stats()
+    stats["responses"] = response_cache.stats()
+    return stats
+
+
+@app.get("/metrics")
+def get_metrics():
+    """
+    Returns the upstream call, request latency and cache metrics in Prometheus text format.
+    """
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
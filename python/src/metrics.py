@@ -0,0 +1,147 @@
+"""
+This module contains the Prometheus metrics of the service: upstream Google Cloud calls,
+endpoint latency and cache hit ratios.
+
+Upstream calls and requests update counters and histograms as they finish. Cache counters
+are only read, from the stats the caches already keep, when /metrics is scraped, so they
+add nothing to lookups. Every uvicorn worker process serves its own metrics.
+"""
+
+import time
+from typing import Any, Callable, Dict, Iterable
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Listing a large billing catalog takes tens of seconds, so the buckets reach further than the defaults.
+UPSTREAM_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+UPSTREAM_CALL_SECONDS = Histogram(
+    "hpcyaml_upstream_call_duration_seconds",
+    "Duration of Google Cloud API calls, by the GcpClient fetch that made them.",
+    ["method"],
+    buckets=UPSTREAM_BUCKETS,
+)
+UPSTREAM_CALL_ERRORS = Counter(
+    "hpcyaml_upstream_call_errors_total",
+    "Google Cloud API calls that raised, by fetch and exception type.",
+    ["method", "error"],
+)
+REQUEST_SECONDS = Histogram(
+    "hpcyaml_http_request_duration_seconds",
+    "Duration of HTTP requests, by route and response status.",
+    ["method", "endpoint", "status"],
+)
+
+
+def method_name(fetch: Callable[..., Any]) -> str:
+    """
+    The label of a GcpClient fetch method, e.g. "skus" for _fetch_skus.
+    """
+    return fetch.__name__.removeprefix("_fetch_")
+
+
+class observe_upstream_call:
+    """
+    Times the Google Cloud call made inside a `with` (or `async with`) block, and counts it
+    as an error if the block raises.
+    """
+
+    __slots__ = ("method", "start")
+
+    def __init__(self, method: str):
+        self.method = method
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        UPSTREAM_CALL_SECONDS.labels(self.method).observe(time.perf_counter() - self.start)
+        if exc_type is not None:
+            UPSTREAM_CALL_ERRORS.labels(self.method, exc_type.__name__).inc()
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        return self.__exit__(exc_type, exc, traceback)
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware that records the latency of every HTTP request. Requests are labelled
+    with their route's path template rather than the requested path, so the number of
+    series stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            REQUEST_SECONDS.labels(
+                scope["method"], route.path if route is not None else "unmatched", str(status)
+            ).observe(time.perf_counter() - start)
+
+
+class CacheStatsCollector:
+    """
+    Reports the counters of caches as hits, misses, hit ratio and entries when scraped.
+
+    `sources` returns {(cache, project): stats} where stats are the dicts the caches'
+    `stats()` methods return. Stale and disk hits count as hits.
+    """
+
+    HIT_KEYS = ("hits", "stale_hits", "disk_hits")
+
+    def __init__(self, sources: Callable[[], Dict[tuple, Dict[str, Any]]]):
+        self.sources = sources
+
+    def collect(self) -> Iterable:
+        labels = ["cache", "project"]
+        hits = CounterMetricFamily("hpcyaml_cache_hits", "Cache lookups served from the cache.", labels=labels)
+        misses = CounterMetricFamily("hpcyaml_cache_misses", "Cache lookups that had to load the value.", labels=labels)
+        ratio = GaugeMetricFamily("hpcyaml_cache_hit_ratio", "Hits over all lookups since start.", labels=labels)
+        entries = GaugeMetricFamily("hpcyaml_cache_entries", "Entries held by the cache.", labels=labels)
+        for (cache, project), stats in self.sources().items():
+            if "misses" not in stats:
+                continue
+            label_values = [cache, project]
+            hit_count = sum(stats.get(key, 0) for key in self.HIT_KEYS)
+            lookups = hit_count + stats["misses"]
+            hits.add_metric(label_values, hit_count)
+            misses.add_metric(label_values, stats["misses"])
+            ratio.add_metric(label_values, hit_count / lookups if lookups else 0.0)
+            if "entries" in stats:
+                entries.add_metric(label_values, stats["entries"])
+        return [hits, misses, ratio, entries]
+
+
+def register_cache_stats(sources: Callable[[], Dict[tuple, Dict[str, Any]]]) -> CacheStatsCollector:
+    collector = CacheStatsCollector(sources)
+    REGISTRY.register(collector)
+    return collector
+
+
+def render_metrics() -> tuple:
+    """
+    Returns (body, content type) of the metrics in Prometheus text format.
+    """
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,105 @@
+"""
+This module contains the clients that serve Google Cloud lookups from a catalog snapshot.
+"""
+
+import os
+from typing import Dict, Optional
+
+from google.api_core.exceptions import NotFound
+
+from src.async_gcp_client import AsyncGcpClient
+from src.catalog_cache import ZoneSnapshot
+from src.catalog_snapshot import CatalogSnapshot, load_catalog_snapshot
+from src.gcp_client import GcpClient
+from src.quota_table import QuotaTable
+
+# Serve validation, cost estimation and the API from this snapshot file instead of Google Cloud.
+CATALOG_SNAPSHOT_ENV = "CATALOG_SNAPSHOT_PATH"
+
+
+class OfflineGcpClient(GcpClient):
+    """
+    A GcpClient whose upstream calls read a CatalogSnapshot, so it never creates an API
+    client or needs credentials. Lookups the snapshot cannot answer fail the way the
+    corresponding Google Cloud call would.
+    """
+
+    def __init__(self, snapshot: CatalogSnapshot, project_id: str = None, **kwargs):
+        super().__init__(project_id=project_id or snapshot.project_id, **kwargs)
+        self.snapshot = snapshot
+
+    def _fetch_zone_snapshot(self, zone: str) -> ZoneSnapshot:
+        machine_types = self.snapshot.machine_types(zone)
+        if machine_types is None:
+            raise NotFound(f"Zone '{zone}' is not in the catalog snapshot.")
+        gpus = [gpu.name for gpu in self.snapshot.gpus(zone)]
+        return ZoneSnapshot(zone, machine_types, gpus, self.snapshot.created_at)
+
+    def _fetch_tpus(self, zone: str, timeout: float = None) -> list:
+        return self.snapshot.tpus(zone) or []
+
+    def _fetch_storage_locations(self, service: str, timeout: float = None) -> list:
+        return self.snapshot.storage.get(service, [])
+
+    def _fetch_skus(self, service_name: str) -> list:
+        skus = self.snapshot.skus(service_name)
+        if skus is None:
+            raise NotFound(f"Service '{service_name}' is not in the catalog snapshot.")
+        return skus
+
+    def _fetch_quota_table(self, project_id: str) -> QuotaTable:
+        # Quotas are per project, so another project's limits would make checks pass or fail wrongly.
+        if project_id != self.snapshot.project_id:
+            raise NotFound(
+                f"The catalog snapshot holds the quotas of project '{self.snapshot.project_id}', not '{project_id}'."
+            )
+        quota_table = self.snapshot.quota_table()
+        if quota_table is None:
+            raise NotFound("The catalog snapshot has no quota table.")
+        return quota_table
+
+    # Like the aggregated lists, these leave out zones without any machine or accelerator types.
+    def _fetch_aggregated_machine_types(self, timeout: float = None) -> Dict[str, list]:
+        return {zone: self.snapshot.machine_types(zone) for zone in self.snapshot.zones if self.snapshot.machine_types(zone)}
+
+    def _fetch_aggregated_gpus(self, timeout: float = None) -> Dict[str, list]:
+        return {zone: self.snapshot.gpus(zone) for zone in self.snapshot.zones if self.snapshot.gpus(zone)}
+
+
+class OfflineAsyncGcpClient(AsyncGcpClient):
+    """
+    The asyncio counterpart of OfflineGcpClient.
+    """
+
+    def __init__(self, gcp_client: OfflineGcpClient):
+        super().__init__(gcp_client)
+        self.snapshot = gcp_client.snapshot
+
+    async def _fetch_tpus(self, zone: str) -> list:
+        return self.gcp_client._fetch_tpus(zone)
+
+    async def _fetch_storage_locations(self, service: str) -> list:
+        return self.gcp_client._fetch_storage_locations(service)
+
+    async def _fetch_skus(self, service_name: str) -> list:
+        return self.gcp_client._fetch_skus(service_name)
+
+    async def _fetch_quota_table(self, project_id: str) -> QuotaTable:
+        return self.gcp_client._fetch_quota_table(project_id)
+
+
+def create_gcp_client(project_id: str = None, catalog_path: Optional[str] = None) -> GcpClient:
+    """
+    Returns an OfflineGcpClient for `catalog_path` (default: the CATALOG_SNAPSHOT_PATH
+    environment variable) if one is set, else a GcpClient.
+    """
+    catalog_path = catalog_path or os.getenv(CATALOG_SNAPSHOT_ENV)
+    if catalog_path:
+        return OfflineGcpClient(load_catalog_snapshot(catalog_path), project_id=project_id)
+    return GcpClient(project_id=project_id)
+
+
+def create_async_gcp_client(gcp_client: GcpClient) -> AsyncGcpClient:
+    if isinstance(gcp_client, OfflineGcpClient):
+        return OfflineAsyncGcpClient(gcp_client)
+    return AsyncGcpClient(gcp_client)
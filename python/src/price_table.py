@@ -0,0 +1,138 @@
+"""
+This module contains the compact price table of a billing catalog and tiered cost evaluation.
+"""
+
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from src.catalog_records import SkuRecord
+
+DEFAULT_CURRENCY = "USD"
+
+
+class SkuPrice(NamedTuple):
+    """
+    The tiered rates of one SKU: usage is billed at unit_prices[i] for the part of it
+    between starts[i] and starts[i + 1], in usage_unit.
+    """
+
+    starts: np.ndarray
+    unit_prices: np.ndarray
+    usage_unit: str
+    conversion_factor: float
+
+    @property
+    def unit_price(self) -> float:
+        """
+        The price of the first tier, or 0.0 for a SKU without rates.
+        """
+        return float(self.unit_prices[0]) if self.unit_prices.size else 0.0
+
+    @property
+    def is_priced(self) -> bool:
+        """
+        Whether any usage of the SKU is billed at a non-zero price.
+        """
+        return bool(self.unit_prices.any())
+
+    def cost(self, usage):
+        """
+        Returns the cost of `usage` (a number or an array of usages, in usage_unit),
+        summed over the tiers it spans.
+        """
+        return tiered_cost(self.starts, self.unit_prices, usage)
+
+
+def tiered_cost(starts: np.ndarray, unit_prices: np.ndarray, usage):
+    """
+    Evaluates tiered rates for many usages at once. Returns a float for a scalar usage and
+    an array of the usage's shape otherwise.
+    """
+    if np.ndim(usage) == 0:
+        # A single usage is cheaper to price tier by tier than through array operations.
+        bounds = starts.tolist()
+        cost = 0.0
+        for start, end, unit_price in zip(bounds, bounds[1:] + [float("inf")], unit_prices.tolist()):
+            if usage <= start:
+                break
+            cost += (min(usage, end) - start) * unit_price
+        return cost
+    usage = np.asarray(usage, dtype=np.float64)
+    if not starts.size:
+        cost = np.zeros(usage.shape)
+    else:
+        widths = np.append(np.diff(starts), np.inf)
+        cost = np.clip(usage[..., None] - starts, 0.0, widths) @ unit_prices
+    return cost
+
+
+def sku_rates(sku: SkuRecord, currency_code: str = DEFAULT_CURRENCY) -> Tuple[list, str, float]:
+    """
+    Returns the ([(start, unit price)], usage unit, conversion factor) of a SKU, with no
+    rates if it is not priced in `currency_code`. A billing_v1.Sku is converted first.
+    """
+    if not isinstance(sku, SkuRecord):
+        sku = SkuRecord.from_message(sku)
+    rates = list(sku.tiers) if sku.currency_code == currency_code else []
+    return rates, sku.usage_unit, sku.conversion_factor
+
+
+def sku_price(sku, currency_code: str = DEFAULT_CURRENCY) -> SkuPrice:
+    """
+    Reads the tiered rates of a single SKU.
+    """
+    rates, usage_unit, conversion_factor = sku_rates(sku, currency_code)
+    return SkuPrice(
+        np.array([start for start, _ in rates], dtype=np.float64),
+        np.array([price for _, price in rates], dtype=np.float64),
+        usage_unit,
+        conversion_factor,
+    )
+
+
+class PriceTable:
+    """
+    The tiered rates of every SKU of a catalog, read once from its records into flat
+    arrays: the tiers of the SKU in row i are starts[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, skus: list, currency_code: str = DEFAULT_CURRENCY):
+        self.currency_code = currency_code
+        self._rows: Dict[str, int] = {}
+        offsets = [0]
+        starts = []
+        unit_prices = []
+        usage_units = []
+        conversion_factors = []
+        for sku in skus:
+            rates, usage_unit, conversion_factor = sku_rates(sku, currency_code)
+            self._rows[sku.name] = len(usage_units)
+            starts.extend(start for start, _ in rates)
+            unit_prices.extend(price for _, price in rates)
+            offsets.append(len(starts))
+            usage_units.append(usage_unit)
+            conversion_factors.append(conversion_factor)
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.starts = np.array(starts, dtype=np.float64)
+        self.unit_prices = np.array(unit_prices, dtype=np.float64)
+        self.usage_units = usage_units
+        self.conversion_factors = np.array(conversion_factors, dtype=np.float64)
+
+    def get(self, sku_name: str) -> Optional[SkuPrice]:
+        """
+        Returns the rates of a SKU by resource name, or None if it is not in the catalog.
+        """
+        row = self._rows.get(sku_name)
+        if row is None:
+            return None
+        first, last = self.offsets[row], self.offsets[row + 1]
+        return SkuPrice(
+            self.starts[first:last],
+            self.unit_prices[first:last],
+            self.usage_units[row],
+            float(self.conversion_factors[row]),
+        )
+
+    def __len__(self) -> int:
+        return len(self._rows)
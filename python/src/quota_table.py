@@ -0,0 +1,148 @@
+"""
+This module contains the per-project quota table built from Cloud Quotas.
+"""
+
+from itertools import combinations
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from src.response_cache import canonical_hash
+
+COMPUTE_QUOTA_SERVICE = "compute.googleapis.com"
+CPU_QUOTA_METRIC = "compute.googleapis.com/cpus"
+CPUS_PER_VM_FAMILY_QUOTA_METRIC = "compute.googleapis.com/cpus_per_vm_family"
+GPUS_PER_GPU_FAMILY_QUOTA_METRIC = "compute.googleapis.com/gpus_per_gpu_family"
+
+# Zonal TPU core quotas, by TPU generation (the part of the TPU type before the "-").
+TPU_QUOTA_METRICS = {
+    "v2": "tpu.googleapis.com/tpu_v2_cores",
+    "v3": "tpu.googleapis.com/tpu_v3_cores",
+    "v4": "tpu.googleapis.com/tpu_v4_cores",
+    "v5litepod": "tpu.googleapis.com/tpu_v5litepod_cores",
+    "v5p": "tpu.googleapis.com/tpu_v5p_cores",
+    "v6e": "tpu.googleapis.com/tpu_v6e_cores",
+}
+
+# Regional capacity quotas (GB) of the storage services.
+STORAGE_QUOTA_METRICS = {
+    "filestore": "file.googleapis.com/standard_capacity",
+    "lustre": "lustre.googleapis.com/capacity",
+    "parallelstore": "parallelstore.googleapis.com/capacity",
+}
+
+# Every service whose quotas the table is built from. A requirement whose metric the
+# project's table does not list is not enforced.
+QUOTA_SERVICES = sorted({
+    metric.split("/")[0]
+    for metric in [CPU_QUOTA_METRIC, *TPU_QUOTA_METRICS.values(), *STORAGE_QUOTA_METRICS.values()]
+})
+
+Dimensions = FrozenSet[Tuple[str, str]]
+
+
+def compute_quota(name: str, region: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Returns the (metric, dimensions) of a regional Compute Engine quota named like the
+    Compute Engine quota metrics: "CPUS", "<VM family>_CPUS" (e.g. "N2_CPUS") or
+    "<GPU family>_GPUS" (e.g. "NVIDIA_A100_GPUS").
+    """
+    if name == "CPUS":
+        return CPU_QUOTA_METRIC, {"region": region}
+    if name.endswith("_GPUS"):
+        return GPUS_PER_GPU_FAMILY_QUOTA_METRIC, {"region": region, "gpu_family": name[: -len("_GPUS")]}
+    if name.endswith("_CPUS"):
+        return CPUS_PER_VM_FAMILY_QUOTA_METRIC, {"region": region, "vm_family": name[: -len("_CPUS")]}
+    return f"{COMPUTE_QUOTA_SERVICE}/{name.lower()}", {"region": region}
+
+
+class QuotaTable:
+    """
+    The effective quota values of a project, keyed by quota metric and dimensions, plus the
+    values of pending quota preferences (increase requests).
+
+    A lookup returns the value of the most specific entry whose dimensions all match the
+    requested ones, the way Cloud Quotas applies a dimensions info to every dimension value
+    that has no more specific entry.
+    """
+
+    def __init__(self, limits: Iterable[list], preferences: Iterable[list] = (), fetched_at: float = 0.0):
+        self.fetched_at = fetched_at
+        self._limits: Dict[str, Dict[Dimensions, int]] = {}
+        self._preferences: Dict[str, Dict[Dimensions, int]] = {}
+        for metric, dimensions, value in limits:
+            self._limits.setdefault(metric, {})[frozenset(dimensions.items())] = value
+        for metric, dimensions, value in preferences:
+            self._preferences.setdefault(metric, {})[frozenset(dimensions.items())] = value
+        self.version = canonical_hash(self.records())
+
+    @classmethod
+    def from_quota_infos(cls, quota_infos: Iterable[Any], quota_preferences: Iterable[Any], fetched_at: float) -> "QuotaTable":
+        """
+        Builds a table from cloudquotas_v1 QuotaInfo and QuotaPreference messages.
+        """
+        limits = []
+        metrics = {}
+        for info in quota_infos:
+            metrics[(info.service, info.quota_id)] = info.metric
+            for dimensions_info in info.dimensions_infos:
+                limits.append([info.metric, dict(dimensions_info.dimensions), dimensions_info.details.value])
+        preferences = [
+            [metrics[(preference.service, preference.quota_id)], dict(preference.dimensions), preference.quota_config.preferred_value]
+            for preference in quota_preferences
+            if (preference.service, preference.quota_id) in metrics
+        ]
+        return cls(limits, preferences, fetched_at)
+
+    def records(self) -> Dict[str, List[list]]:
+        """
+        Returns the table as plain [metric, dimensions, value] lists, in a stable order.
+        """
+        def entries(table: Dict[str, Dict[Dimensions, int]]) -> List[list]:
+            return [
+                [metric, dict(dimensions), value]
+                for metric, values in sorted(table.items())
+                for dimensions, value in sorted((sorted(dimensions), value) for dimensions, value in values.items())
+            ]
+
+        return {"limits": entries(self._limits), "preferences": entries(self._preferences)}
+
+    @staticmethod
+    def _lookup(table: Dict[str, Dict[Dimensions, int]], metric: str, dimensions: Dict[str, str]) -> Optional[int]:
+        values = table.get(metric)
+        if not values:
+            return None
+        requested = sorted(dimensions.items())
+        for size in range(len(requested), -1, -1):
+            for subset in combinations(requested, size):
+                value = values.get(frozenset(subset))
+                if value is not None:
+                    return value
+        return None
+
+    def limit(self, metric: str, dimensions: Dict[str, str]) -> Optional[int]:
+        """
+        Returns the quota value in effect for `metric` and `dimensions`, or None if the
+        table has no applicable entry or the quota is unlimited.
+        """
+        value = self._lookup(self._limits, metric, dimensions)
+        return None if value is None or value < 0 else value
+
+    def check(self, requirements: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Checks {"metric", "dimensions", "amount"} requirements against the table in one pass.
+        Returns the requirements that exceed their quota, in order, each with its "limit" and
+        the "requested" value of a pending quota preference (or None).
+        """
+        shortfalls = []
+        for requirement in requirements:
+            limit = self.limit(requirement["metric"], requirement["dimensions"])
+            if limit is None or requirement["amount"] <= limit:
+                continue
+            shortfalls.append({
+                **requirement,
+                "limit": limit,
+                "requested": self._lookup(self._preferences, requirement["metric"], requirement["dimensions"]),
+            })
+        return shortfalls
+
+    def __len__(self) -> int:
+        return sum(len(values) for values in self._limits.values())
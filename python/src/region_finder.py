@@ -1,62 +1,176 @@
 """
-This module will contain the logic for finding suitable regions.
+This module contains the logic for finding suitable regions.
 """
 
-from src import gcp_client
+from typing import Any, Dict, List
 
+# Keys of a `get_all_zones_with_resources` snapshot that do not describe a zone.
+NON_ZONE_KEYS = {"global_storage_availability", "collection_errors"}
 
-def find_regions(requirements: dict, project_id: str) -> list[str]:
+STORAGE_TYPES = ("filestore", "lustre", "parallelstore")
+
+
+def _bits(zone_bits: Dict[str, int], names) -> int:
+    bits = 0
+    for name in names:
+        bits |= zone_bits.get(name, 0)
+    return bits
+
+
+class CapabilityIndex:
+    """
+    A per-zone capability index built from one `GcpClient.get_all_zones_with_resources` snapshot.
+
+    Each capability (machine type, GPU type and per-VM count, TPU type, storage service) maps to
+    a bitset whose bit `i` is set when `zones[i]` offers it, so a query is a handful of integer
+    ANDs no matter how many zones there are.
+    """
+
+    def __init__(self, all_zone_resources: Dict[str, Any]):
+        self.zones: List[str] = sorted(name for name in all_zone_resources if name not in NON_ZONE_KEYS)
+        self.regions: List[str] = [
+            all_zone_resources[zone].get("region") or "-".join(zone.split("-")[:-1]) for zone in self.zones
+        ]
+        self.all_zones = (1 << len(self.zones)) - 1
+
+        self.machine_types: Dict[str, int] = {}
+        self.gpus: Dict[str, int] = {}
+        self.tpus: Dict[str, int] = {}
+        self.storage: Dict[str, int] = {}
+        self.region_zones: Dict[str, int] = {}
+        # GPU type -> max cards a single VM in the zone can carry -> zones.
+        self.gpu_counts: Dict[str, Dict[int, int]] = {}
+        # (machine type, GPU type) -> cards attached by that VM shape -> zones.
+        self.shape_counts: Dict[tuple, Dict[int, int]] = {}
+        # Per-zone figures used for ranking.
+        self.machine_type_totals: List[int] = []
+        self.max_gpu_counts: List[Dict[str, int]] = []
+
+        for position, zone in enumerate(self.zones):
+            bit = 1 << position
+            resources = all_zone_resources[zone]
+            region = self.regions[position]
+            self.region_zones[region] = self.region_zones.get(region, 0) | bit
+            machine_types = resources.get("available_machine_types", [])
+            for name in machine_types:
+                self.machine_types[name] = self.machine_types.get(name, 0) | bit
+            for name in resources.get("available_gpus", []):
+                self.gpus[name] = self.gpus.get(name, 0) | bit
+            for name in resources.get("available_tpus", []):
+                self.tpus[name] = self.tpus.get(name, 0) | bit
+
+            max_counts = dict(resources.get("gpu_max_cards_per_instance", {}))
+            for machine_type, accelerators in resources.get("vm_accelerator_pairings", {}).items():
+                for accelerator in accelerators:
+                    gpu_type, count = accelerator["type"], accelerator["count"]
+                    shape = self.shape_counts.setdefault((machine_type, gpu_type), {})
+                    shape[count] = shape.get(count, 0) | bit
+                    max_counts[gpu_type] = max(max_counts.get(gpu_type, 0), count)
+            for gpu_type, count in max_counts.items():
+                counts = self.gpu_counts.setdefault(gpu_type, {})
+                counts[count] = counts.get(count, 0) | bit
+
+            self.machine_type_totals.append(len(machine_types))
+            self.max_gpu_counts.append(max_counts)
+
+        storage_availability = all_zone_resources.get("global_storage_availability", {})
+        for storage_type in STORAGE_TYPES:
+            locations = set(storage_availability.get(f"{storage_type}_regions", []))
+            bits = 0
+            for position, (zone, region) in enumerate(zip(self.zones, self.regions)):
+                if zone in locations or region in locations:
+                    bits |= 1 << position
+            self.storage[storage_type] = bits
+
+    def _gpu_bits(self, machine_type: str, gpu_type: str, gpu_count: int) -> int:
+        if machine_type:
+            shapes = self.shape_counts.get((machine_type, gpu_type), {})
+            bits = _bits(shapes, [count for count in shapes if count >= gpu_count])
+            if machine_type.startswith("n1-"):
+                # N1 VMs have no fixed accelerators; GPUs are attached up to the zone's per-VM limit.
+                bits |= self.machine_types.get(machine_type, 0) & self._gpu_bits(None, gpu_type, gpu_count)
+            return bits
+        if gpu_count <= 0:
+            return self.gpus.get(gpu_type, 0)
+        counts = self.gpu_counts.get(gpu_type, {})
+        return _bits(counts, [count for count in counts if count >= gpu_count])
+
+    def match(self, requirements: Dict[str, Any]) -> int:
+        """
+        Returns the bitset of zones satisfying every requirement.
+
+        Supported requirement keys are "machine_type", "gpu_type", "gpu_count", "tpu_type",
+        "storage_type" and "region".
+        """
+        bits = self.all_zones
+        machine_type = requirements.get("machine_type")
+        gpu_type = requirements.get("gpu_type")
+        gpu_count = requirements.get("gpu_count") or 0
+        tpu_type = requirements.get("tpu_type")
+        storage_type = requirements.get("storage_type")
+        region = requirements.get("region")
+
+        if machine_type:
+            bits &= self.machine_types.get(machine_type, 0)
+        if gpu_type:
+            bits &= self._gpu_bits(machine_type, gpu_type, gpu_count)
+        if tpu_type:
+            bits &= self.tpus.get(tpu_type, 0)
+        if storage_type:
+            bits &= self.storage.get(storage_type, 0)
+        if region:
+            bits &= self.region_zones.get(region, 0)
+        return bits
+
+    def find_zones(self, requirements: Dict[str, Any], limit: int = None) -> List[Dict[str, Any]]:
+        """
+        Returns the zones satisfying every requirement, best first.
+
+        Zones are ranked by GPU headroom for the requested GPU type, then by how many storage
+        services and machine types they offer, then by name.
+        """
+        bits = self.match(requirements)
+        gpu_type = requirements.get("gpu_type")
+        results = []
+        position = 0
+        while bits:
+            if bits & 1:
+                storage_services = [
+                    storage_type for storage_type in STORAGE_TYPES if self.storage[storage_type] >> position & 1
+                ]
+                result = {
+                    "zone": self.zones[position],
+                    "region": self.regions[position],
+                    "machine_type_count": self.machine_type_totals[position],
+                    "storage_services": storage_services,
+                }
+                if gpu_type:
+                    result["max_gpu_count"] = self.max_gpu_counts[position].get(gpu_type, 0)
+                results.append(result)
+            bits >>= 1
+            position += 1
+
+        results.sort(
+            key=lambda r: (
+                -r.get("max_gpu_count", 0),
+                -len(r["storage_services"]),
+                -r["machine_type_count"],
+                r["zone"],
+            )
+        )
+        return results[:limit] if limit else results
+
+
+def find_regions(requirements: dict, capability_index: CapabilityIndex, limit: int = None) -> List[Dict[str, Any]]:
     """
-    Finds regions that can satisfy the given resource requirements.
+    Finds zones that can satisfy the given resource requirements.
 
     Args:
         requirements: A dictionary containing the resource requirements.
-        project_id: The Google Cloud project ID.
+        capability_index: The capability index of the project's zones.
+        limit: The maximum number of zones to return.
 
     Returns:
-        A list of suitable zones.
+        A ranked list of suitable zones.
     """
-    suitable_zones = []
-
-    # This is a simplified implementation that only checks a few hardcoded regions.
-    # A real implementation would need to get a list of all regions and zones
-    # and iterate through them.
-    regions_to_check = ["us-central1", "europe-west4"]
-    zones_to_check = ["a", "b"]  # Check zones 'a' and 'b' in each region
-
-    for region in regions_to_check:
-        for zone_suffix in zones_to_check:
-            zone = f"{region}-{zone_suffix}"
-
-            # --- Machine Type Check ---
-            machine_type = requirements.get("machine_type")
-            if machine_type:
-                available_machine_types = gcp_client.get_available_machine_types(
-                    project_id, zone
-                )
-                if machine_type not in available_machine_types:
-                    continue
-
-            # --- GPU Check ---
-            gpu_type = requirements.get("gpu_type")
-            if gpu_type:
-                available_gpus = gcp_client.get_available_gpus(project_id, zone)
-                if gpu_type not in available_gpus:
-                    continue
-
-            # --- Storage Check ---
-            storage_type = requirements.get("storage_type")
-            if storage_type == "filestore":
-                if not gcp_client.check_filestore_availability(project_id, region):
-                    continue
-            elif storage_type == "lustre":
-                try:
-                    if not gcp_client.check_lustre_availability(project_id, region):
-                        continue
-                except NotImplementedError:
-                    # For now, we assume lustre is available if the check is not implemented
-                    pass
-
-            suitable_zones.append(zone)
-
-    return suitable_zones
+    return capability_index.find_zones(requirements, limit=limit)
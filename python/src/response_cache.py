@@ -0,0 +1,142 @@
+"""
+This module contains the cache of serialized API responses.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+from cachetools import LRUCache
+
+DEFAULT_RESPONSE_CACHE_SIZE = 1024
+DEFAULT_RESPONSE_CACHE_DISK_SIZE = 10000
+
+# How many disk writes happen between two prunes of the disk tier.
+DISK_PRUNE_INTERVAL = 256
+
+
+def canonical_hash(value: Any) -> str:
+    """
+    Returns a hash of a JSON-like value that ignores dict key order and YAML formatting.
+    """
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ResponseCache:
+    """
+    A thread-safe LRU of serialized response bodies keyed by ETag, with an optional
+    directory of JSON files as a second tier shared by workers and restarts.
+
+    Keys must already identify everything a response depends on (the canonical blueprint,
+    region, zone and catalog version), so entries never need to be invalidated.
+    """
+
+    def __init__(self, maxsize: int, disk_dir: str = None, disk_maxsize: int = DEFAULT_RESPONSE_CACHE_DISK_SIZE):
+        self.maxsize = maxsize
+        self.disk_dir = disk_dir
+        self.disk_maxsize = disk_maxsize
+        self._cache = LRUCache(maxsize=maxsize)
+        # Raw request digest -> what the request parses to (its key info, blueprint and extracted
+        # resources), so byte-identical requests skip YAML parsing and resource extraction.
+        self._requests = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        return cls(
+            maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", DEFAULT_RESPONSE_CACHE_SIZE)),
+            disk_dir=os.getenv("RESPONSE_CACHE_DIR") or None,
+            disk_maxsize=int(os.getenv("RESPONSE_CACHE_DISK_SIZE", DEFAULT_RESPONSE_CACHE_DISK_SIZE)),
+        )
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def lookup_request(self, raw_key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._requests.get(raw_key)
+
+    def remember_request(self, raw_key: str, info: Dict[str, Any]):
+        with self._lock:
+            self._requests[raw_key] = info
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            body = self._cache.get(key)
+            if body is not None:
+                self.hits += 1
+                return body
+
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), "rb") as f:
+                    body = f.read()
+            except OSError:
+                body = None
+            if body is not None:
+                with self._lock:
+                    self._cache[key] = body
+                    self.disk_hits += 1
+                return body
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, body: bytes):
+        with self._lock:
+            self._cache[key] = body
+            self._disk_writes += 1
+            prune = self._disk_writes % DISK_PRUNE_INTERVAL == 0
+
+        if self.disk_dir:
+            try:
+                fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(body)
+                os.replace(tmp_path, self._disk_path(key))
+            except OSError as e:
+                print(f"Could not write cached response '{key}' to disk: {e}")
+            if prune:
+                self._prune_disk()
+
+    def _prune_disk(self):
+        """
+        Removes the oldest files of the disk tier beyond `disk_maxsize`.
+        """
+        try:
+            entries = [entry for entry in os.scandir(self.disk_dir) if entry.name.endswith(".json")]
+            if len(entries) <= self.disk_maxsize:
+                return
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in entries[: len(entries) - self.disk_maxsize]:
+                os.remove(entry.path)
+        except OSError as e:
+            print(f"Could not prune the response cache directory '{self.disk_dir}': {e}")
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "entries": len(self._cache),
+                "maxsize": self.maxsize,
+                "disk_dir": self.disk_dir,
+            }
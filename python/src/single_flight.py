@@ -0,0 +1,85 @@
+"""
+This module contains the coalescing of concurrent identical upstream calls.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time; concurrent callers with the same key wait for
+    the in-flight call and share its result or exception.
+
+    Threads wait on calls started by other threads. Coroutines wait on calls started by
+    other coroutines of the same event loop and also on calls started by threads (for
+    example through `asyncio.to_thread`); a thread that finds a coroutine's call in flight
+    makes its own call rather than block on another thread's event loop.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            waiting = isinstance(call, Future)
+            if waiting:
+                self.coalesced += 1
+            else:
+                self.calls += 1
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = Future()
+        if waiting:
+            return call.result()
+        if not leader:
+            # A coroutine's call is in flight.
+            return fn()
+
+        try:
+            result = fn()
+            call.set_result(result)
+            return result
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            call = self._calls.get(key)
+            if isinstance(call, Future):
+                self.coalesced += 1
+                task = None
+            elif call is not None and call.get_loop() is loop:
+                self.coalesced += 1
+                task = call
+            else:
+                self.calls += 1
+                call = task = loop.create_task(fn())
+                if key not in self._calls:
+                    self._calls[key] = task
+                    task.add_done_callback(lambda done: self._forget(key, done))
+
+        if task is None:
+            return await asyncio.wrap_future(call)
+        # Shield the shared call, so a cancelled caller does not cancel it for the others.
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, call: Any):
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._calls)}
@@ -0,0 +1,139 @@
+"""
+This module contains an inverted index over billing SKU descriptions.
+"""
+
+import threading
+from typing import Dict, FrozenSet, List, Optional
+
+from cachetools import LRUCache
+
+# The pseudo-region under which every SKU is indexed, for lookups across all regions.
+_ANY_REGION = None
+# Resolved (region, keyword) candidate sets kept per index. Keywords come from callers,
+# so the memo is bounded.
+KEYWORD_CACHE_SIZE = 4096
+
+
+class SkuIndex:
+    """
+    An inverted index mapping region -> description token -> SKU positions.
+
+    Descriptions are lowercased and tokenized once at build time. A lookup returns
+    exactly the SKU that a linear scan for "offered in `region` and every keyword is a
+    case-insensitive substring of the description" would return: the first such SKU in
+    catalog order.
+    """
+
+    def __init__(self, skus: list):
+        self.skus = list(skus)
+        self._descriptions = [sku.description.lower() for sku in self.skus]
+        self._regions: Dict[str, Dict[str, set]] = {}
+        self._region_ids: Dict[str, set] = {}
+        self._keyword_ids: LRUCache = LRUCache(maxsize=KEYWORD_CACHE_SIZE)
+        self._keyword_lock = threading.Lock()
+
+        any_region_tokens: Dict[str, set] = {}
+        for position, (sku, description) in enumerate(zip(self.skus, self._descriptions)):
+            tokens = set(description.split())
+            for token in tokens:
+                any_region_tokens.setdefault(token, set()).add(position)
+            for region in sku.service_regions:
+                self._region_ids.setdefault(region, set()).add(position)
+                region_tokens = self._regions.setdefault(region, {})
+                for token in tokens:
+                    region_tokens.setdefault(token, set()).add(position)
+        self._regions[_ANY_REGION] = any_region_tokens
+        self._region_ids[_ANY_REGION] = set(range(len(self.skus)))
+
+    def regions(self) -> List[str]:
+        return sorted(region for region in self._regions if region is not _ANY_REGION)
+
+    def _ids_for_keyword(self, keyword: str, region: str) -> FrozenSet[int]:
+        key = (region, keyword)
+        with self._keyword_lock:
+            ids = self._keyword_ids.get(key)
+        if ids is not None:
+            return ids
+
+        region_tokens = self._regions.get(region, {})
+        parts = keyword.split()
+        candidates = None
+        for part in parts:
+            # A whitespace-free keyword part is a substring of the description
+            # exactly when it is a substring of one of its tokens.
+            part_ids = set()
+            for token, token_ids in region_tokens.items():
+                if part in token:
+                    part_ids |= token_ids
+            candidates = part_ids if candidates is None else candidates & part_ids
+        if candidates is None:
+            candidates = set(self._region_ids.get(region, ()))
+
+        if parts != [keyword]:
+            # Keywords spanning whitespace (or made only of it) need the exact check.
+            candidates = {i for i in candidates if keyword in self._descriptions[i]}
+
+        ids = frozenset(candidates)
+        with self._keyword_lock:
+            self._keyword_ids[key] = ids
+        return ids
+
+    def _match_ids(self, description_keywords: list, region: str) -> set:
+        id_sets = sorted(
+            (self._ids_for_keyword(keyword.lower(), region) for keyword in description_keywords),
+            key=len,
+        )
+        if not id_sets:
+            return set(self._region_ids.get(region, ()))
+        matches = set(id_sets[0])
+        for ids in id_sets[1:]:
+            matches &= ids
+            if not matches:
+                break
+        return matches
+
+    def find_all(self, description_keywords: list, region: str) -> List[int]:
+        """
+        Returns the catalog positions of every SKU matching the region and all keywords.
+        """
+        return sorted(self._match_ids(description_keywords, region))
+
+    def first_by_region(self, description_keywords: list) -> Dict[str, object]:
+        """
+        Returns, for every region, the SKU `find` would return there, from one pass in catalog
+        order over the SKUs matching all keywords in any region.
+        """
+        first = {}
+        for position in sorted(self._match_ids(description_keywords, _ANY_REGION)):
+            sku = self.skus[position]
+            for region in sku.service_regions:
+                first.setdefault(region, sku)
+        return first
+
+    def find(self, description_keywords: list, region: str) -> Optional[object]:
+        """
+        Returns the first SKU in catalog order matching the region and all keywords.
+        """
+        matches = self._match_ids(description_keywords, region)
+        return self.skus[min(matches)] if matches else None
+
+
+class SkuPivot:
+    """
+    SKU lookups for many regions at once: each keyword set is resolved for every region in
+    one pass and later lookups are dictionary reads. Answers `find` like the wrapped index.
+    """
+
+    def __init__(self, index: SkuIndex):
+        self.index = index
+        self._by_keywords: Dict[tuple, Dict[str, object]] = {}
+
+    def by_region(self, description_keywords: list) -> Dict[str, object]:
+        key = tuple(keyword.lower() for keyword in description_keywords)
+        by_region = self._by_keywords.get(key)
+        if by_region is None:
+            by_region = self._by_keywords[key] = self.index.first_by_region(list(key))
+        return by_region
+
+    def find(self, description_keywords: list, region: str) -> Optional[object]:
+        return self.by_region(description_keywords).get(region)
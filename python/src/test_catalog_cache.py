@@ -0,0 +1,153 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src import catalog_cache
+from src.catalog_cache import SkuCatalogCache
+from src.catalog_records import SkuRecord
+
+SERVICE = "services/test"
+TTL = 100.0
+MAX_STALE = 50.0
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> _Clock:
+    clock = _Clock()
+    monkeypatch.setattr(catalog_cache.time, "monotonic", clock)
+    return clock
+
+
+class _Loader:
+    """
+    Returns a new one-SKU catalog per call, or raises `error`. Calls block while `gate` is clear.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.error = None
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def _skus(self) -> list:
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return [SkuRecord(f"{SERVICE}/skus/{self.calls}", str(self.calls), f"Catalog {self.calls}", ("us-central1",))]
+
+    def __call__(self, service_name: str) -> list:
+        self.gate.wait(5)
+        return self._skus()
+
+    async def load_async(self, service_name: str) -> list:
+        while not self.gate.is_set():
+            await asyncio.sleep(0.001)
+        return self._skus()
+
+
+def _wait_for_refresh(cache: SkuCatalogCache):
+    deadline = time.perf_counter() + 5
+    while cache._refreshing and time.perf_counter() < deadline:
+        time.sleep(0.001)
+    assert not cache._refreshing
+
+
+def test_fresh_entry_is_a_hit(clock):
+    cache = SkuCatalogCache(TTL, MAX_STALE)
+    loader = _Loader()
+    first = cache.get(SERVICE, loader)
+    clock.now += TTL - 1
+    assert cache.get(SERVICE, loader) is first
+    assert loader.calls == 1
+    assert (cache.hits, cache.misses, cache.stale_hits) == (1, 1, 0)
+
+
+def test_stale_hits_start_one_background_refresh(clock):
+    cache = SkuCatalogCache(TTL, MAX_STALE)
+    loader = _Loader()
+    stale = cache.get(SERVICE, loader)
+    clock.now += TTL + 1
+    loader.gate.clear()
+    for _ in range(5):
+        assert cache.get(SERVICE, loader) is stale
+    loader.gate.set()
+    _wait_for_refresh(cache)
+
+    assert loader.calls == 2
+    assert (cache.stale_hits, cache.refreshes, cache.refresh_errors) == (5, 1, 0)
+    refreshed = cache.get(SERVICE, loader)
+    assert refreshed is not stale
+    assert refreshed.skus[0].sku_id == "2"
+
+
+def test_failed_refresh_keeps_serving_the_stale_entry(clock, capsys):
+    cache = SkuCatalogCache(TTL, MAX_STALE)
+    loader = _Loader()
+    stale = cache.get(SERVICE, loader)
+    clock.now += TTL + 1
+    loader.error = RuntimeError("upstream down")
+    assert cache.get(SERVICE, loader) is stale
+    _wait_for_refresh(cache)
+
+    assert cache.refresh_errors == 1
+    assert cache.refreshes == 0
+    assert "upstream down" in capsys.readouterr().out
+    # The next stale hit tries again.
+    assert cache.get(SERVICE, loader) is stale
+    _wait_for_refresh(cache)
+    assert (loader.calls, cache.refresh_errors) == (3, 2)
+
+
+def test_entry_past_the_stale_window_is_refetched_synchronously(clock):
+    cache = SkuCatalogCache(TTL, MAX_STALE)
+    loader = _Loader()
+    expired = cache.get(SERVICE, loader)
+    clock.now += TTL + MAX_STALE + 1
+    assert cache.peek(SERVICE) is None
+    catalog = cache.get(SERVICE, loader)
+    assert catalog is not expired
+    assert loader.calls == 2
+    assert (cache.misses, cache.stale_hits, cache.refreshes) == (2, 0, 0)
+    assert not cache._refreshing
+
+
+def test_get_async_refreshes_through_its_task(clock):
+    cache = SkuCatalogCache(TTL, MAX_STALE)
+    loader = _Loader()
+
+    async def run():
+        stale = await cache.get_async(SERVICE, loader.load_async)
+        clock.now += TTL + 1
+        loader.gate.clear()
+        assert [await cache.get_async(SERVICE, loader.load_async) for _ in range(5)] == [stale] * 5
+        assert len(cache._tasks) == 1
+        loader.gate.set()
+        await asyncio.gather(*cache._tasks)
+        assert (loader.calls, cache.refreshes) == (2, 1)
+        assert await cache.get_async(SERVICE, loader.load_async) is not stale
+
+        loader.error = RuntimeError("upstream down")
+        clock.now += TTL + 1
+        stale = await cache.get_async(SERVICE, loader.load_async)
+        await asyncio.gather(*cache._tasks)
+        assert cache.refresh_errors == 1
+        assert await cache.get_async(SERVICE, loader.load_async) is stale
+        await asyncio.gather(*cache._tasks)
+
+        clock.now += TTL + MAX_STALE + 1
+        loader.error = None
+        assert await cache.get_async(SERVICE, loader.load_async) is not stale
+        assert not cache._tasks
+
+    asyncio.run(run())
+    assert cache.misses == 2
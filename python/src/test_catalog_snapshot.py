@@ -0,0 +1,56 @@
+import pytest
+
+from src.catalog_snapshot import CatalogSnapshot, build_snapshot, read_snapshot, write_snapshot
+from src.conftest import PROJECT_ID, blueprint_yaml, compute_module, filestore_module
+from src.cost_estimator import COMPUTE_ENGINE_SERVICE_ID, FILESTORE_SERVICE_ID, estimate_cost
+from src.offline_gcp_client import OfflineGcpClient
+from src.validator import Validator
+from src.yaml_io import load_yaml
+
+SERVICE_NAMES = [f"services/{COMPUTE_ENGINE_SERVICE_ID}", f"services/{FILESTORE_SERVICE_ID}"]
+GPU_A100 = {"type": "nvidia-tesla-a100", "count": 1}
+GPU_T4 = {"type": "nvidia-tesla-t4", "count": 2}
+
+CASES = [
+    ("us-central1", "us-central1-a", [compute_module("a", "n2-standard-8", 4), filestore_module("fs", 1024)]),
+    ("us-central1", "us-central1-a", [compute_module("gpu", "a2-highgpu-1g", 2, GPU_A100), compute_module("n2", "n2-standard-8", 9)]),
+    ("us-central1", "us-central1-b", [compute_module("gpu", "a2-highgpu-1g", 1, GPU_A100), compute_module("t4", "n1-standard-8", 2, GPU_T4)]),
+    ("europe-west4", "europe-west4-a", [compute_module("gpu", "a2-highgpu-1g", 2, GPU_A100), filestore_module("fs", 2048)]),
+    ("asia-east1", "asia-east1-a", [compute_module("a", "c3-standard-4", 1), compute_module("b", "n1-standard-8", 3)]),
+]
+
+
+def _results(client, region: str, zone: str, modules: list) -> tuple:
+    yaml_content = blueprint_yaml(modules, project_id=client.project_id, region=region, zone=zone)
+    validator = Validator(client)
+    is_valid = validator.validate_yaml_content(yaml_content, region, zone)
+    extracted_resources = Validator._extract_resources(load_yaml(yaml_content))
+    return is_valid, validator.get_errors(), estimate_cost(extracted_resources, region, zone, client)
+
+
+@pytest.fixture
+def round_trip(tmp_path, offline_client) -> CatalogSnapshot:
+    path = str(tmp_path / "catalog.json.gz")
+    write_snapshot(build_snapshot(offline_client, SERVICE_NAMES), path)
+    return CatalogSnapshot(read_snapshot(path))
+
+
+def test_round_trip_serves_the_source_clients_results(round_trip, snapshot):
+    assert round_trip.document["collection_errors"] == []
+    assert round_trip.zones == snapshot.zones
+    for region, zone, modules in CASES:
+        assert _results(OfflineGcpClient(round_trip), region, zone, modules) == _results(OfflineGcpClient(snapshot), region, zone, modules)
+
+
+def test_round_trip_serves_quotas_to_its_own_project_only(round_trip):
+    assert OfflineGcpClient(round_trip).get_quota_table() is not None
+    other = OfflineGcpClient(round_trip, project_id="other-project")
+    assert other.get_quota_table() is None
+
+    region, zone, modules = CASES[1]
+    own_valid, own_errors, _ = _results(OfflineGcpClient(round_trip, project_id=PROJECT_ID), region, zone, modules)
+    other_valid, other_errors, _ = _results(other, region, zone, modules)
+    assert not own_valid
+    assert any(error.startswith("Insufficient quota for 'N2_CPUS'") for error in own_errors)
+    assert other_errors == ["Quota check skipped: Could not fetch the quotas of project 'other-project'."]
+    assert not other_valid
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from src.conftest import REGIONS, blueprint_yaml, compute_module, filestore_module
+from src.cost_estimator import HOURS_PER_MONTH, estimate_cost
+from src.cost_sweep import rank_regions, sweep_costs
+from src.offline_gcp_client import OfflineGcpClient
+from src.validator import Validator
+from src.yaml_io import load_yaml
+
+ZONE = "us-central1-a"
+NODE_COUNTS = [1, 2, 5, 40]
+
+
+def _resources(node_count: int = 1) -> dict:
+    return Validator._extract_resources(load_yaml(blueprint_yaml(
+        [compute_module("a", "n2-standard-8", node_count), filestore_module("fs", 1024)],
+        [
+            compute_module("gpu", "a2-highgpu-1g", node_count, {"type": "nvidia-tesla-a100", "count": 1}),
+            compute_module("t4", "n1-standard-8", node_count, {"type": "nvidia-tesla-t4", "count": 2}),
+        ],
+    )))
+
+
+class _CountingClient(OfflineGcpClient):
+    def __init__(self, snapshot):
+        super().__init__(snapshot)
+        self.fetches = []
+
+    def _fetch_zone_snapshot(self, zone: str):
+        self.fetches.append(zone)
+        return super()._fetch_zone_snapshot(zone)
+
+    def _fetch_skus(self, service_name: str) -> list:
+        self.fetches.append(service_name)
+        return super()._fetch_skus(service_name)
+
+
+def test_sweep_cells_match_estimate_cost(offline_client):
+    sweep = sweep_costs(_resources(), REGIONS, ZONE, offline_client, NODE_COUNTS, hours=[1.0, HOURS_PER_MONTH])
+    month = sweep["hours"].index(HOURS_PER_MONTH)
+    for r, region in enumerate(REGIONS):
+        for n, node_count in enumerate(NODE_COUNTS):
+            total_cost, cost_breakdown = estimate_cost(_resources(node_count), region, ZONE, offline_client)
+            priced = [cost for cost in cost_breakdown.values() if isinstance(cost, float)]
+            # Breakdown labels carry the node count, so the cells are compared by value. A
+            # component without a SKU or price in the region costs nothing there.
+            cells = [cost for cost in sweep["costs"][r, :, n, month] if cost]
+            np.testing.assert_allclose(sorted(cells), sorted(priced))
+            assert sweep["totals"][r, n, month] == pytest.approx(total_cost)
+    # Europe has no N2 RAM SKU, and only us-central1 prices A2 machines as whole instances.
+    a2_parts = ["1x a2-highgpu-1g (vCPU)", "1x a2-highgpu-1g (Memory)"]
+    assert sweep["missing"] == {
+        "us-central1": [],
+        "europe-west4": ["1x n2-standard-8 (Memory)", *a2_parts],
+        "asia-east1": a2_parts,
+    }
+    # 40 nodes reach the second N2 vCPU tier, at 2000 vCPU hours.
+    vcpu_hours = 40 * 8 * HOURS_PER_MONTH
+    n2_vcpu = sweep["components"].index("1x n2-standard-8 (vCPU)")
+    assert sweep["costs"][0, n2_vcpu, -1, month] == pytest.approx(2000 * 0.03 + (vcpu_hours - 2000) * 0.025)
+
+
+def test_oversized_sweep_fails_before_any_lookup(snapshot):
+    client = _CountingClient(snapshot)
+    # 3 regions x 12 node counts x 3 hours is 108 cells.
+    with pytest.raises(ValueError, match="108 region, node count and hours cells, more than the 107 allowed"):
+        sweep_costs(_resources(), REGIONS, ZONE, client, range(1, 13), hours=[1.0, 2.0, 3.0], max_cells=107)
+    assert client.fetches == []
+
+    sweep = sweep_costs(_resources(), REGIONS, ZONE, client, range(1, 13), hours=[1.0, 2.0, 3.0], max_cells=108)
+    assert sweep["totals"].shape == (3, 12, 3)
+    assert client.fetches
+
+
+def test_rank_regions_matches_estimate_cost(offline_client):
+    ranked = rank_regions(_resources(2), ZONE, offline_client)
+    assert sorted(result["region"] for result in ranked) == sorted(REGIONS)
+    for result in ranked:
+        total_cost, cost_breakdown = estimate_cost(_resources(2), result["region"], ZONE, offline_client)
+        assert result["total_cost"] == pytest.approx(total_cost)
+        # estimate_cost leaves out the components without a SKU; rank_regions lists them.
+        assert {label: cost for label, cost in result["cost_breakdown"].items() if cost != "SKU Not Found"} == pytest.approx(cost_breakdown)
+        assert [label for label, cost in result["cost_breakdown"].items() if cost == "SKU Not Found"] == result["missing"]
+
+
+def test_regions_with_missing_components_rank_last(offline_client):
+    ranked = rank_regions(_resources(2), ZONE, offline_client)
+    # us-central1 is the only fully priced region, and the most expensive one.
+    assert [result["region"] for result in ranked] == ["us-central1", "europe-west4", "asia-east1"]
+    assert ranked[0]["missing"] == []
+    assert ranked[0]["total_cost"] > max(result["total_cost"] for result in ranked[1:])
+    assert ranked[1]["total_cost"] < ranked[2]["total_cost"]
+
+    assert rank_regions(_resources(2), ZONE, offline_client, regions=["asia-east1", "europe-west4"], limit=1) == ranked[1:2]
@@ -0,0 +1,103 @@
+import pytest
+
+from src import dependencies, main
+from src.catalog_snapshot import CatalogSnapshot
+from src.cost_estimator import COMPUTE_ENGINE_SERVICE_ID
+from src.conftest import PROJECT_ID, catalog_document, compute_module, filestore_module
+from src.yaml_io import dump_yaml
+
+MODULES = [compute_module("a", "n2-standard-8", 4), filestore_module("fs", 1024)]
+
+
+def _request(project_id: str = PROJECT_ID, region: str = "us-central1", zone: str = "us-central1-a", modules: list = MODULES) -> dict:
+    # Region and zone are left out of the blueprint vars, so they come from the request alone.
+    yaml_content = dump_yaml({
+        "blueprint_name": "test",
+        "vars": {"project_id": project_id},
+        "deployment_groups": [{"group": "group0", "modules": modules}],
+    })
+    return {"yaml_content": yaml_content, "region": region, "zone": zone}
+
+
+def _reprice_n2(document: dict):
+    for sku in document["skus"][f"services/{COMPUTE_ENGINE_SERVICE_ID}"]:
+        if sku[1].startswith("N2 vCPU"):
+            sku[4][0][4] = [[0, "USD", 0, 40_000_000]]
+
+
+def _raise_n2_quota(document: dict):
+    document["quotas"]["limits"][-1][2] = 128
+
+
+def _refresh_catalog(client, edit):
+    """
+    Serves an edited catalog from `client`, as after upstream changes and cache expiry.
+    """
+    document = catalog_document(client.project_id)
+    edit(document)
+    client.snapshot = CatalogSnapshot(document)
+    for cache in (client.zone_cache, client.sku_cache, client.quota_cache):
+        cache.invalidate()
+
+
+# Each edit changes catalog data the endpoint's response depends on.
+@pytest.mark.parametrize("endpoint, edit", [("/validate", _raise_n2_quota), ("/cost", _reprice_n2)])
+def test_etag_changes_with_each_input(api, endpoint, edit):
+    base = api.post(endpoint, json=_request())
+    assert base.status_code == 200
+    etag = base.headers["etag"]
+    assert api.post(endpoint, json=_request()).headers["etag"] == etag
+
+    variants = [
+        _request(region="europe-west4", zone="europe-west4-a"),
+        _request(zone="us-central1-b"),
+        _request(modules=[compute_module("a", "n2-standard-8", 5), filestore_module("fs", 1024)]),
+    ]
+    if endpoint == "/cost":
+        # Only the snapshot's own project has quotas, so /validate sends no ETag for another one.
+        variants.append(_request(project_id="other-project"))
+    etags = {etag} | {api.post(endpoint, json=request).headers["etag"] for request in variants}
+    assert len(etags) == len(variants) + 1
+
+    _refresh_catalog(dependencies.get_gcp_client(project_id=PROJECT_ID), edit)
+    refreshed = api.post(endpoint, json=_request())
+    assert refreshed.headers["etag"] not in etags
+    if endpoint == "/cost":
+        assert refreshed.json()["total_cost"] > base.json()["total_cost"]
+
+
+@pytest.mark.parametrize("endpoint", ["/validate", "/cost"])
+def test_if_none_match(api, endpoint):
+    first = api.post(endpoint, json=_request())
+    etag = first.headers["etag"]
+
+    for if_none_match in [etag, f"W/{etag}", f'"other", {etag}', "*"]:
+        response = api.post(endpoint, json=_request(), headers={"If-None-Match": if_none_match})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    hits = main.response_cache.stats()["hits"]
+    response = api.post(endpoint, json=_request(), headers={"If-None-Match": '"other"'})
+    assert response.status_code == 200
+    assert response.content == first.content
+    assert response.headers["etag"] == etag
+    assert main.response_cache.stats()["hits"] == hits + 1
+    assert main.response_cache.stats()["not_modified"] == 4
+
+
+def test_no_etag_while_the_catalog_is_not_cached(api):
+    # The first request's catalog is only cached after its prefetch.
+    assert dependencies.get_gcp_client(project_id=PROJECT_ID).get_catalog_version("us-central1-a") is None
+    assert api.post("/validate", json=_request(), headers={"If-None-Match": "*"}).status_code == 200
+
+    # Another project's quota table is never cached, so its validations are neither tagged nor stored.
+    request = _request(project_id="other-project")
+    for _ in range(2):
+        response = api.post("/validate", json=request, headers={"If-None-Match": "*"})
+        assert response.status_code == 200
+        assert "etag" not in response.headers
+    assert any(error.startswith("Quota check skipped") for error in response.json()["errors"])
+
+    assert main._response_etag("validate", {}, None) is None
+    assert main._cached_response(None, "*") is None
@@ -0,0 +1,85 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.catalog_records import SkuRecord
+from src.price_table import PriceTable, sku_price, tiered_cost
+
+
+def _sku(name: str, tiers: tuple, currency_code: str = "USD") -> SkuRecord:
+    return SkuRecord(
+        f"services/test/skus/{name}",
+        name,
+        f"{name} running in Americas",
+        ("us-central1",),
+        usage_unit="GiBy.mo",
+        currency_code=currency_code,
+        tiers=tiers,
+    )
+
+
+TIERED = _sku("tiered", ((0.0, 1.0), (100.0, 0.5), (1000.0, 0.25)))
+FREE_FIRST = _sku("free-first", ((0.0, 0.0), (50.0, 2.0)))
+UNPRICED = _sku("unpriced", ())
+OTHER_CURRENCY = _sku("other-currency", ((0.0, 3.0),), currency_code="EUR")
+
+
+@pytest.mark.parametrize("usage, expected", [
+    (-5.0, 0.0),
+    (0.0, 0.0),
+    (99.0, 99.0),
+    (100.0, 100.0),
+    (101.0, 100.5),
+    (1000.0, 550.0),
+    (1004.0, 551.0),
+])
+def test_tier_boundaries(usage, expected):
+    price = sku_price(TIERED)
+    assert price.cost(usage) == pytest.approx(expected)
+    assert price.cost(np.array([usage]))[0] == pytest.approx(expected)
+
+
+def test_scalar_and_array_paths_agree():
+    rng = random.Random(1)
+    for _ in range(200):
+        starts = np.cumsum([0.0] + [rng.choice([0.5, 1.0, 10.0, 744.0]) for _ in range(rng.randint(0, 4))])
+        unit_prices = np.array([rng.choice([0.0, 0.01, 0.5, 2.0]) for _ in starts])
+        usages = np.array([rng.uniform(-10.0, starts[-1] + 100.0) for _ in range(20)] + starts.tolist())
+        expected = [tiered_cost(starts, unit_prices, float(usage)) for usage in usages]
+        np.testing.assert_allclose(tiered_cost(starts, unit_prices, usages), expected)
+        grid = usages.reshape(-1, 1) * np.array([1.0, 2.0, 730.0])
+        np.testing.assert_allclose(
+            tiered_cost(starts, unit_prices, grid),
+            [[tiered_cost(starts, unit_prices, float(usage)) for usage in row] for row in grid],
+        )
+
+
+def test_free_first_tier():
+    price = sku_price(FREE_FIRST)
+    assert price.is_priced
+    assert price.unit_price == 0.0
+    assert price.cost(50.0) == 0.0
+    assert price.cost(60.0) == pytest.approx(20.0)
+    assert price.cost(np.array([10.0, 50.0, 60.0])).tolist() == pytest.approx([0.0, 0.0, 20.0])
+
+
+@pytest.mark.parametrize("sku", [UNPRICED, OTHER_CURRENCY])
+def test_sku_without_price(sku):
+    price = sku_price(sku)
+    assert not price.is_priced
+    assert price.unit_price == 0.0
+    assert price.cost(100.0) == 0.0
+    assert price.cost(np.array([[1.0, 2.0]])).tolist() == [[0.0, 0.0]]
+
+
+def test_price_table_matches_single_sku_prices():
+    skus = [TIERED, UNPRICED, FREE_FIRST, OTHER_CURRENCY]
+    table = PriceTable(skus)
+    assert len(table) == 4
+    for sku in skus:
+        price, expected = table.get(sku.name), sku_price(sku)
+        assert price.starts.tolist() == expected.starts.tolist()
+        assert price.unit_prices.tolist() == expected.unit_prices.tolist()
+        assert (price.usage_unit, price.conversion_factor) == (expected.usage_unit, expected.conversion_factor)
+    assert table.get("services/test/skus/unknown") is None
@@ -0,0 +1,128 @@
+from google.api_core.exceptions import NotFound
+
+from src.catalog_cache import ZoneSnapshot
+from src.catalog_records import AcceleratorRecord, MachineTypeRecord
+from src.gcp_client import GcpClient
+from src.quota_table import (
+    CPU_QUOTA_METRIC,
+    CPUS_PER_VM_FAMILY_QUOTA_METRIC,
+    GPUS_PER_GPU_FAMILY_QUOTA_METRIC,
+    STORAGE_QUOTA_METRICS,
+    QuotaTable,
+    compute_quota,
+)
+from src.validator import Validator
+
+REGION = "us-central1"
+ZONE = "us-central1-a"
+
+
+class _QuotaClient(GcpClient):
+    """
+    A GcpClient serving one zone and a fixed quota table, or no table when it is None.
+    """
+
+    def __init__(self, quota_table):
+        super().__init__(project_id="quota-test")
+        self.quota_table = quota_table
+
+    def _fetch_zone_snapshot(self, zone: str) -> ZoneSnapshot:
+        machine_types = [
+            MachineTypeRecord("n2-standard-8", 8, 32768),
+            MachineTypeRecord("a2-highgpu-1g", 12, 87040, (AcceleratorRecord("nvidia-tesla-a100", 1),)),
+        ]
+        return ZoneSnapshot(zone, machine_types, ["nvidia-tesla-a100"], 0.0)
+
+    def _fetch_storage_locations(self, service: str, timeout: float = None) -> list:
+        return [REGION]
+
+    def _fetch_quota_table(self, project_id: str) -> QuotaTable:
+        if self.quota_table is None:
+            raise NotFound("No quotas.")
+        return self.quota_table
+
+
+def _blueprint(*modules) -> dict:
+    return {"vars": {"project_id": "quota-test"}, "deployment_groups": [{"group": "g", "modules": list(modules)}]}
+
+
+def test_compute_quota_names():
+    assert compute_quota("CPUS", REGION) == (CPU_QUOTA_METRIC, {"region": REGION})
+    assert compute_quota("N2_CPUS", REGION) == (CPUS_PER_VM_FAMILY_QUOTA_METRIC, {"region": REGION, "vm_family": "N2"})
+    assert compute_quota("NVIDIA_A100_GPUS", REGION) == (
+        GPUS_PER_GPU_FAMILY_QUOTA_METRIC, {"region": REGION, "gpu_family": "NVIDIA_A100"},
+    )
+
+
+def test_most_specific_dimensions_win():
+    table = QuotaTable([
+        [GPUS_PER_GPU_FAMILY_QUOTA_METRIC, {}, 1],
+        [GPUS_PER_GPU_FAMILY_QUOTA_METRIC, {"region": REGION}, 4],
+        [GPUS_PER_GPU_FAMILY_QUOTA_METRIC, {"region": REGION, "gpu_family": "NVIDIA_A100"}, 16],
+    ])
+    assert table.limit(GPUS_PER_GPU_FAMILY_QUOTA_METRIC, {"region": REGION, "gpu_family": "NVIDIA_A100"}) == 16
+    assert table.limit(GPUS_PER_GPU_FAMILY_QUOTA_METRIC, {"region": REGION, "gpu_family": "NVIDIA_L4"}) == 4
+    assert table.limit(GPUS_PER_GPU_FAMILY_QUOTA_METRIC, {"region": "europe-west4", "gpu_family": "NVIDIA_L4"}) == 1
+
+
+def test_regional_limit_overrides_the_global_default():
+    table = QuotaTable([[CPU_QUOTA_METRIC, {}, 100], [CPU_QUOTA_METRIC, {"region": REGION}, 24]])
+    requirement = {"metric": CPU_QUOTA_METRIC, "amount": 32}
+    assert table.check([{**requirement, "dimensions": {"region": "europe-west4"}}]) == []
+    [shortfall] = table.check([{**requirement, "dimensions": {"region": REGION}}])
+    assert shortfall["limit"] == 24
+    assert shortfall["requested"] is None
+
+
+def test_unlisted_and_unlimited_quotas_pass():
+    table = QuotaTable([[CPU_QUOTA_METRIC, {"region": REGION}, -1]])
+    assert table.limit(CPU_QUOTA_METRIC, {"region": REGION}) is None
+    assert table.check([
+        {"metric": CPU_QUOTA_METRIC, "dimensions": {"region": REGION}, "amount": 10**6},
+        {"metric": CPUS_PER_VM_FAMILY_QUOTA_METRIC, "dimensions": {"region": REGION, "vm_family": "N2"}, "amount": 10**6},
+    ]) == []
+
+
+def test_shortfall_reports_a_pending_increase():
+    table = QuotaTable(
+        [[CPU_QUOTA_METRIC, {"region": REGION}, 24]],
+        preferences=[[CPU_QUOTA_METRIC, {"region": REGION}, 96]],
+    )
+    [shortfall] = table.check([{"metric": CPU_QUOTA_METRIC, "dimensions": {"region": REGION}, "amount": 32}])
+    assert (shortfall["limit"], shortfall["requested"]) == (24, 96)
+
+
+def test_check_project_quotas():
+    client = _QuotaClient(QuotaTable([[CPUS_PER_VM_FAMILY_QUOTA_METRIC, {"region": REGION, "vm_family": "N2"}, 24]]))
+    assert client.check_project_quotas(REGION, "N2_CPUS", 24)
+    assert not client.check_project_quotas(REGION, "N2_CPUS", 25)
+    assert client.check_project_quotas(REGION, "C3_CPUS", 1000)
+
+
+def test_check_project_quotas_fails_without_a_table():
+    assert _QuotaClient(None).check_project_quotas(REGION, "CPUS", 1) is False
+
+
+def test_validator_sums_module_requirements_per_quota():
+    table = QuotaTable([
+        [CPU_QUOTA_METRIC, {}, 1000],
+        [CPUS_PER_VM_FAMILY_QUOTA_METRIC, {"region": REGION, "vm_family": "N2"}, 24],
+        [GPUS_PER_GPU_FAMILY_QUOTA_METRIC, {"region": REGION, "gpu_family": "NVIDIA_A100"}, 2],
+        [STORAGE_QUOTA_METRICS["filestore"], {"region": REGION}, 2048],
+    ])
+    blueprint = _blueprint(
+        {"id": "n2-a", "settings": {"machine_type": "n2-standard-8", "node_count_static": 2}},
+        {"id": "n2-b", "settings": {"machine_type": "n2-standard-8", "node_count_static": 2}},
+        {"id": "gpu", "settings": {"machine_type": "a2-highgpu-1g", "node_count_static": 2, "gpu": {"type": "nvidia-tesla-a100", "count": 1}}},
+        {"id": "homefs", "source": "modules/file-system/filestore", "settings": {"capacity_gb": 1024}},
+    )
+    validator = Validator(_QuotaClient(table))
+    assert not validator.validate_parsed_blueprint(blueprint, REGION, ZONE)
+    assert validator.get_errors() == ["Insufficient quota for 'N2_CPUS' in region 'us-central1'. Required: 32, limit: 24."]
+
+
+def test_validator_skips_quotas_without_a_table():
+    blueprint = _blueprint({"id": "n2", "settings": {"machine_type": "n2-standard-8", "node_count_static": 1}})
+    validator = Validator(_QuotaClient(None))
+    assert not validator.validate_parsed_blueprint(blueprint, REGION, ZONE)
+    assert validator.get_errors() == ["Quota check skipped: Could not fetch the quotas of project 'quota-test'."]
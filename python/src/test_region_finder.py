@@ -0,0 +1,158 @@
+import random
+
+from src.region_finder import STORAGE_TYPES, CapabilityIndex
+
+REGIONS = ["us-central1", "us-east1", "europe-west4"]
+MACHINE_TYPES = ["n1-standard-8", "n2-standard-8", "a2-highgpu-1g", "a2-highgpu-2g", "g2-standard-4"]
+GPUS = ["nvidia-tesla-a100", "nvidia-l4", "nvidia-tesla-t4"]
+TPUS = ["v5p-8", "v5litepod-4"]
+# Fixed accelerators of the accelerator-optimized shapes a zone may offer.
+SHAPES = {
+    "a2-highgpu-1g": [("nvidia-tesla-a100", 1)],
+    "a2-highgpu-2g": [("nvidia-tesla-a100", 2)],
+    "g2-standard-4": [("nvidia-l4", 1)],
+}
+
+
+def _random_snapshot(rng: random.Random) -> dict:
+    snapshot = {}
+    for region in REGIONS:
+        for suffix in "abcd":
+            machine_types = rng.sample(MACHINE_TYPES, rng.randint(0, len(MACHINE_TYPES)))
+            gpus = rng.sample(GPUS, rng.randint(0, len(GPUS)))
+            resources = {
+                "available_machine_types": machine_types,
+                "available_gpus": gpus,
+                "available_tpus": rng.sample(TPUS, rng.randint(0, len(TPUS))),
+                "gpu_max_cards_per_instance": {gpu: rng.choice([1, 2, 4, 8]) for gpu in gpus if rng.random() < 0.7},
+                "vm_accelerator_pairings": {
+                    machine_type: [{"type": gpu, "count": count} for gpu, count in SHAPES[machine_type]]
+                    for machine_type in machine_types
+                    if machine_type in SHAPES
+                },
+            }
+            if rng.random() < 0.2:
+                resources["region"] = region
+            snapshot[f"{region}-{suffix}"] = resources
+    snapshot["global_storage_availability"] = {
+        f"{storage_type}_regions": rng.sample(REGIONS + [f"{rng.choice(REGIONS)}-a"], rng.randint(0, 3))
+        for storage_type in STORAGE_TYPES
+    }
+    snapshot["collection_errors"] = []
+    return snapshot
+
+
+def _random_requirements(rng: random.Random) -> dict:
+    requirements = {}
+    if rng.random() < 0.6:
+        requirements["machine_type"] = rng.choice(MACHINE_TYPES + ["c3-standard-4"])
+    if rng.random() < 0.6:
+        requirements["gpu_type"] = rng.choice(GPUS + ["nvidia-h100-80gb"])
+        requirements["gpu_count"] = rng.choice([None, 0, 1, 2, 3, 4, 8, 9])
+    if rng.random() < 0.3:
+        requirements["tpu_type"] = rng.choice(TPUS)
+    if rng.random() < 0.3:
+        requirements["storage_type"] = rng.choice(STORAGE_TYPES)
+    if rng.random() < 0.3:
+        requirements["region"] = rng.choice(REGIONS + ["asia-east1"])
+    return requirements
+
+
+def _brute_force(snapshot: dict, requirements: dict) -> list:
+    """
+    find_zones as a plain filter over the snapshot, zone by zone.
+    """
+    machine_type = requirements.get("machine_type")
+    gpu_type = requirements.get("gpu_type")
+    gpu_count = requirements.get("gpu_count") or 0
+    storage = snapshot["global_storage_availability"]
+    results = []
+    for zone, resources in snapshot.items():
+        if zone in ("global_storage_availability", "collection_errors"):
+            continue
+        region = resources.get("region") or zone.rsplit("-", 1)[0]
+        pairings = resources["vm_accelerator_pairings"]
+        max_counts = dict(resources["gpu_max_cards_per_instance"])
+        for accelerators in pairings.values():
+            for accelerator in accelerators:
+                max_counts[accelerator["type"]] = max(max_counts.get(accelerator["type"], 0), accelerator["count"])
+
+        def attachable() -> bool:
+            if gpu_count <= 0:
+                return gpu_type in resources["available_gpus"]
+            return max_counts.get(gpu_type, 0) >= gpu_count
+
+        if machine_type and machine_type not in resources["available_machine_types"]:
+            continue
+        if gpu_type:
+            if machine_type:
+                fixed = any(
+                    accelerator["type"] == gpu_type and accelerator["count"] >= gpu_count
+                    for accelerator in pairings.get(machine_type, [])
+                )
+                if not fixed and not (machine_type.startswith("n1-") and attachable()):
+                    continue
+            elif not attachable():
+                continue
+        if requirements.get("tpu_type") and requirements["tpu_type"] not in resources["available_tpus"]:
+            continue
+        storage_services = [
+            storage_type for storage_type in STORAGE_TYPES
+            if {zone, region} & set(storage[f"{storage_type}_regions"])
+        ]
+        if requirements.get("storage_type") and requirements["storage_type"] not in storage_services:
+            continue
+        if requirements.get("region") and requirements["region"] != region:
+            continue
+        result = {
+            "zone": zone,
+            "region": region,
+            "machine_type_count": len(resources["available_machine_types"]),
+            "storage_services": storage_services,
+        }
+        if gpu_type:
+            result["max_gpu_count"] = max_counts.get(gpu_type, 0)
+        results.append(result)
+    results.sort(key=lambda r: (-r.get("max_gpu_count", 0), -len(r["storage_services"]), -r["machine_type_count"], r["zone"]))
+    return results
+
+
+def test_find_zones_matches_a_brute_force_filter():
+    rng = random.Random(1)
+    for _ in range(20):
+        snapshot = _random_snapshot(rng)
+        index = CapabilityIndex(snapshot)
+        for _ in range(100):
+            requirements = _random_requirements(rng)
+            limit = rng.choice([None, 1, 3])
+            expected = _brute_force(snapshot, requirements)
+            assert index.find_zones(requirements, limit=limit) == (expected[:limit] if limit else expected)
+
+
+def test_gpu_count_rules():
+    snapshot = {
+        "us-central1-a": {
+            "available_machine_types": ["n1-standard-8", "a2-highgpu-1g"],
+            "available_gpus": ["nvidia-tesla-t4", "nvidia-tesla-a100"],
+            "gpu_max_cards_per_instance": {"nvidia-tesla-t4": 4},
+            "vm_accelerator_pairings": {"a2-highgpu-1g": [{"type": "nvidia-tesla-a100", "count": 1}]},
+        },
+        "global_storage_availability": {},
+    }
+    index = CapabilityIndex(snapshot)
+    zone = ["us-central1-a"]
+
+    def zones(**requirements) -> list:
+        return [result["zone"] for result in index.find_zones(requirements)]
+
+    # N1 VMs attach GPUs up to the zone's per-VM limit.
+    assert zones(machine_type="n1-standard-8", gpu_type="nvidia-tesla-t4", gpu_count=4) == zone
+    assert zones(machine_type="n1-standard-8", gpu_type="nvidia-tesla-t4", gpu_count=5) == []
+    # Other shapes only carry their fixed accelerators.
+    assert zones(machine_type="a2-highgpu-1g", gpu_type="nvidia-tesla-a100", gpu_count=1) == zone
+    assert zones(machine_type="a2-highgpu-1g", gpu_type="nvidia-tesla-a100", gpu_count=2) == []
+    assert zones(machine_type="a2-highgpu-1g", gpu_type="nvidia-tesla-t4") == []
+    # Without a machine type, a fixed shape's cards count towards the zone's maximum.
+    assert zones(gpu_type="nvidia-tesla-a100", gpu_count=1) == zone
+    assert zones(gpu_type="nvidia-tesla-a100", gpu_count=2) == []
+    assert index.find_zones({"gpu_type": "nvidia-tesla-t4"})[0]["max_gpu_count"] == 4
@@ -0,0 +1,202 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.offline_gcp_client import OfflineAsyncGcpClient, OfflineGcpClient
+from src.single_flight import SingleFlight
+
+CALLERS = 8
+
+
+class _Fetch:
+    """
+    A blocking upstream call: returns a new result per call, or raises `error`. Calls block
+    until `gate` is set.
+    """
+
+    def __init__(self, error: Exception = None):
+        self.calls = 0
+        self.error = error
+        self.gate = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self, *args) -> tuple:
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        assert self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        return (call, *args)
+
+
+def _wait_until(condition: callable):
+    deadline = time.perf_counter() + 5
+    while not condition() and time.perf_counter() < deadline:
+        time.sleep(0.001)
+    assert condition()
+
+
+def _release_when_coalesced(single_flight: SingleFlight, fetch: _Fetch, waiters: int):
+    _wait_until(lambda: single_flight.stats()["coalesced"] == waiters)
+    fetch.gate.set()
+
+
+def _outcome(call: callable):
+    try:
+        return call()
+    except Exception as e:
+        return e
+
+
+def _run_threads(calls: list) -> list:
+    with ThreadPoolExecutor(len(calls)) as pool:
+        futures = [pool.submit(_outcome, call) for call in calls]
+        return [future.result(5) for future in futures]
+
+
+async def _run_tasks(calls: list) -> list:
+    return await asyncio.wait_for(asyncio.gather(*calls, return_exceptions=True), 5)
+
+
+def test_threads_share_one_call():
+    single_flight, fetch = SingleFlight(), _Fetch()
+    releaser = threading.Thread(target=_release_when_coalesced, args=(single_flight, fetch, CALLERS - 1))
+    releaser.start()
+    results = _run_threads([lambda: single_flight.do("key", fetch)] * CALLERS)
+    releaser.join()
+
+    assert results == [(1,)] * CALLERS
+    assert fetch.calls == 1
+    assert single_flight.stats() == {"calls": 1, "coalesced": CALLERS - 1, "in_flight": 0}
+
+
+def test_tasks_share_one_call():
+    single_flight, fetch = SingleFlight(), _Fetch()
+
+    async def run() -> list:
+        calls = [single_flight.do_async("key", lambda: asyncio.to_thread(fetch)) for _ in range(CALLERS)]
+        releaser = asyncio.create_task(asyncio.to_thread(_release_when_coalesced, single_flight, fetch, CALLERS - 1))
+        results = await _run_tasks(calls)
+        await releaser
+        return results
+
+    assert asyncio.run(run()) == [(1,)] * CALLERS
+    assert fetch.calls == 1
+    assert single_flight.stats() == {"calls": 1, "coalesced": CALLERS - 1, "in_flight": 0}
+
+
+def test_the_leaders_exception_reaches_every_waiter():
+    error = RuntimeError("upstream down")
+    single_flight, fetch = SingleFlight(), _Fetch(error)
+    releaser = threading.Thread(target=_release_when_coalesced, args=(single_flight, fetch, CALLERS - 1))
+    releaser.start()
+    assert _run_threads([lambda: single_flight.do("key", fetch)] * CALLERS) == [error] * CALLERS
+    releaser.join()
+
+    single_flight, fetch = SingleFlight(), _Fetch(error)
+
+    async def run() -> list:
+        calls = [single_flight.do_async("key", lambda: asyncio.to_thread(fetch)) for _ in range(CALLERS)]
+        releaser = asyncio.create_task(asyncio.to_thread(_release_when_coalesced, single_flight, fetch, CALLERS - 1))
+        results = await _run_tasks(calls)
+        await releaser
+        return results
+
+    assert asyncio.run(run()) == [error] * CALLERS
+    assert fetch.calls == 1
+    # A failed call is not remembered: the next caller tries again.
+    fetch.error = None
+    assert single_flight.do("key", fetch) == (2,)
+
+
+def test_different_keys_are_not_coalesced():
+    single_flight, fetch = SingleFlight(), _Fetch()
+    releaser = threading.Thread(target=lambda: (_wait_until(lambda: fetch.calls == 3), fetch.gate.set()))
+    releaser.start()
+    results = _run_threads([lambda key=key: single_flight.do(key, lambda: fetch(key)) for key in ("a", "b", "c")])
+    releaser.join()
+
+    assert sorted(result[1] for result in results) == ["a", "b", "c"]
+    assert single_flight.stats()["coalesced"] == 0
+
+
+def test_thread_does_not_wait_on_a_coroutines_call():
+    single_flight, fetch = SingleFlight(), _Fetch()
+
+    async def run():
+        task = asyncio.create_task(single_flight.do_async("key", lambda: asyncio.to_thread(fetch)))
+        await asyncio.to_thread(_wait_until, lambda: fetch.calls == 1)
+        # While the coroutine's call blocks, a thread makes its own call.
+        thread_call = _Fetch()
+        thread_call.gate.set()
+        assert await asyncio.wait_for(asyncio.to_thread(single_flight.do, "key", thread_call), 5) == (1,)
+        fetch.gate.set()
+        assert await task == (1,)
+
+    asyncio.run(run())
+    assert single_flight.stats() == {"calls": 2, "coalesced": 0, "in_flight": 0}
+
+
+def test_coroutine_waits_on_a_threads_call():
+    single_flight, fetch = SingleFlight(), _Fetch()
+    thread = ThreadPoolExecutor(1).submit(single_flight.do, "key", fetch)
+    _wait_until(lambda: fetch.calls == 1)
+
+    async def run():
+        waiter = asyncio.create_task(single_flight.do_async("key", pytest.fail))
+        await asyncio.to_thread(_release_when_coalesced, single_flight, fetch, 1)
+        return await waiter
+
+    assert asyncio.run(run()) == (1,)
+    assert thread.result(5) == (1,)
+
+
+class _BlockingTpuClient(OfflineGcpClient):
+    def __init__(self, snapshot, fetch: _Fetch):
+        super().__init__(snapshot)
+        self.fetch = fetch
+
+    def _fetch_tpus(self, zone: str, timeout: float = None) -> list:
+        return [self.fetch(zone)]
+
+
+def test_client_calls_are_keyed_by_method_and_arguments(snapshot):
+    fetch = _Fetch()
+    client = _BlockingTpuClient(snapshot, fetch)
+    releaser = threading.Thread(target=lambda: (_wait_until(lambda: client.single_flight.stats()["coalesced"] == 3), fetch.gate.set()))
+    releaser.start()
+    results = _run_threads([
+        lambda: client.get_available_tpus("us-central1-a"),
+        lambda: client.get_available_tpus("us-central1-a"),
+        # The timeout does not split the key.
+        lambda: client._call_once(client._fetch_tpus, "us-central1-a", timeout=1.0),
+        lambda: client.get_available_tpus("us-central1-b"),
+        lambda: client.get_available_tpus("us-central1-b"),
+    ])
+    releaser.join()
+
+    assert fetch.calls == 2
+    assert [result[0][1] for result in results] == ["us-central1-a"] * 3 + ["us-central1-b"] * 2
+    assert results[0] == results[1] == results[2] and results[3] == results[4]
+
+
+def test_async_client_joins_the_clients_call(snapshot):
+    fetch = _Fetch()
+    client = _BlockingTpuClient(snapshot, fetch)
+    async_client = OfflineAsyncGcpClient(client)
+
+    async def run() -> list:
+        in_thread = asyncio.create_task(asyncio.to_thread(client.get_available_tpus, "us-central1-a"))
+        await asyncio.to_thread(_wait_until, lambda: fetch.calls == 1)
+        calls = [async_client.get_available_tpus("us-central1-a") for _ in range(CALLERS)]
+        releaser = asyncio.create_task(asyncio.to_thread(_release_when_coalesced, client.single_flight, fetch, CALLERS))
+        results = await _run_tasks(calls)
+        await releaser
+        return [await in_thread, *results]
+
+    assert asyncio.run(run()) == [[(1, "us-central1-a")]] * (CALLERS + 1)
+    assert fetch.calls == 1
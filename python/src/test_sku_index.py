@@ -0,0 +1,86 @@
+import random
+
+from src import sku_index
+from src.catalog_records import SkuRecord
+from src.cost_estimator import _find_sku
+from src.sku_index import SkuIndex, SkuPivot
+
+REGIONS = ["us-central1", "us-east1", "europe-west4", "asia-east1"]
+WORDS = ["N2", "N2D", "C3", "Instance", "Core", "Ram", "running", "in", "Americas", "Nvidia", "A100", "GPU", "Spot", "Preemptible"]
+
+
+def _linear_matches(skus: list, keywords: list, region: str) -> list:
+    return [
+        sku for sku in skus
+        if region in sku.service_regions and all(keyword.lower() in sku.description.lower() for keyword in keywords)
+    ]
+
+
+def _random_catalog(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    return [
+        SkuRecord(
+            f"services/test/skus/{position}",
+            str(position),
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 6))),
+            tuple(rng.sample(REGIONS, rng.randint(0, len(REGIONS)))),
+        )
+        for position in range(count)
+    ]
+
+
+def _random_keywords(rng: random.Random) -> list:
+    keywords = []
+    for _ in range(rng.randint(0, 3)):
+        word = rng.choice(WORDS)
+        keywords.append(rng.choice([
+            word,
+            word.upper(),
+            word.lower()[1:],
+            f"{word} {rng.choice(WORDS)}",
+            f"{word[-1]} {rng.choice(WORDS)[:2]}",
+            " ",
+        ]))
+    return keywords
+
+
+def test_find_matches_the_linear_scan():
+    skus = _random_catalog(500, seed=1)
+    index = SkuIndex(skus)
+    pivot = SkuPivot(index)
+    rng = random.Random(2)
+    for _ in range(1000):
+        keywords = _random_keywords(rng)
+        region = rng.choice(REGIONS + ["me-central2"])
+        expected = _find_sku(skus, keywords, region)
+        assert index.find(keywords, region) is expected
+        assert pivot.find(keywords, region) is expected
+        assert [skus[i] for i in index.find_all(keywords, region)] == _linear_matches(skus, keywords, region)
+
+
+def test_find_returns_the_first_match_in_catalog_order():
+    skus = [
+        SkuRecord("b", "2", "N2 Instance Core running in Americas", ("us-east1",)),
+        SkuRecord("a", "1", "N2 Instance Core running in Americas", ("us-central1", "us-east1")),
+        SkuRecord("c", "3", "N2D Instance Core running in Americas", ("us-central1",)),
+    ]
+    index = SkuIndex(skus)
+    assert index.find(["n2 instance", "core"], "us-east1") is skus[0]
+    assert index.find(["N2 Instance", "Core"], "us-central1") is skus[1]
+    # "N2" is a substring of "N2D", as in the linear scan.
+    assert index.find(["N2", "Core"], "us-central1") is skus[1]
+    assert index.find(["2D I"], "us-central1") is skus[2]
+    assert index.find(["Core"], "europe-west4") is None
+    assert index.find([], "us-east1") is skus[0]
+
+
+def test_keyword_memo_is_bounded(monkeypatch):
+    monkeypatch.setattr(sku_index, "KEYWORD_CACHE_SIZE", 16)
+    skus = _random_catalog(200, seed=3)
+    index = SkuIndex(skus)
+    rng = random.Random(4)
+    for attempt in range(200):
+        keywords = [f"{rng.choice(WORDS)[:2]}{attempt}", rng.choice(WORDS)]
+        region = rng.choice(REGIONS)
+        assert index.find(keywords, region) is _find_sku(skus, keywords, region)
+    assert len(index._keyword_ids) <= 16
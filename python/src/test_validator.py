@@ -0,0 +1,112 @@
+from src import dependencies, validator
+from src.conftest import PROJECT_ID, blueprint_yaml, compute_module, filestore_module
+from src.offline_gcp_client import OfflineGcpClient
+from src.quota_table import QuotaTable
+from src.validator import Validator
+
+GPU_A100 = {"type": "nvidia-tesla-a100", "count": 1}
+
+
+def _count_zone_fetches(monkeypatch, client) -> list:
+    """
+    Records the zone of every upstream zone snapshot fetch of `client`.
+    """
+    fetched = []
+    fetch = client._fetch_zone_snapshot
+
+    def counting_fetch(zone: str):
+        fetched.append(zone)
+        return fetch(zone)
+
+    monkeypatch.setattr(client, "_fetch_zone_snapshot", counting_fetch)
+    return fetched
+
+
+def _batch_items() -> list:
+    return [
+        {"yaml_content": blueprint_yaml([compute_module("a", "n2-standard-8", 4), filestore_module("fs", 1024)]),
+         "region": "us-central1", "zone": "us-central1-a"},
+        {"yaml_content": blueprint_yaml([compute_module("gpu", "a2-highgpu-1g", 2, GPU_A100)], region="europe-west4", zone="europe-west4-a"),
+         "region": "europe-west4", "zone": "europe-west4-a"},
+        {"yaml_content": "deployment_groups: [unclosed", "region": "us-central1", "zone": "us-central1-a"},
+        {"yaml_content": blueprint_yaml([compute_module("a", "c3-standard-4", 1), compute_module("b", "n2-standard-8", 9)]),
+         "region": "us-central1", "zone": "us-central1-a"},
+        {"yaml_content": blueprint_yaml([compute_module("gpu", "a2-highgpu-1g", 1, GPU_A100)], zone="us-central1-b"),
+         "region": "us-central1", "zone": "us-central1-b"},
+        {"yaml_content": blueprint_yaml([compute_module("gpu", "a2-highgpu-1g", 2, GPU_A100)], region="europe-west4", zone="europe-west4-a"),
+         "region": "europe-west4", "zone": "europe-west4-a"},
+    ]
+
+
+def test_batch_matches_single_validation(monkeypatch, snapshot):
+    items = _batch_items()
+    expected = []
+    for item in items:
+        checker = Validator(OfflineGcpClient(snapshot))
+        is_valid = checker.validate_yaml_content(item["yaml_content"], item["region"], item["zone"])
+        expected.append({"is_valid": is_valid, "errors": checker.get_errors()})
+
+    client = OfflineGcpClient(snapshot)
+    fetched = _count_zone_fetches(monkeypatch, client)
+    assert Validator(client).validate_batch(items) == expected
+    assert sorted(fetched) == ["europe-west4-a", "us-central1-a", "us-central1-b"]
+    # The batch covers valid blueprints, bad YAML, an unknown machine type with a quota shortfall
+    # and a machine type the zone does not offer.
+    assert [result["is_valid"] for result in expected] == [True, True, False, False, False, True]
+    assert expected[2]["errors"][0].startswith("Error parsing YAML content:")
+
+
+def test_batch_endpoint_matches_the_validate_endpoint(monkeypatch, api):
+    items = _batch_items()
+    expected = []
+    for item in items:
+        response = api.post("/validate", json=item)
+        expected.append(response.json() if response.status_code == 200 else {"is_valid": False, "errors": [response.json()["detail"]]})
+    assert expected[2]["errors"][0].startswith("Invalid YAML content:")
+
+    # A fresh client for the batch, so that its fetches can be counted.
+    for getter in (dependencies.get_gcp_client, dependencies.get_async_gcp_client):
+        getter.cache_clear()
+    fetched = _count_zone_fetches(monkeypatch, dependencies.get_gcp_client(project_id=PROJECT_ID))
+    response = api.post("/validate/batch", json={"blueprints": items})
+    assert response.status_code == 200
+    assert response.json()["results"] == expected
+    assert sorted(fetched) == ["europe-west4-a", "us-central1-a", "us-central1-b"]
+
+
+def _multi_group_blueprint(last_node_count: int) -> str:
+    return blueprint_yaml(
+        [compute_module("a", "n2-standard-8", 4), filestore_module("fs", 1024)],
+        [compute_module("gpu", "a2-highgpu-1g", 1, GPU_A100), compute_module("t4", "n1-standard-8", 2, {"type": "nvidia-tesla-t4", "count": 2})],
+        [compute_module("c", "n2-standard-8", last_node_count)],
+    )
+
+
+def test_module_check_memo_rechecks_only_the_edited_module(monkeypatch, offline_client):
+    requirements = []
+    check = QuotaTable.check
+
+    def recording_check(table, quota_requirements):
+        requirements.append(quota_requirements)
+        return check(table, quota_requirements)
+
+    monkeypatch.setattr(QuotaTable, "check", recording_check)
+    validator._module_check_cache.clear()
+
+    def validate(yaml_content: str) -> tuple:
+        checker = Validator(offline_client)
+        checker.validate_yaml_content(yaml_content, "us-central1", "us-central1-a")
+        return checker.get_errors(), requirements[-1]
+
+    validate(_multi_group_blueprint(4))
+    before = validator.get_module_check_stats()
+    # 4 + 5 N2 nodes need 72 N2 vCPUs, past the project's regional limit of 64.
+    warm = validate(_multi_group_blueprint(5))
+    after = validator.get_module_check_stats()
+    assert (after["hits"] - before["hits"], after["misses"] - before["misses"]) == (4, 1)
+
+    validator._module_check_cache.clear()
+    cold = validate(_multi_group_blueprint(5))
+    assert warm == cold
+    assert any(error.startswith("Insufficient quota for 'N2_CPUS'") for error in cold[0])
+    assert any("does not support any accelerators" in error for error in cold[0])
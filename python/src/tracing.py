@@ -0,0 +1,307 @@
+"""
+This module contains the per-phase tracing of API requests and CLI runs, and opt-in profiling.
+
+A trace is started for each request or CLI run, and the phases of validation and cost
+estimation run inside `span(name)` blocks. Spans are only recorded while a trace is
+active in the current context (threads started with `asyncio.to_thread` inherit it), so
+instrumented code costs one context variable lookup otherwise. A finished trace is
+reported as a Server-Timing header and, when a trace file is configured, appended to it
+as one line of OpenTelemetry (OTLP/JSON) spans.
+"""
+
+import contextvars
+import functools
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qs
+
+SERVICE_NAME = "hpcyaml"
+
+# OTLP span kinds.
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("trace", default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar("span", default=None)
+_trace_file_lock = threading.Lock()
+
+
+class Span:
+    """
+    A timed phase of a trace. Times are perf_counter_ns readings.
+    """
+
+    __slots__ = ("name", "span_id", "parent_id", "start", "end", "attributes")
+
+    def __init__(self, name: str, parent_id: Optional[str], attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.start = time.perf_counter_ns()
+        self.end = None
+        self.attributes = attributes
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.perf_counter_ns()) - self.start) / 1e6
+
+
+class Trace:
+    """
+    The spans of one request or CLI run, under a root span named after it. With `profile`,
+    the work the run hands to threads through `to_thread` is also profiled (see Profile).
+    """
+
+    def __init__(self, name: str, kind: int = SPAN_KIND_SERVER, attributes: Optional[Dict[str, Any]] = None, profile: bool = False):
+        self.trace_id = f"{random.getrandbits(128):032x}"
+        self.kind = kind
+        self._epoch = time.time_ns() - time.perf_counter_ns()
+        self.root = Span(name, None, attributes)
+        self.spans: List[Span] = []
+        self.profile = Profile() if profile else None
+
+    def finish(self):
+        self.root.end = time.perf_counter_ns()
+
+    def timings(self) -> Dict[str, float]:
+        """
+        Returns the milliseconds spent in each span name, summed over its spans, in the
+        order the names first started, followed by the "total" of the root span.
+        """
+        timings = {}
+        for recorded in list(self.spans):
+            timings[recorded.name] = timings.get(recorded.name, 0.0) + recorded.duration_ms
+        timings["total"] = self.root.duration_ms
+        return timings
+
+    def server_timing(self) -> str:
+        """
+        Returns the timings as a Server-Timing header value.
+        """
+        return ", ".join(f"{name};dur={duration:.2f}" for name, duration in self.timings().items())
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """
+        Returns the trace as an OTLP/JSON ExportTraceServiceRequest.
+        """
+
+        def otlp_span(recorded: Span, kind: int) -> Dict[str, Any]:
+            encoded = {
+                "traceId": self.trace_id,
+                "spanId": recorded.span_id,
+                "name": recorded.name,
+                "kind": kind,
+                "startTimeUnixNano": str(self._epoch + recorded.start),
+                "endTimeUnixNano": str(self._epoch + (recorded.end or time.perf_counter_ns())),
+                "attributes": [
+                    {"key": key, "value": _otlp_value(value)} for key, value in (recorded.attributes or {}).items()
+                ],
+            }
+            if recorded.parent_id:
+                encoded["parentSpanId"] = recorded.parent_id
+            return encoded
+
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [otlp_span(self.root, self.kind)]
+                    + [otlp_span(recorded, SPAN_KIND_INTERNAL) for recorded in list(self.spans)],
+                }],
+            }]
+        }
+
+    def write(self, path: str):
+        """
+        Appends the trace to an OTLP/JSON lines file.
+        """
+        line = json.dumps(self.to_otlp(), separators=(",", ":"))
+        try:
+            with _trace_file_lock, open(path, "a") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            print(f"Could not write the trace to '{path}': {e}")
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Profile:
+    """
+    cProfile profilers of one traced run. A profiler only sees the thread it was enabled
+    on, so every thread the run uses gets its own, and they are merged when dumped.
+    """
+
+    def __init__(self):
+        self.profilers = []
+
+    def new_profiler(self):
+        import cProfile
+
+        profiler = cProfile.Profile()
+        self.profilers.append(profiler)
+        return profiler
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        return self.new_profiler().runcall(fn, *args, **kwargs)
+
+    def dump(self, path: str):
+        """
+        Writes the merged profile as a pstats file (`python -m pstats PATH`, snakeviz, ...).
+        """
+        import pstats
+
+        profilers = [profiler for profiler in self.profilers if profiler.getstats()]
+        if not profilers:
+            return
+        stats = pstats.Stats(profilers[0])
+        for profiler in profilers[1:]:
+            stats.add(profiler)
+        stats.dump_stats(path)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def start_trace(trace: Trace) -> contextvars.Token:
+    """
+    Makes a trace the current one of this context. Returns the token to `end_trace` with.
+    """
+    return _current_trace.set(trace)
+
+
+def end_trace(token: contextvars.Token):
+    """
+    Finishes the current trace, unless it already was (e.g. when its response started),
+    and restores the one `token` was returned with.
+    """
+    trace = _current_trace.get()
+    if trace is not None and trace.root.end is None:
+        trace.finish()
+    _current_trace.reset(token)
+
+
+class span:
+    """
+    Times the block it wraps as a span of the current trace, if there is one.
+    """
+
+    __slots__ = ("name", "attributes", "_span", "_token")
+
+    def __init__(self, name: str, **attributes):
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self):
+        trace = _current_trace.get()
+        if trace is None:
+            self._span = None
+            return self
+        parent = _current_span.get()
+        self._span = Span(self.name, parent.span_id if parent is not None else trace.root.span_id, self.attributes)
+        self._token = _current_span.set(self._span)
+        trace.spans.append(self._span)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if self._span is not None:
+            self._span.end = time.perf_counter_ns()
+            _current_span.reset(self._token)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        return self.__exit__(exc_type, exc, traceback)
+
+
+async def to_thread(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    `asyncio.to_thread`, profiling the call when the current trace is being profiled.
+    """
+    # asyncio is imported here, so that CLI commands parsing YAML do not load it.
+    import asyncio
+
+    trace = _current_trace.get()
+    if trace is not None and trace.profile is not None:
+        fn = functools.partial(trace.profile.call, fn)
+    return await asyncio.to_thread(fn, *args, **kwargs)
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware that traces every HTTP request and returns its span timings in a
+    Server-Timing header. Traces are appended to `trace_file` when one is set.
+
+    When `profile_dir` is set, a request with the `profile=1` query parameter is also
+    profiled, and the pstats dump is written there and named in an X-Profile header. The
+    event loop's thread is only profiled for one request at a time, and its share of the
+    profile includes whatever else the worker ran concurrently.
+    """
+
+    def __init__(self, app, trace_file: Optional[str] = None, profile_dir: Optional[str] = None):
+        self.app = app
+        self.trace_file = trace_file
+        self.profile_dir = profile_dir
+        self._loop_profiler_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, app) -> "TracingMiddleware":
+        """
+        Configures the middleware from TRACE_FILE and PROFILE_DIR.
+        """
+        return cls(app, trace_file=os.environ.get("TRACE_FILE"), profile_dir=os.environ.get("PROFILE_DIR"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        profile = bool(self.profile_dir) and query.get("profile") in (["1"], ["true"])
+        trace = Trace(
+            f"{scope['method']} {scope['path']}",
+            attributes={"http.request.method": scope["method"], "url.path": scope["path"]},
+            profile=profile,
+        )
+        profile_path = os.path.join(self.profile_dir, f"{trace.trace_id}.prof") if profile else None
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                trace.finish()
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                if profile_path:
+                    headers.append((b"x-profile", os.path.basename(profile_path).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        loop_profiler = None
+        if profile and self._loop_profiler_lock.acquire(blocking=False):
+            loop_profiler = trace.profile.new_profiler()
+            loop_profiler.enable()
+        token = start_trace(trace)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            end_trace(token)
+            if loop_profiler is not None:
+                loop_profiler.disable()
+                self._loop_profiler_lock.release()
+            if profile_path:
+                trace.profile.dump(profile_path)
+            if self.trace_file:
+                trace.write(self.trace_file)
@@ -1,8 +1,41 @@
-import yaml
+import threading
+from cachetools import LRUCache
 from src.gcp_client import GcpClient
+from src.quota_table import STORAGE_QUOTA_METRICS, TPU_QUOTA_METRICS, compute_quota
+from src.response_cache import canonical_hash
+from src.tracing import span
+from src.yaml_io import YAMLError, load_yaml
 from typing import List, Dict, Any
 from google.api_core.exceptions import NotFound, GoogleAPIError
 
+# Regional GPU quota names (the Compute Engine "<GPU family>_GPUS" metrics) by GPU type.
+GPU_QUOTA_MAP = {
+    "nvidia-tesla-a100": "NVIDIA_A100_GPUS",
+    "nvidia-a100-80gb": "NVIDIA_A100_80GB_GPUS",
+    "nvidia-h100-80gb": "NVIDIA_H100_GPUS",
+    "nvidia-h100-mega-80gb": "NVIDIA_H100_MEGA_GPUS",
+    "nvidia-h200-141gb": "NVIDIA_H200_GPUS",
+    "nvidia-b200": "NVIDIA_B200_GPUS",
+    "nvidia-l4": "NVIDIA_L4_GPUS",
+    "nvidia-tesla-t4": "NVIDIA_T4_GPUS",
+    "nvidia-tesla-v100": "NVIDIA_V100_GPUS",
+    "nvidia-tesla-p100": "NVIDIA_P100_GPUS",
+    "nvidia-tesla-p4": "NVIDIA_P4_GPUS",
+    "nvidia-tesla-k80": "NVIDIA_K80_GPUS",
+}
+
+# Per-module check results shared by every Validator, keyed by
+# (project, canonical module hash, region, zone, zone snapshot version).
+MODULE_CHECK_CACHE_SIZE = 8192
+_module_check_cache = LRUCache(maxsize=MODULE_CHECK_CACHE_SIZE)
+_module_check_lock = threading.Lock()
+_module_check_stats = {"hits": 0, "misses": 0}
+
+
+def get_module_check_stats() -> Dict[str, int]:
+    with _module_check_lock:
+        return {**_module_check_stats, "entries": len(_module_check_cache)}
+
 
 class Validator:
     """
@@ -16,166 +49,345 @@ class Validator:
     def _add_error(self, message: str):
         self.validation_errors.append(message)
 
-    def _extract_resources(self, blueprint: Dict[str, Any]) -> Dict[str, Any]:
+    @staticmethod
+    def _extract_resources(blueprint: Dict[str, Any]) -> Dict[str, Any]:
         """
         Extracts resource definitions from the blueprint YAML for validation and cost estimation.
+        "modules" holds each module's own resources in blueprint order, for validation.
         """
         extracted_resources = {
             "compute_instances": [],
             "storage_instances": [],
+            "modules": [],
         }
 
-        for group in blueprint.get("deployment_groups", []):
-            for module in group.get("modules", []):
-                settings = module.get("settings", {})
-                module_id = module.get("id", "unknown_module")
-                module_source = module.get("source", "").lower()
-
-                # Extract Compute Instances
-                if "machine_type" in settings:
-                    node_count = settings.get("node_count_dynamic_max", settings.get("node_count_static", 1))
-                    accelerators = []
-                    
-                    if isinstance(settings.get("gpu"), dict):
-                        gpu_info = settings["gpu"]
-                        if gpu_info.get("type") and gpu_info.get("count") is not None:
-                            accelerators.append({"type": gpu_info["type"], "count": gpu_info["count"], "family": "GPU"})
-                    
-                    if isinstance(settings.get("tpu"), dict):
-                        tpu_info = settings["tpu"]
-                        if tpu_info.get("type") and tpu_info.get("count") is not None:
-                            accelerators.append({"type": tpu_info["type"], "count": tpu_info["count"], "family": "TPU"})
-
-                    extracted_resources["compute_instances"].append({
-                        "machine_type": settings["machine_type"],
-                        "node_count": node_count,
-                        "accelerators": accelerators,
-                    })
-
-                # Extract Storage
-                storage_capacity_gb = settings.get("capacity_gb")
-                if not storage_capacity_gb:
-                     # HPC toolkit modules sometimes use 'local_mount' to imply a filesystem
-                     if "local_mount" in settings and ("filestore" in module_source or "lustre" in module_source):
-                         # If capacity isn't specified, we can't validate storage but we don't error
-                         pass
-
-                if storage_capacity_gb and storage_capacity_gb > 0:
-                    storage_type = None
-                    if "lustre" in module_source or "lustre" in module_id:
-                        storage_type = "lustre"
-                    elif "filestore" in module_source or "filestore" in module_id:
-                        storage_type = "filestore"
-                    elif "parallelstore" in module_source or "parallelstore" in module_id:
-                        storage_type = "parallelstore"
-                    
-                    if storage_type:
-                        extracted_resources["storage_instances"].append({
-                            "storage_type": storage_type,
-                            "capacity_gb": storage_capacity_gb,
-                        })
+        with span("extract_resources"):
+            for group in blueprint.get("deployment_groups", []):
+                for module in group.get("modules", []):
+                    module_resources = Validator._extract_module_resources(module)
+                    extracted_resources["compute_instances"].extend(module_resources["compute_instances"])
+                    extracted_resources["storage_instances"].extend(module_resources["storage_instances"])
+                    extracted_resources["modules"].append(module_resources)
 
         return extracted_resources
 
-    def validate_yaml_content(self, yaml_content: str, region: str, zone: str) -> bool:
+    @staticmethod
+    def _extract_module_resources(module: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Parses YAML content and validates its resources against GCP availability and constraints.
+        Extracts the compute and storage resources defined by a single module.
         """
-        self.validation_errors = []
+        module_resources = {
+            "compute_instances": [],
+            "storage_instances": [],
+        }
+
+        settings = module.get("settings", {})
+        module_id = module.get("id", "unknown_module")
+        module_source = module.get("source", "").lower()
+
+        # Extract Compute Instances
+        if "machine_type" in settings:
+            node_count = settings.get("node_count_dynamic_max", settings.get("node_count_static", 1))
+            accelerators = []
+
+            if isinstance(settings.get("gpu"), dict):
+                gpu_info = settings["gpu"]
+                if gpu_info.get("type") and gpu_info.get("count") is not None:
+                    accelerators.append({"type": gpu_info["type"], "count": gpu_info["count"], "family": "GPU"})
+
+            if isinstance(settings.get("tpu"), dict):
+                tpu_info = settings["tpu"]
+                if tpu_info.get("type") and tpu_info.get("count") is not None:
+                    accelerators.append({"type": tpu_info["type"], "count": tpu_info["count"], "family": "TPU"})
+
+            module_resources["compute_instances"].append({
+                "machine_type": settings["machine_type"],
+                "node_count": node_count,
+                "accelerators": accelerators,
+            })
+
+        # Extract Storage
+        storage_capacity_gb = settings.get("capacity_gb")
+        if not storage_capacity_gb:
+             # HPC toolkit modules sometimes use 'local_mount' to imply a filesystem
+             if "local_mount" in settings and ("filestore" in module_source or "lustre" in module_source):
+                 # If capacity isn't specified, we can't validate storage but we don't error
+                 pass
+
+        if storage_capacity_gb and storage_capacity_gb > 0:
+            storage_type = None
+            if "lustre" in module_source or "lustre" in module_id:
+                storage_type = "lustre"
+            elif "filestore" in module_source or "filestore" in module_id:
+                storage_type = "filestore"
+            elif "parallelstore" in module_source or "parallelstore" in module_id:
+                storage_type = "parallelstore"
 
+            if storage_type:
+                module_resources["storage_instances"].append({
+                    "storage_type": storage_type,
+                    "capacity_gb": storage_capacity_gb,
+                })
+
+        return module_resources
+
+    def _parse_blueprint(self, yaml_content: str) -> Dict[str, Any]:
+        """
+        Parses YAML content, recording an error and returning None when it is empty or invalid.
+        """
         try:
-            blueprint = yaml.safe_load(yaml_content)
+            blueprint = load_yaml(yaml_content)
             if not blueprint:
                 self._add_error("Error: YAML content is empty or invalid.")
-                return False
-        except yaml.YAMLError as e:
+                return None
+        except YAMLError as e:
             self._add_error(f"Error parsing YAML content: {e}")
+            return None
+        return blueprint
+
+    def validate_yaml_content(self, yaml_content: str, region: str, zone: str) -> bool:
+        """
+        Parses YAML content and validates its resources against GCP availability and constraints.
+        """
+        self.validation_errors = []
+
+        blueprint = self._parse_blueprint(yaml_content)
+        if blueprint is None:
             return False
 
-        extracted_resources = self._extract_resources(blueprint)
+        # Every check below reads the zone's machine and accelerator data from one snapshot.
+        with span("validate.zone_snapshot"):
+            snapshot = self.gcp_client.get_zone_snapshot(zone)
+        return self._validate_blueprint(blueprint, region, zone, snapshot)
 
-        available_machine_types = self.gcp_client.get_available_machine_types(zone)
-        available_gpus = self.gcp_client.get_available_gpus(zone)
-        
-        # 1. Validate Machine Types & GPUs
-        for instance in extracted_resources["compute_instances"]:
-            mt = instance["machine_type"]
-            if mt not in available_machine_types:
-                self._add_error(f"Machine type '{mt}' is not available in zone '{zone}'.")
+    def validate_parsed_blueprint(
+        self, blueprint: Dict[str, Any], region: str, zone: str, extracted_resources: Dict[str, Any] = None
+    ) -> bool:
+        """
+        Validates an already-parsed blueprint against GCP availability and constraints.
+        When the caller already has the blueprint's `extracted_resources`, modules that are
+        checked reuse them instead of being extracted again.
+        """
+        self.validation_errors = []
+        with span("validate.zone_snapshot"):
+            snapshot = self.gcp_client.get_zone_snapshot(zone)
+        module_resources = extracted_resources["modules"] if extracted_resources is not None else None
+        return self._validate_blueprint(blueprint, region, zone, snapshot, module_resources)
+
+    def validate_batch(self, blueprints: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Validates many blueprints, fetching each distinct zone snapshot once for the whole batch.
 
-            for acc in instance["accelerators"]:
-                if acc["family"] == "GPU" and acc["type"] not in available_gpus:
-                    self._add_error(f"GPU type '{acc['type']}' is not available in zone '{zone}'.")
+        Each item needs "region", "zone" and either an already-parsed "blueprint" or its
+        "yaml_content". The result for each item is the `{"is_valid", "errors"}` pair
+        validate_yaml_content and get_errors would give for it alone.
+        """
+        parsed = []
+        for item in blueprints:
+            self.validation_errors = []
+            blueprint = item["blueprint"] if "blueprint" in item else self._parse_blueprint(item["yaml_content"])
+            parsed.append((blueprint, self.validation_errors))
+
+        zones = {item["zone"] for item, (blueprint, _) in zip(blueprints, parsed) if blueprint is not None}
+        with span("validate.zone_snapshot"):
+            snapshots = {zone: self.gcp_client.get_zone_snapshot(zone) for zone in zones}
+
+        results = []
+        for item, (blueprint, parse_errors) in zip(blueprints, parsed):
+            if blueprint is None:
+                results.append({"is_valid": False, "errors": parse_errors})
+                continue
+            self.validation_errors = []
+            is_valid = self._validate_blueprint(blueprint, item["region"], item["zone"], snapshots[item["zone"]])
+            results.append({"is_valid": is_valid, "errors": self.validation_errors})
+
+        self.validation_errors = []
+        return results
+
+    def _validate_blueprint(
+        self, blueprint: Dict[str, Any], region: str, zone: str, snapshot, module_resources: List[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        Validates a parsed blueprint against one zone snapshot, appending to the current errors.
+        `module_resources` are the blueprint's extracted resources per module, if known.
+
+        Machine type, accelerator and per-module quota checks are memoized per module, so only
+        modules whose content changed since an earlier validation against the same snapshot are
+        re-checked. Errors are recombined phase by phase in module order.
+        """
+        # _check_module times each phase of a module check in that phase's span. Memoized
+        # modules are not re-checked, so they add no time to any of them.
+        modules = [module for group in blueprint.get("deployment_groups", []) for module in group.get("modules", [])]
+        if module_resources is None:
+            module_resources = [None] * len(modules)
+        module_checks = [
+            self._get_module_check(module, region, zone, snapshot, resources)
+            for module, resources in zip(modules, module_resources)
+        ]
+
+        # 1. Validate Machine Types & GPUs
+        for check in module_checks:
+            self.validation_errors.extend(check["machine_errors"])
 
         # 2. Validate Storage Types
-        for storage in extracted_resources["storage_instances"]:
-            storage_type = storage["storage_type"]
-            if storage_type == "filestore" and region not in self.gcp_client.get_available_filestore_regions():
-                self._add_error(f"Filestore is not available in region '{region}'.")
-            elif storage_type == "lustre" and region not in self.gcp_client.get_available_lustre_regions():
-                self._add_error(f"Managed Lustre is not available in region '{region}'.")
-            elif storage_type == "parallelstore" and region not in self.gcp_client.get_available_parallelstore_regions():
-                self._add_error(f"Parallelstore is not available in region '{region}'.")
+        with span("validate.storage"):
+            for check in module_checks:
+                for storage in check["storage_instances"]:
+                    storage_type = storage["storage_type"]
+                    if storage_type == "filestore" and region not in self.gcp_client.get_available_filestore_regions():
+                        self._add_error(f"Filestore is not available in region '{region}'.")
+                    elif storage_type == "lustre" and region not in self.gcp_client.get_available_lustre_regions():
+                        self._add_error(f"Managed Lustre is not available in region '{region}'.")
+                    elif storage_type == "parallelstore" and region not in self.gcp_client.get_available_parallelstore_regions():
+                        self._add_error(f"Parallelstore is not available in region '{region}'.")
 
         # 3. Validate VM-Accelerator Pairings
-        vm_accelerator_pairings = self.gcp_client.get_vm_accelerator_pairings(zone)
-        for instance in extracted_resources["compute_instances"]:
-            vm_type = instance["machine_type"]
-            if not instance["accelerators"]:
-                continue
+        for check in module_checks:
+            self.validation_errors.extend(check["pairing_errors"])
 
-            supported_configs = vm_accelerator_pairings.get(vm_type)
-            if not supported_configs:
-                self._add_error(f"VM type '{vm_type}' does not support any accelerators in zone '{zone}'.")
-                continue
+        # 4. Quota Checks, recombined from the per-module contributions and checked in one pass
+        with span("validate.quotas"):
+            quota_req = {}
+            for check in module_checks:
+                self.validation_errors.extend(check["quota_errors"])
+                for quota_key, amount in check["quota_req"].items():
+                    quota_req[quota_key] = quota_req.get(quota_key, 0) + amount
+
+            if quota_req:
+                quota_table = self.gcp_client.get_quota_table()
+                if quota_table is None:
+                    self._add_error(f"Quota check skipped: Could not fetch the quotas of project '{self.gcp_client.project_id}'.")
+                else:
+                    requirements = [
+                        {"name": name, "metric": metric, "dimensions": dict(dimensions), "amount": amount}
+                        for (name, metric, dimensions), amount in quota_req.items()
+                    ]
+                    for shortfall in quota_table.check(requirements):
+                        self._add_error(self._quota_error(shortfall))
+
+        return not self.validation_errors
 
-            for req_acc in instance["accelerators"]:
-                is_supported = any(
-                    supported_acc["accelerator_type"] == req_acc["type"] and
-                    supported_acc["accelerator_count"] == req_acc["count"]
-                    for supported_acc in supported_configs
-                )
-                if not is_supported:
-                    self._add_error(f"VM type '{vm_type}' does not support attaching {req_acc['count']}x '{req_acc['type']}' in zone '{zone}'.")
-
-        # 4. Quota Checks
-        # --- FIX: Added nvidia-tesla-a100 to the map and corrected CPU quota name ---
-        GPU_QUOTA_MAP = {
-            "nvidia-tesla-a100": "GPUS_NVIDIA_A100",
-            "nvidia-tesla-p4": "GPUS_NVIDIA_TESLA_P4",
-            "nvidia-tesla-v100": "GPUS_NVIDIA_TESLA_V100",
-            "nvidia-tesla-k80": "GPUS_NVIDIA_K80",
+    def _get_module_check(
+        self, module: Dict[str, Any], region: str, zone: str, snapshot, module_resources: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        key = (self.gcp_client.project_id, canonical_hash(module), region, zone, snapshot.version)
+        with _module_check_lock:
+            check = _module_check_cache.get(key)
+            if check is not None:
+                _module_check_stats["hits"] += 1
+                return check
+            _module_check_stats["misses"] += 1
+
+        check = self._check_module(module, region, zone, snapshot, module_resources)
+        with _module_check_lock:
+            _module_check_cache[key] = check
+        return check
+
+    def _check_module(
+        self, module: Dict[str, Any], region: str, zone: str, snapshot, module_resources: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        """
+        Runs the zone-dependent checks for one module and sizes its quota contribution.
+        """
+        if module_resources is None:
+            with span("extract_resources"):
+                module_resources = self._extract_module_resources(module)
+        check = {
+            "storage_instances": module_resources["storage_instances"],
+            "machine_errors": [],
+            "pairing_errors": [],
+            "quota_errors": [],
+            # (quota name, metric, dimensions) -> required amount
+            "quota_req": {},
         }
-        
-        cpu_req = 0
-        gpu_req = {}
-        for instance in extracted_resources["compute_instances"]:
-            mt_details = self.gcp_client.get_machine_type_details(zone, instance["machine_type"])
-            if mt_details:
-                cpu_req += mt_details.guest_cpus * instance["node_count"]
-            else:
-                self._add_error(f"Could not retrieve details for machine type '{instance['machine_type']}' for quota check.")
-                continue
+        compute_instances = module_resources["compute_instances"]
 
-            for acc in instance["accelerators"]:
-                if acc["family"] == "GPU":
-                    # Normalize the GPU type for map lookup
-                    normalized_gpu = acc["type"].lower().replace(" ", "-")
-                    quota_name = GPU_QUOTA_MAP.get(normalized_gpu)
-                    if quota_name:
-                        gpu_req[quota_name] = gpu_req.get(quota_name, 0) + acc["count"] * instance["node_count"]
-                    else:
-                        self._add_error(f"Quota check skipped: Unknown quota name for GPU type '{acc['type']}'.")
-        
-        # Use a more generic quota name for CPUs, as it can vary. 'CPUS' is common for regional quotas.
-        if cpu_req > 0 and not self.gcp_client.check_project_quotas(region, "CPUS", cpu_req):
-            self._add_error(f"Insufficient CPU quota in region '{region}'. Required: {cpu_req}.")
-
-        for quota_name, count in gpu_req.items():
-            if not self.gcp_client.check_project_quotas(region, quota_name, count):
-                self._add_error(f"Insufficient quota for '{quota_name}' in region '{region}'. Required: {count}.")
+        # 1. Validate Machine Types & GPUs
+        with span("validate.machine_types"):
+            for instance in compute_instances:
+                mt = instance["machine_type"]
+                if mt not in snapshot.machine_types:
+                    check["machine_errors"].append(f"Machine type '{mt}' is not available in zone '{zone}'.")
 
-        return not self.validation_errors
+                for acc in instance["accelerators"]:
+                    if acc["family"] == "GPU" and acc["type"] not in snapshot.gpus:
+                        check["machine_errors"].append(f"GPU type '{acc['type']}' is not available in zone '{zone}'.")
+
+        # 3. Validate VM-Accelerator Pairings
+        with span("validate.accelerators"):
+            for instance in compute_instances:
+                vm_type = instance["machine_type"]
+                if not instance["accelerators"]:
+                    continue
+
+                supported_configs = snapshot.pairings.get(vm_type)
+                if not supported_configs:
+                    check["pairing_errors"].append(f"VM type '{vm_type}' does not support any accelerators in zone '{zone}'.")
+                    continue
+
+                for req_acc in instance["accelerators"]:
+                    is_supported = any(
+                        supported_acc["accelerator_type"] == req_acc["type"] and
+                        supported_acc["accelerator_count"] == req_acc["count"]
+                        for supported_acc in supported_configs
+                    )
+                    if not is_supported:
+                        check["pairing_errors"].append(f"VM type '{vm_type}' does not support attaching {req_acc['count']}x '{req_acc['type']}' in zone '{zone}'.")
+
+        # 4. Quota sizing
+        def require(name: str, metric: str, dimensions: Dict[str, str], amount: int):
+            quota_key = (name, metric, tuple(sorted(dimensions.items())))
+            check["quota_req"][quota_key] = check["quota_req"].get(quota_key, 0) + amount
+
+        with span("validate.quotas"):
+            for instance in compute_instances:
+                mt_details = snapshot.machine_types.get(instance["machine_type"])
+                if mt_details:
+                    cpus = mt_details.guest_cpus * instance["node_count"]
+                    require("CPUS", *compute_quota("CPUS", region), cpus)
+                    family_quota = f"{instance['machine_type'].split('-')[0].upper()}_CPUS"
+                    require(family_quota, *compute_quota(family_quota, region), cpus)
+                else:
+                    check["quota_errors"].append(f"Could not retrieve details for machine type '{instance['machine_type']}' for quota check.")
+                    continue
+
+                for acc in instance["accelerators"]:
+                    if acc["family"] == "GPU":
+                        # Normalize the GPU type for map lookup
+                        normalized_gpu = acc["type"].lower().replace(" ", "-")
+                        quota_name = GPU_QUOTA_MAP.get(normalized_gpu)
+                        if quota_name:
+                            require(quota_name, *compute_quota(quota_name, region), acc["count"] * instance["node_count"])
+                        else:
+                            check["quota_errors"].append(f"Quota check skipped: Unknown quota name for GPU type '{acc['type']}'.")
+                    elif acc["family"] == "TPU":
+                        # TPU types are "<generation>-<cores>", e.g. "v5p-8".
+                        generation, _, cores = acc["type"].lower().partition("-")
+                        metric = TPU_QUOTA_METRICS.get(generation)
+                        if metric and cores.isdigit():
+                            quota_name = f"TPU_{generation.upper()}_CORES"
+                            require(quota_name, metric, {"zone": zone}, int(cores) * acc["count"] * instance["node_count"])
+                        else:
+                            check["quota_errors"].append(f"Quota check skipped: Unknown quota name for TPU type '{acc['type']}'.")
+
+            for storage in module_resources["storage_instances"]:
+                quota_name = f"{storage['storage_type'].upper()}_CAPACITY_GB"
+                require(quota_name, STORAGE_QUOTA_METRICS[storage["storage_type"]], {"region": region}, storage["capacity_gb"])
+
+        return check
+
+    @staticmethod
+    def _quota_error(shortfall: Dict[str, Any]) -> str:
+        dimensions = shortfall["dimensions"]
+        location = f"zone '{dimensions['zone']}'" if "zone" in dimensions else f"region '{dimensions['region']}'"
+        if shortfall["name"] == "CPUS":
+            message = f"Insufficient CPU quota in {location}."
+        else:
+            message = f"Insufficient quota for '{shortfall['name']}' in {location}."
+        message += f" Required: {shortfall['amount']}, limit: {shortfall['limit']}."
+        if shortfall["requested"] is not None and shortfall["requested"] > shortfall["limit"]:
+            message += f" An increase to {shortfall['requested']} has been requested."
+        return message
 
     def get_errors(self) -> List[str]:
         return self.validation_errors
\ No newline at end of file
@@ -1,4 +1,4 @@
-import yaml
+from src.yaml_io import dump_yaml
 from typing import Dict, Any
 
 class YamlBuilder:
@@ -117,7 +117,7 @@ class YamlBuilder:
         try:
             with open(output_file, "w") as f:
                 # Use a custom dumper for better formatting if needed, but default is fine
-                yaml.dump(blueprint, f, sort_keys=False, indent=2, default_flow_style=False)
+                dump_yaml(blueprint, f, sort_keys=False, indent=2, default_flow_style=False)
             print(f"Successfully generated blueprint: {output_file}")
         except IOError as e:
             print(f"Error writing YAML file {output_file}: {e}")
\ No newline at end of file
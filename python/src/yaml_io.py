@@ -0,0 +1,37 @@
+"""
+This module contains the YAML parsing and serialization used by the service and the CLI.
+
+The libyaml-backed CSafeLoader and CSafeDumper are used when PyYAML was built with
+libyaml, and the pure-Python SafeLoader and SafeDumper otherwise. Both accept and
+produce the same documents; only their speed and error message wording differ.
+"""
+
+from typing import Any, IO
+
+import yaml
+
+from src.tracing import span
+
+try:
+    from yaml import CSafeDumper as SafeDumper, CSafeLoader as SafeLoader
+    HAS_LIBYAML = True
+except ImportError:
+    from yaml import SafeDumper, SafeLoader
+    HAS_LIBYAML = False
+
+YAMLError = yaml.YAMLError
+
+
+def load_yaml(content) -> Any:
+    """
+    Parses one YAML document from a string or stream, like `yaml.safe_load`.
+    """
+    with span("parse"):
+        return yaml.load(content, Loader=SafeLoader)
+
+
+def dump_yaml(data: Any, stream: IO = None, **kwargs) -> Any:
+    """
+    Serializes `data` like `yaml.safe_dump`, returning a string when no stream is given.
+    """
+    return yaml.dump(data, stream, Dumper=SafeDumper, **kwargs)
@@ -0,0 +1,71 @@
+'use server';
+
+import {ai} from '@/ai/genkit';
+import {z} from 'genkit';
+
+const API_BASE_URL = 'http://127.0.0.1:8000';
+
+const AnalyzeYamlWithApiInputSchema = z.object({
+  yaml_content: z.string().describe('The YAML configuration string to validate and estimate cost for.'),
+  // These are placeholders for now, the UI will need to provide these.
+  region: z.string().default('us-central1'),
+  zone: z.string().default('us-central1-a'),
+});
+
+export type AnalyzeYamlWithApiInput = z.infer<
+  typeof AnalyzeYamlWithApiInputSchema
+>;
+
+const AnalyzeYamlWithApiOutputSchema = z.object({
+  validation: z.object({
+    is_valid: z.boolean().describe('Whether the YAML configuration is valid.'),
+    errors: z.array(z.string()).describe('A list of validation errors, if any.'),
+  }),
+  cost: z.object({
+    total_cost: z.number().describe('The total estimated monthly cost.'),
+    cost_breakdown: z
+      .record(z.union([z.number(), z.string()]))
+      .describe('A breakdown of the estimated cost, or a note where a component could not be priced.'),
+  }),
+});
+
+export type AnalyzeYamlWithApiOutput = z.infer<
+  typeof AnalyzeYamlWithApiOutputSchema
+>;
+
+export async function analyzeYamlWithApi(
+  input: AnalyzeYamlWithApiInput
+): Promise<AnalyzeYamlWithApiOutput> {
+  return analyzeYamlWithApiFlow(input);
+}
+
+const analyzeYamlWithApiFlow = ai.defineFlow(
+  {
+    name: 'analyzeYamlWithApiFlow',
+    inputSchema: AnalyzeYamlWithApiInputSchema,
+    outputSchema: AnalyzeYamlWithApiOutputSchema,
+  },
+  async input => {
+    const response = await fetch(`${API_BASE_URL}/analyze`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify(input),
+    });
+
+    if (!response.ok) {
+      const errorText = await response.text();
+      throw new Error(`API request failed: ${response.status} ${errorText}`);
+    }
+
+    const result = await response.json();
+    return {
+      validation: {
+        is_valid: result.validation.is_valid,
+        errors: result.validation.errors || [],
+      },
+      cost: result.cost,
+    };
+  }
+);
@@ -3,8 +3,7 @@
 import { useState, useEffect, useMemo } from 'react';
 import type { ConfiguredHpcComponent } from '@/lib/types';
 import { useDebounce } from '@/hooks/use-debounce';
-import { validateYamlWithApi, ValidateYamlWithApiOutput } from '@/ai/flows/validate-yaml-with-api';
-import { estimateCostWithApi, EstimateCostWithApiOutput } from '@/ai/flows/estimate-cost-with-api';
+import { analyzeYamlWithApi, AnalyzeYamlWithApiOutput } from '@/ai/flows/analyze-yaml-with-api';
 import { useToast } from '@/hooks/use-toast';
 import { Button } from '@/components/ui/button';
 import { ScrollArea } from '@/components/ui/scroll-area';
@@ -88,8 +87,8 @@ interface YamlViewerProps {
 export function YamlViewer({ configuredComponents }: YamlViewerProps) {
   const { toast } = useToast();
   const [yamlString, setYamlString] = useState('');
-  const [validationResult, setValidationResult] = useState<ValidateYamlWithApiOutput | null>(null);
-  const [costResult, setCostResult] = useState<EstimateCostWithApiOutput | null>(null);
+  const [validationResult, setValidationResult] = useState<AnalyzeYamlWithApiOutput['validation'] | null>(null);
+  const [costResult, setCostResult] = useState<AnalyzeYamlWithApiOutput['cost'] | null>(null);
   const [isValidating, setIsValidating] = useState(false);
   const [isEstimatingCost, setIsEstimatingCost] = useState(false);
 
@@ -106,44 +105,30 @@ export function YamlViewer({ configuredComponents }: YamlViewerProps) {
       return;
     }
 
-    const validate = async () => {
+    // One request validates and prices the YAML, so the server parses it and fetches catalog data once.
+    const analyze = async () => {
       setIsValidating(true);
-      setValidationResult(null);
-      try {
-        const result = await validateYamlWithApi({ yaml_content: debouncedYaml, region: 'us-central1', zone: 'us-central1-a' });
-        setValidationResult({ is_valid: result.is_valid, errors: result.errors });
-      } catch (error) {
-        console.error("Validation failed:", error);
-        toast({
-          variant: "destructive",
-          title: "Validation Error",
-          description: "Could not connect to the validation service.",
-        });
-      } finally {
-        setIsValidating(false);
-      }
-    };
-
-    const estimateCost = async () => {
       setIsEstimatingCost(true);
+      setValidationResult(null);
       setCostResult(null);
       try {
-        const result = await estimateCostWithApi({ yaml_content: debouncedYaml, region: 'us-central1', zone: 'us-central1-a' });
-        setCostResult(result);
+        const result = await analyzeYamlWithApi({ yaml_content: debouncedYaml, region: 'us-central1', zone: 'us-central1-a' });
+        setValidationResult({ is_valid: result.validation.is_valid, errors: result.validation.errors });
+        setCostResult(result.cost);
       } catch (error) {
-        console.error("Cost estimation failed:", error);
+        console.error("Analysis failed:", error);
         toast({
           variant: "destructive",
-          title: "Cost Estimation Error",
-          description: "Could not connect to the cost estimation service.",
+          title: "Analysis Error",
+          description: "Could not connect to the validation and cost estimation service.",
         });
       } finally {
+        setIsValidating(false);
         setIsEstimatingCost(false);
       }
     };
 
-    validate();
-    estimateCost();
+    analyze();
   }, [debouncedYaml, toast]);
 
   const handleDownload = () => {